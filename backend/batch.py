@@ -0,0 +1,88 @@
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+import schemas
+
+MAX_BATCH_ITEMS = 5000
+
+def batch_size(batch) -> int:
+    return len(batch.create) + len(batch.update) + len(batch.delete)
+
+def apply_batch(
+    db: Session,
+    project_id: int,
+    model,
+    batch,
+    prepare_update: Optional[Callable] = None,
+    completed: Optional[Callable] = None,
+):
+    """
+    Apply a batch of creates, updates and deletes for one child table of a project.
+    All targeted rows are loaded with one IN (...) query. Nothing is committed here:
+    the caller commits once so the whole batch is a single transaction.
+
+    Returns (results, added, completed_delta) where added is creates minus deletes
+    and completed_delta is the change in rows counted by `completed` (tasks only).
+    """
+    completed = completed or (lambda row: 0)
+    results = []
+    completed_delta = 0
+
+    target_ids = {item.id for item in batch.update} | set(batch.delete)
+    existing = {}
+    if target_ids:
+        rows = db.query(model).filter(model.project_id == project_id, model.id.in_(target_ids)).all()
+        existing = {row.id: row for row in rows}
+
+    created = []
+    for index, item in enumerate(batch.create):
+        row = model(project_id=project_id, **item.dict())
+        db.add(row)
+        created.append((index, row))
+        completed_delta += completed(row)
+
+    for index, item in enumerate(batch.update):
+        row = existing.get(item.id)
+        if row is None:
+            results.append(schemas.BatchItemResult(op="update", index=index, id=item.id, status="error", detail="Not found"))
+            continue
+        update_data = item.dict(exclude_unset=True, exclude={"id"})
+        if prepare_update:
+            update_data = prepare_update(row, update_data)
+        before = completed(row)
+        for field, value in update_data.items():
+            setattr(row, field, value)
+        completed_delta += completed(row) - before
+        results.append(schemas.BatchItemResult(op="update", index=index, id=item.id))
+
+    deleted = 0
+    for index, item_id in enumerate(batch.delete):
+        row = existing.pop(item_id, None)
+        if row is None:
+            results.append(schemas.BatchItemResult(op="delete", index=index, id=item_id, status="error", detail="Not found"))
+            continue
+        completed_delta -= completed(row)
+        db.delete(row)
+        deleted += 1
+        results.append(schemas.BatchItemResult(op="delete", index=index, id=item_id))
+
+    # Flush to get ids for created rows
+    db.flush()
+    results = [schemas.BatchItemResult(op="create", index=index, id=row.id) for index, row in created] + results
+    return results, len(created) - deleted, completed_delta
+
+def summarize(results) -> schemas.BatchResult:
+    counts = {"create": 0, "update": 0, "delete": 0}
+    failed = 0
+    for result in results:
+        if result.status == "ok":
+            counts[result.op] += 1
+        else:
+            failed += 1
+    return schemas.BatchResult(
+        created=counts["create"],
+        updated=counts["update"],
+        deleted=counts["delete"],
+        failed=failed,
+        results=results,
+    )
@@ -0,0 +1,67 @@
+"""
+Concurrent read benchmark: sync threadpool handler vs the async /api/projects.
+
+Seeds a temporary SQLite database, mounts a copy of the old sync handler
+(sync Session from database.get_db, run in the threadpool) next to the async
+endpoint and fires concurrent requests at both through the ASGI app.
+
+Requires httpx. Run: python bench_async_reads.py [projects] [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+import main, schemas, database, loaders
+from bench_project_queries import seed
+
+def sync_projects(db: Session = Depends(database.get_db)):
+    return loaders.load_projects(db)
+
+main.app.add_api_route("/bench/sync-projects", sync_projects, response_model=list[schemas.Project])
+
+async def hammer(client, url, total, concurrency):
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(url)
+
+    async def worker():
+        while not queue.empty():
+            target = queue.get_nowait()
+            response = await client.get(target)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return total / (time.perf_counter() - started)
+
+async def run(n_projects=200, total=400, concurrency=50):
+    db = database.SessionLocal()
+    seed(db, n_projects)
+    db.close()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/projects?view=summary")  # warm up pools
+        print(f"{n_projects} projects, {total} requests, concurrency {concurrency}")
+        print(f"{'Endpoint':<32} | {'Req/s':>8}")
+        print("-" * 43)
+        for label, url in [
+            ("sync  /bench/sync-projects", "/bench/sync-projects"),
+            ("async /api/projects", "/api/projects"),
+            ("async /api/projects?view=summary", "/api/projects?view=summary"),
+        ]:
+            rps = await hammer(client, url, total, concurrency)
+            print(f"{label:<32} | {rps:>8.1f}")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    asyncio.run(run(*args))
@@ -0,0 +1,107 @@
+"""
+Login rush benchmark: inline bcrypt in a sync handler vs the hashing process pool.
+
+Seeds a temporary SQLite database with a user, then fires concurrent logins
+through the ASGI app while a probe keeps requesting a cheap sync endpoint
+(/api/portfolio/summary). The inline handler is a copy of the old /login
+(bcrypt.checkpw on the request threadpool); /login awaits passwords.hasher.
+Reports logins per second and the probe's latency under each.
+
+Requires httpx. Run: python bench_auth.py [logins] [concurrency]
+(BCRYPT_ROUNDS defaults to 10 here to keep the run short)
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Spawned hashing workers re-import this module, so keep the top level light
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+EMAIL, PASSWORD = "bench@example.com", "correct horse"
+PROBE_INTERVAL = 0.02
+
+def mount_inline_login(main, models, database):
+    import bcrypt
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    def inline_login(user: main.schemas.UserLogin, db: Session = Depends(database.get_db)):
+        db_user = db.query(models.User).filter(models.User.email == user.email).first()
+        if not db_user or not bcrypt.checkpw(user.password.encode("utf-8"), db_user.password_hash.encode("utf-8")):
+            raise HTTPException(status_code=401)
+        return {"email": db_user.email}
+
+    main.app.add_api_route("/bench/inline-login", inline_login, methods=["POST"])
+
+async def rush(client, url, total, concurrency):
+    """Fire `total` logins, `concurrency` at a time, while probing; returns (logins/s, probe latencies, 503s)"""
+    remaining = [total]
+    busy = [0]
+    latencies = []
+    done = asyncio.Event()
+
+    async def login_worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            response = await client.post(url, json={"email": EMAIL, "password": PASSWORD})
+            if response.status_code == 503: # Hashing queue full: backpressure
+                busy[0] += 1
+                continue
+            response.raise_for_status()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await client.get("/api/portfolio/summary")
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[login_worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    return (total - busy[0]) / elapsed, latencies, busy[0]
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1] if len(values) > 1 else values[0]
+
+async def run(total=120, concurrency=60):
+    import httpx
+    import main, models, database, passwords
+
+    db = database.SessionLocal()
+    db.add(models.User(email=EMAIL, password_hash=passwords.hash_password_sync(PASSWORD), full_name="Bench", role="staff"))
+    db.commit()
+    db.close()
+    mount_inline_login(main, models, database)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.post("/login", json={"email": EMAIL, "password": PASSWORD}) # start the pool
+        idle = []
+        for _ in range(10):
+            started = time.perf_counter()
+            await client.get("/api/portfolio/summary")
+            idle.append((time.perf_counter() - started) * 1000)
+        print(f"bcrypt rounds {passwords.hasher.rounds}, {passwords.hasher.workers} hashing workers, "
+              f"{total} logins at concurrency {concurrency}")
+        print(f"{'Login handler':<28} | {'Logins/s':>8} | {'503s':>4} | {'probe p50':>9} | {'probe p95':>9} | {'probe max':>9}")
+        print("-" * 83)
+        for label, url in [("inline bcrypt (threadpool)", "/bench/inline-login"), ("process pool /login", "/login")]:
+            rate, latencies, busy = await rush(client, url, total, concurrency)
+            print(f"{label:<28} | {rate:>8.1f} | {busy:>4} | {percentile(latencies, 50):>7.1f}ms | "
+                  f"{percentile(latencies, 95):>7.1f}ms | {max(latencies):>7.1f}ms")
+        print(f"(idle probe: {statistics.median(idle):.1f} ms)")
+    passwords.hasher.stop()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(run(*args))
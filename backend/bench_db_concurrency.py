@@ -0,0 +1,81 @@
+"""
+Concurrent write benchmark for the database engine modes.
+
+Starts several worker processes (like gunicorn -w 4) that each commit small
+writes to the same database and reports throughput and "database is locked"
+failures for:
+  - rollback journal with no busy timeout (the old default engine)
+  - WAL + synchronous=NORMAL + busy_timeout (the current SQLite default)
+  - PostgreSQL, when BENCH_POSTGRES_URL is set
+
+Run: python bench_db_concurrency.py [workers] [writes_per_worker]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import database
+
+MODES = {
+    "delete-journal": {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout_ms": 0},
+    "wal": {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout_ms": 5000},
+}
+
+def writer(url, pragmas, writes, results):
+    engine = database.build_engine(url, **pragmas) if database.is_sqlite(url) else database.build_engine(url)
+    ok = locked = 0
+    for i in range(writes):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO bench_writes (worker, seq) VALUES (:w, :s)"), {"w": os.getpid(), "s": i})
+                conn.execute(text("SELECT COUNT(*) FROM bench_writes WHERE worker = :w"), {"w": os.getpid()})
+            ok += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((ok, locked))
+
+def run_mode(name, url, pragmas, workers, writes):
+    engine = database.build_engine(url, **pragmas) if database.is_sqlite(url) else database.build_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_writes"))
+        conn.execute(text("CREATE TABLE bench_writes (id INTEGER PRIMARY KEY, worker INTEGER, seq INTEGER)"))
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(url, pragmas, writes, results)) for _ in range(workers)]
+    started = time.perf_counter()
+    for p in processes:
+        p.start()
+    totals = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    ok = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    print(f"{name:<16} | {ok:>8} | {locked:>8} | {elapsed:>8.2f} | {ok / elapsed:>10.0f}")
+
+def run(workers=4, writes=500):
+    print(f"{workers} workers x {writes} writes")
+    print(f"{'Mode':<16} | {'Commits':>8} | {'Locked':>8} | {'Seconds':>8} | {'Writes/s':>10}")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pragmas in MODES.items():
+            url = f"sqlite:///{os.path.join(tmp, name + '.db')}"
+            run_mode(name, url, pragmas, workers, writes)
+
+    postgres_url = os.getenv("BENCH_POSTGRES_URL")
+    if postgres_url:
+        run_mode("postgresql", postgres_url, {}, workers, writes)
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
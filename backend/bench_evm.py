@@ -0,0 +1,174 @@
+"""
+Earned value (EVM) engine benchmark.
+
+Seeds an in-memory database with 10k projects (10 dated tasks each, half of
+them under a parent task) and times the vectorized engine: the two columnar
+queries, the NumPy pass and the project_health write-back. A per-project pure
+Python loop over the same columns is timed as a baseline and must produce the
+same statuses.
+
+Run: python bench_evm.py [n_projects]
+"""
+import math
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models, evm
+
+TODAY = date(2026, 7, 1)
+TASKS_PER_PROJECT = 10
+
+def make_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+def seed(db, n_projects):
+    start = date(2026, 1, 1)
+    projects = []
+    health = []
+    tasks = []
+    task_id = 0
+    for i in range(1, n_projects + 1):
+        projects.append({
+            "id": i,
+            "name": f"Project {i}",
+            "status": "In Progress",
+            "start_date": start + timedelta(days=i % 90),
+            "end_date": start + timedelta(days=270 + i % 180),
+            "planned_cost": 100000.0 + (i % 50) * 1000,
+            "actual_cost": 20000.0 + (i % 97) * 700,
+            "progress_percentage": i % 100,
+        })
+        health.append({"project_id": i, "schedule_status": "Good", "budget_status": "Good"})
+        parent_id = None
+        for j in range(TASKS_PER_PROJECT):
+            task_id += 1
+            if j == 0:
+                parent_id = task_id # First task is a summary row over the next four
+            tasks.append({
+                "id": task_id,
+                "project_id": i,
+                "task_name": f"Task {j}",
+                "start_date": start + timedelta(days=30 * j + i % 20),
+                "end_date": start + timedelta(days=30 * j + 25 + i % 20),
+                "completion_percentage": (i * 7 + j * 13) % 101,
+                "status": "Completed" if (i + j) % 9 == 0 else "In Progress",
+                "parent_id": parent_id if 0 < j < 5 else None,
+            })
+    db.execute(insert(models.Project), projects)
+    db.execute(insert(models.ProjectHealth), health)
+    db.execute(insert(models.ProjectTask), tasks)
+    db.commit()
+
+def python_statuses(projects, tasks, today):
+    """Baseline: the same rules evaluated project by project in plain Python"""
+    def fraction(start, end):
+        duration = max((end - start).days + 1, 1)
+        return min(max(((today - start).days + 1) / duration, 0.0), 1.0), duration
+
+    def status(index):
+        if index is None:
+            return evm.STATUS_GOOD
+        if index >= evm.EVM_GOOD_INDEX:
+            return evm.STATUS_GOOD
+        return evm.STATUS_AT_RISK if index >= evm.EVM_CRITICAL_INDEX else evm.STATUS_CRITICAL
+
+    parents = {t["parent_id"] for t in tasks if t["parent_id"] is not None}
+    by_project = {}
+    for t in tasks:
+        if t["id"] in parents or not (t["start"] and t["end"]):
+            continue
+        planned, duration = fraction(t["start"], t["end"])
+        done = 1.0 if t["completed"] else min(max(t["completion"] / 100.0, 0.0), 1.0)
+        totals = by_project.setdefault(t["project_id"], [0.0, 0.0, 0.0])
+        totals[0] += duration
+        totals[1] += duration * planned
+        totals[2] += duration * done
+
+    results = []
+    for p in projects:
+        totals = by_project.get(p["id"])
+        if totals:
+            planned, earned = totals[1] / totals[0], totals[2] / totals[0]
+        else:
+            planned = fraction(p["start"], p["end"])[0] if p["start"] and p["end"] else 0.0
+            earned = min(max(p["progress"] / 100.0, 0.0), 1.0)
+        pv, ev, ac = p["bac"] * planned, p["bac"] * earned, p["ac"]
+        cpi = ev / ac if ac > 0 else None
+        spi = ev / pv if pv > 0 else None
+        results.append((status(spi), status(cpi)))
+    return results
+
+def rows_for_baseline(projects, tasks):
+    """Convert the columnar arrays back to row dicts for the pure Python loop"""
+    project_rows = [
+        {
+            "id": int(pid),
+            "bac": float(bac),
+            "ac": float(ac),
+            "start": None if np.isnat(start) else start.astype(date),
+            "end": None if np.isnat(end) else end.astype(date),
+            "progress": float(progress),
+        }
+        for pid, bac, ac, start, end, progress in zip(
+            projects["project_id"], projects["bac"], projects["ac"],
+            projects["start"], projects["end"], projects["progress"],
+        )
+    ]
+    task_rows = [
+        {
+            "id": int(tid),
+            "project_id": int(pid),
+            "parent_id": None if math.isnan(parent) else int(parent),
+            "start": start.astype(date),
+            "end": end.astype(date),
+            "completion": float(completion),
+            "completed": bool(completed),
+        }
+        for tid, pid, parent, start, end, completion, completed in zip(
+            tasks["id"], tasks["project_id"], tasks["parent_id"],
+            tasks["start"], tasks["end"], tasks["completion"], tasks["completed"],
+        )
+    ]
+    return project_rows, task_rows
+
+def run(n_projects=10_000):
+    db = make_session()
+    seed(db, n_projects)
+
+    started = time.perf_counter()
+    projects = evm.load_project_columns(db)
+    tasks = evm.load_task_columns(db)
+    loaded = time.perf_counter()
+    metrics = evm.compute(projects, tasks, TODAY)
+    computed = time.perf_counter()
+    changed = evm.apply_health(db, projects, metrics)
+    db.commit()
+    written = time.perf_counter()
+
+    project_rows, task_rows = rows_for_baseline(projects, tasks)
+    baseline_started = time.perf_counter()
+    expected = python_statuses(project_rows, task_rows, TODAY)
+    baseline_elapsed = time.perf_counter() - baseline_started
+
+    actual = list(zip(metrics["schedule_status"].tolist(), metrics["budget_status"].tolist()))
+    assert actual == expected, "vectorized statuses differ from the baseline"
+
+    print(f"Projects: {n_projects}, tasks: {len(tasks['id'])}")
+    print(f"Load (2 queries):        {(loaded - started) * 1000:8.1f} ms")
+    print(f"NumPy compute:           {(computed - loaded) * 1000:8.1f} ms")
+    print(f"Health write-back:       {(written - computed) * 1000:8.1f} ms ({len(changed)} rows changed)")
+    print(f"Python loop baseline:    {baseline_elapsed * 1000:8.1f} ms (compute only)")
+    print(f"Compute speedup:         {baseline_elapsed / max(computed - loaded, 1e-9):8.1f}x")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,80 @@
+"""
+Metrics benchmark: per-request overhead of MetricsMiddleware and multiprocess aggregation.
+
+Runs in Prometheus multiprocess mode, as under gunicorn (samples go to mmapped files
+in a temporary PROMETHEUS_MULTIPROC_DIR). Drives a no-op ASGI app directly, with and
+without the middleware, over the real route table, so the difference is the cost of
+route resolution plus the counter, gauge and histogram updates. Then starts several
+processes (like gunicorn -w 4) that each record requests and checks that /metrics,
+rendered from the parent, reports the sum over all of them.
+
+Run: python bench_metrics.py [requests]
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(_tmp.name, "metrics")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+import main, metrics
+
+PROCESSES = 4
+PATHS = ("/api/projects", "/api/projects/42/details", "/api/projects/42", "/api/system/job-stats", "/missing")
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def drive(app, n_requests):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    for n in range(n_requests):
+        scope = {"type": "http", "method": "GET", "path": PATHS[n % len(PATHS)], "root_path": "", "headers": []}
+        await app(scope, receive, send)
+
+def timed(app, n_requests) -> float:
+    started = time.perf_counter()
+    asyncio.run(drive(app, n_requests))
+    return time.perf_counter() - started
+
+def record(n_requests):
+    asyncio.run(drive(metrics.MetricsMiddleware(noop_app, main.app.router), n_requests))
+
+def requests_total(text: str, route: str) -> float:
+    pattern = rf'^http_requests_total\{{method="GET",route="{re.escape(route)}",status="200"\}} (\S+)$'
+    return sum(float(value) for value in re.findall(pattern, text, re.MULTILINE))
+
+def run(n_requests=50000):
+    print(f"{n_requests} requests over {len(PATHS)} paths ({len(metrics.RouteTable(main.app.router).routes)} routes)")
+    bare = timed(noop_app, n_requests)
+    wrapped = timed(metrics.MetricsMiddleware(noop_app, main.app.router), n_requests)
+    print(f"without middleware: {bare / n_requests * 1e6:6.1f} us/request")
+    print(f"with middleware   : {wrapped / n_requests * 1e6:6.1f} us/request "
+          f"(+{(wrapped - bare) / n_requests * 1e6:.1f} us)")
+
+    # Each process writes its own files; the parent's render merges them with its own samples
+    before = requests_total(metrics.render().decode(), "/api/projects")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=record, args=(n_requests,)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    after = requests_total(metrics.render().decode(), "/api/projects")
+    expected = PROCESSES * len(range(0, n_requests, len(PATHS)))
+    assert after - before == expected, f"expected {expected} more /api/projects requests, got {after - before}"
+    print(f"{PROCESSES} processes: /metrics counts all {expected} of their /api/projects requests")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
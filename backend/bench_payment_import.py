@@ -0,0 +1,87 @@
+"""
+Payment import benchmark: legacy full-load + per-row ORM adds vs the streaming
+read_only parser with chunked bulk inserts.
+
+Generates a workbook with N rows (default 100k), then runs each importer in a
+fresh process against a temporary SQLite database and reports rows/s and the
+child's peak RSS.
+
+Run: python bench_payment_import.py [rows]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import openpyxl
+
+def write_workbook(path, n_rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Payment Schedule Template")
+    ws.append(["Deliverable", "Phase", "Plan Date (YYYY-MM-DD)", "Planned Amount", "Category", "Remarks"])
+    start = date(2026, 1, 1)
+    for i in range(n_rows):
+        ws.append([f"Milestone {i}", f"Phase {i % 5}", start + timedelta(days=i % 365), 1000.0 + i, "Project Implementation", "Imported"])
+    wb.save(path)
+
+def legacy_import(path, project_id, db):
+    import models
+    wb = openpyxl.load_workbook(path)
+    ws = wb.active
+    count = 0
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        if not row or not row[0]:
+            continue
+        plan_date = row[2].date() if hasattr(row[2], "date") else row[2]
+        db.add(models.PaymentSchedule(
+            project_id=project_id,
+            deliverable=str(row[0]),
+            phase=str(row[1]),
+            plan_date=plan_date,
+            planned_amount=float(row[3]),
+            status="Not Paid",
+            remark=str(row[5]),
+        ))
+        count += 1
+    db.commit()
+    return count
+
+def run_importer(name, workbook_path, db_path, results):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    import models, database, importers
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    project = models.Project(name="Bench", start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), planned_cost=0.0)
+    db.add(project)
+    db.commit()
+
+    importer = legacy_import if name == "legacy" else importers.import_payment_workbook
+    started = time.perf_counter()
+    count = importer(workbook_path, project.id, db)
+    elapsed = time.perf_counter() - started
+    db.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((name, count, elapsed, peak_kb))
+
+def run(n_rows=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook_path = os.path.join(tmp, "payments.xlsx")
+        write_workbook(workbook_path, n_rows)
+        print(f"{n_rows} rows, workbook {os.path.getsize(workbook_path) / 1e6:.1f} MB")
+        print(f"{'Importer':<10} | {'Rows':>8} | {'Seconds':>8} | {'Rows/s':>8} | {'Peak RSS MB':>11}")
+        print("-" * 58)
+        ctx = multiprocessing.get_context("spawn")
+        for name in ("legacy", "streaming"):
+            results = ctx.Queue()
+            process = ctx.Process(target=run_importer, args=(name, workbook_path, os.path.join(tmp, f"{name}.db"), results))
+            process.start()
+            name, count, elapsed, peak_kb = results.get()
+            process.join()
+            print(f"{name:<10} | {count:>8} | {elapsed:>8.2f} | {count / elapsed:>8.0f} | {peak_kb / 1024:>11.1f}")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    run(*args)
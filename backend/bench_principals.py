@@ -0,0 +1,76 @@
+"""
+Principal resolution benchmark: per-request users query vs the principal cache.
+
+Seeds a temporary SQLite database with users, then resolves a mix of their
+tokens the way get_current_user does, once with caching off (a users +
+revoked_tokens query per request) and once through the cache. Counts the
+statements sent to the database and checks that a revocation is honoured on
+the very next lookup.
+
+Run: python bench_principals.py [lookups]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import event, insert
+
+import models, database, cache, principals
+
+USERS = 50
+
+def seed():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    db.execute(insert(models.User), [
+        {"email": f"user{i}@example.com", "password_hash": "-", "full_name": f"User {i}", "role": "staff"}
+        for i in range(USERS)
+    ])
+    db.commit()
+    db.close()
+    return [(f"user{i}@example.com", uuid.uuid4().hex) for i in range(USERS)]
+
+async def resolve_all(resolver, tokens, lookups):
+    async with database.AsyncSessionLocal() as db:
+        for n in range(lookups):
+            email, jti = tokens[n % len(tokens)]
+            assert await resolver.resolve(db, email, jti) is not None
+
+async def run(lookups=20000):
+    tokens = seed()
+    counter = {"count": 0}
+
+    @event.listens_for(database.async_engine.sync_engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    print(f"{lookups} lookups over {USERS} users")
+    for label, resolver in (
+        ("query per request", principals.PrincipalCache(None)),
+        ("principal cache", principals.PrincipalCache(cache.MemoryStore(ttl=principals.PRINCIPAL_TTL_SECONDS))),
+    ):
+        counter["count"] = 0
+        started = time.perf_counter()
+        await resolve_all(resolver, tokens, lookups)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<18}: {elapsed * 1000:8.1f} ms ({elapsed / lookups * 1e6:6.1f} us/lookup), {counter['count']} statements")
+
+    # A revoked token must be rejected on the next lookup, not after the TTL
+    email, jti = tokens[0]
+    async with database.AsyncSessionLocal() as db:
+        principal = await resolver.resolve(db, email, jti)
+        await resolver.revoke(db, principal, jti, datetime.utcnow() + timedelta(minutes=30))
+        assert await resolver.resolve(db, email, jti) is None, "revoked token still resolves"
+        assert await resolver.resolve(db, *tokens[1]) is not None
+    print("revocation honoured immediately")
+    await database.async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
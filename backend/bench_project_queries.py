@@ -0,0 +1,97 @@
+"""
+Query-count benchmark for the project list loader.
+
+Seeds an in-memory database with a growing number of projects and counts the
+SQL statements issued to load and serialize the list the way /api/projects does.
+The eager loader must stay constant; the lazy baseline grows as 1 + 3N.
+
+Run: python bench_project_queries.py
+"""
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models, schemas, loaders
+
+SIZES = [10, 100, 500]
+
+def make_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    counter = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine), counter
+
+def seed(db, n_projects):
+    start = date(2026, 1, 1)
+    for i in range(n_projects):
+        project = models.Project(
+            name=f"Project {i}",
+            project_code=f"PJ{i:05d}",
+            status="In Progress",
+            start_date=start,
+            end_date=start + timedelta(days=365),
+            planned_cost=100000.0,
+        )
+        project.health = models.ProjectHealth()
+        project.payments = [
+            models.PaymentSchedule(
+                deliverable=f"Milestone {j}",
+                phase=f"Phase {j}",
+                plan_date=start + timedelta(days=30 * j),
+                planned_amount=5000.0,
+            )
+            for j in range(3)
+        ]
+        project.tasks = [models.ProjectTask(task_name=f"Task {j}") for j in range(5)]
+        db.add(project)
+    db.commit()
+
+def measure(session_factory, counter, load):
+    db = session_factory()
+    try:
+        counter["count"] = 0
+        started = time.perf_counter()
+        projects = load(db)
+        payload = [schemas.Project.model_validate(p) for p in projects]
+        elapsed = time.perf_counter() - started
+        return counter["count"], elapsed, len(payload)
+    finally:
+        db.close()
+
+def lazy_load(db):
+    return db.query(models.Project).all()
+
+def run():
+    print(f"{'Projects':>8} | {'Lazy queries':>12} | {'Eager queries':>13} | {'Lazy ms':>8} | {'Eager ms':>8}")
+    print("-" * 62)
+    eager_counts = set()
+    for n in SIZES:
+        session_factory, counter = make_session()
+        db = session_factory()
+        seed(db, n)
+        db.close()
+
+        lazy_q, lazy_t, _ = measure(session_factory, counter, lazy_load)
+        eager_q, eager_t, loaded = measure(session_factory, counter, loaders.load_projects)
+        assert loaded == n
+        eager_counts.add(eager_q)
+        print(f"{n:>8} | {lazy_q:>12} | {eager_q:>13} | {lazy_t * 1000:>8.1f} | {eager_t * 1000:>8.1f}")
+
+    if len(eager_counts) == 1:
+        print(f"OK: eager loader uses a constant {eager_counts.pop()} queries")
+    else:
+        print(f"FAIL: eager query count varies with project count: {sorted(eager_counts)}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    run()
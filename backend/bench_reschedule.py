@@ -0,0 +1,142 @@
+"""
+Incremental rescheduling benchmark on long dependency chains.
+
+Seeds an in-memory database with two independent 5k-task finish-to-start
+chains and moves tasks of the first chain. The rescheduler must rewrite only
+the moved task's downstream subgraph (the second chain stays untouched) with
+a constant number of statements. A per-task ORM walk that queries each
+task's successors is timed as a baseline and must produce the same dates.
+
+Run: python bench_reschedule.py [chain_length]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models, scheduling
+
+CHAINS = 2
+SHIFT_DAYS = 3
+
+def make_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    counter = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)(), counter
+
+def seed(db, chain_length):
+    """CHAINS back-to-back FS chains of 5-day tasks; returns each chain's task ids"""
+    start = date(2026, 1, 1)
+    db.execute(insert(models.Project), [{
+        "id": 1, "name": "Chains", "status": "In Progress",
+        "start_date": start, "end_date": start + timedelta(days=5 * chain_length),
+        "planned_cost": 0.0,
+    }])
+    chains = []
+    tasks = []
+    links = []
+    task_id = 0
+    for chain in range(CHAINS):
+        ids = []
+        for position in range(chain_length):
+            task_id += 1
+            ids.append(task_id)
+            tasks.append({
+                "id": task_id,
+                "project_id": 1,
+                "task_name": f"Chain {chain} task {position}",
+                "start_date": start + timedelta(days=5 * position),
+                "end_date": start + timedelta(days=5 * position + 4),
+            })
+            if position:
+                links.append({"project_id": 1, "predecessor_id": task_id - 1, "successor_id": task_id})
+        chains.append(ids)
+    db.execute(insert(models.ProjectTask), tasks)
+    db.execute(insert(models.TaskDependency), links)
+    db.commit()
+    return chains
+
+def shift(db, task_id, days):
+    task = db.get(models.ProjectTask, task_id)
+    task.start_date += timedelta(days=days)
+    task.end_date += timedelta(days=days)
+    db.flush()
+
+def naive_reschedule(db, task_id):
+    """Baseline: walk successors one task at a time through the ORM (FS links only)"""
+    moved = 0
+    stack = [db.get(models.ProjectTask, task_id)]
+    while stack:
+        predecessor = stack.pop()
+        links = db.query(models.TaskDependency).filter(models.TaskDependency.predecessor_id == predecessor.id).all()
+        for link in links:
+            successor = db.get(models.ProjectTask, link.successor_id)
+            required = predecessor.end_date + timedelta(days=link.lag_days + 1)
+            if successor.start_date < required:
+                delta = required - successor.start_date
+                successor.start_date += delta
+                successor.end_date += delta
+                moved += 1
+                stack.append(successor)
+    db.flush()
+    return moved
+
+def end_dates(db, ids):
+    rows = db.query(models.ProjectTask.id, models.ProjectTask.end_date).filter(models.ProjectTask.id.in_(ids))
+    return dict(rows.all())
+
+def run(chain_length=5000):
+    db, counter = make_session()
+    chains = seed(db, chain_length)
+    first, other = chains
+    untouched = end_dates(db, other)
+    print(f"Chains: {CHAINS} x {chain_length} tasks (FS links)")
+
+    for label, task_id in (("head", first[0]), ("middle", first[len(first) // 2])):
+        shift(db, task_id, SHIFT_DAYS)
+        counter["count"] = 0
+        started = time.perf_counter()
+        moved = scheduling.reschedule(db, 1, [task_id])
+        elapsed = time.perf_counter() - started
+        db.commit()
+        print(f"Move {label:<6}  incremental: {elapsed * 1000:8.1f} ms, {counter['count']:3d} statements, {len(moved)} tasks moved")
+
+    assert end_dates(db, other) == untouched, "independent chain was rewritten"
+
+    counter["count"] = 0
+    started = time.perf_counter()
+    cyclic = scheduling.creates_cycle(db, 1, first[-1], first[0])
+    print(f"Cycle check (tail -> head): {(time.perf_counter() - started) * 1000:8.1f} ms, rejected={cyclic}")
+
+    # Baseline on a fresh copy with the same head move
+    baseline_db, baseline_counter = make_session()
+    baseline_first, _ = seed(baseline_db, chain_length)
+    shift(baseline_db, baseline_first[0], SHIFT_DAYS)
+    incremental_db, _ = make_session()
+    incremental_first, _ = seed(incremental_db, chain_length)
+    shift(incremental_db, incremental_first[0], SHIFT_DAYS)
+
+    baseline_counter["count"] = 0
+    started = time.perf_counter()
+    moved = naive_reschedule(baseline_db, baseline_first[0])
+    baseline_elapsed = time.perf_counter() - started
+    baseline_db.commit()
+    print(f"Move head   per-task ORM: {baseline_elapsed * 1000:8.1f} ms, {baseline_counter['count']} statements, {moved} tasks moved")
+
+    scheduling.reschedule(incremental_db, 1, [incremental_first[0]])
+    incremental_db.commit()
+    assert end_dates(baseline_db, baseline_first) == end_dates(incremental_db, incremental_first), "dates differ from the baseline"
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,111 @@
+"""
+Full-text search benchmark.
+
+Seeds a SQLite database (a temp file, so the async engine can share it) with
+projects, tasks, matters and payments, letting the triggers fill the FTS5
+index, then times /api/search-style queries against a LIKE scan of the same
+columns; FTS5 matches must be a subset of the LIKE matches. The vocabulary is
+only 30 words, so every term hits a large share of the rows: a worst case for
+ranking.
+
+Run: python bench_search.py [n_projects]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+import models, database, search
+
+TASKS_PER_PROJECT = 20
+MATTERS_PER_PROJECT = 5
+PAYMENTS_PER_PROJECT = 10
+QUERIES = ["vendor delay", "network", "migration cutover", "inv 4242", "licence renewal"]
+RUNS = 20
+
+WORDS = (
+    "network server storage licence renewal migration cutover vendor delay training "
+    "integration testing hospital clinic pharmacy laboratory billing audit security "
+    "backup firewall upgrade rollout approval tender contract invoice warranty"
+).split()
+
+def phrase(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def seed(engine, n_projects):
+    rng = random.Random(7)
+    start = date(2026, 1, 1)
+    projects, tasks, matters, payments = [], [], [], []
+    for i in range(1, n_projects + 1):
+        projects.append({
+            "id": i, "name": f"{phrase(rng, 3).title()} {i}", "project_code": f"PJ{i:05d}",
+            "description": phrase(rng, 25), "status": "In Progress",
+            "start_date": start, "end_date": date(2026, 12, 31), "planned_cost": 1000.0,
+        })
+        tasks += [{"project_id": i, "task_name": phrase(rng, 4)} for _ in range(TASKS_PER_PROJECT)]
+        matters += [{
+            "project_id": i, "date_raised": start, "issue_description": phrase(rng, 8),
+            "action_updates": phrase(rng, 30), "remarks": phrase(rng, 6),
+        } for _ in range(MATTERS_PER_PROJECT)]
+        payments += [{
+            "project_id": i, "deliverable": phrase(rng, 3), "phase": "1", "plan_date": start,
+            "planned_amount": 100.0, "invoice_number": f"INV-{rng.randint(1000, 9999)}",
+            "po_number": f"PO-{rng.randint(1000, 9999)}",
+        } for _ in range(PAYMENTS_PER_PROJECT)]
+    db = sessionmaker(bind=engine)()
+    for model, rows in ((models.Project, projects), (models.ProjectTask, tasks),
+                        (models.MattersArising, matters), (models.PaymentSchedule, payments)):
+        db.execute(insert(model), rows)
+    db.commit()
+    db.close()
+    return len(projects) + len(tasks) + len(matters) + len(payments)
+
+def like_search(engine, q):
+    """Baseline: every term as a LIKE '%term%' over the concatenated columns of each table"""
+    terms = search.query_terms(q)
+    params = {f"t{index}": f"%{term}%" for index, term in enumerate(terms)}
+    selects = []
+    for source in search.SOURCES:
+        document = f"{search._title(source, '')} || ' ' || {search._body(source, '')}"
+        where = " AND ".join(f"{document} LIKE :t{index}" for index in range(len(terms)))
+        selects.append(f"SELECT '{source.entity}', id FROM {source.table} WHERE {where}")
+    with engine.connect() as conn:
+        return set(conn.execute(text(" UNION ALL ".join(selects)), params).all())
+
+async def fts_search(q, limit):
+    async with database.AsyncSessionLocal() as db:
+        return await search.search_async(db, q, limit=limit)
+
+def timed(fn):
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        result = fn()
+    return result, (time.perf_counter() - started) / RUNS * 1000
+
+def run(n_projects=2000):
+    engine = database.engine
+    models.Base.metadata.create_all(bind=engine)
+    search.install(engine)
+    rows = seed(engine, n_projects)
+    print(f"Indexed rows: {rows}")
+
+    loop = asyncio.new_event_loop()
+    for q in QUERIES:
+        _, fts_ms = timed(lambda: loop.run_until_complete(fts_search(q, 20)))
+        expected, like_ms = timed(lambda: like_search(engine, q))
+        print(f"{q!r:<20} FTS5 top 20: {fts_ms:7.2f} ms   LIKE scan: {like_ms:8.2f} ms   ({len(expected)} LIKE matches)")
+        everything = loop.run_until_complete(fts_search(q, len(expected) + 1))
+        assert {(hit["entity"], hit["id"]) for hit in everything} <= expected, "FTS5 returned rows the LIKE scan did not"
+    loop.close()
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
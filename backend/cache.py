@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Response cache settings (override via environment)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory") # memory, redis, off
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("CACHE_REDIS_PREFIX", "pms:")
+
+# Entry keys are "project:<id>:v<generation>:<kind>", counters are "project:<id>:gen"
+ENTRY_PATTERN = "project:*:v*"
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+class MemoryStore:
+    """Bounded LRU of bytes values with a per-entry TTL, local to one worker process"""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def counter(self, key: str) -> int:
+        with self.lock:
+            return self.counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+    def clear(self):
+        """Drop entries; generation counters are kept so in-flight reads stay superseded"""
+        with self.lock:
+            self.entries.clear()
+
+    def size(self) -> int:
+        return len(self.entries)
+
+class RedisStore:
+    """Redis-compatible store shared by all gunicorn workers (entries expire via TTL)"""
+
+    name = "redis"
+    blocking = True # Network round-trips: async callers go through offload()
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = CACHE_TTL_SECONDS, prefix: str = REDIS_PREFIX,
+                 pattern: str = ENTRY_PATTERN):
+        import redis # Optional dependency, only needed for CACHE_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.pattern = pattern
+        self.evictions = 0 # Eviction is handled by Redis itself (maxmemory policy)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def counter(self, key: str) -> int:
+        value = self.client.get(self.prefix + key)
+        return int(value) if value else 0
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + self.pattern))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + self.pattern))
+
+async def offload(store, function, *args):
+    """Run a store operation from async code: off the event loop if the store blocks on I/O"""
+    if store is not None and store.blocking:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+class ProjectResponseCache:
+    """
+    Serialized per-project responses (e.g. the details graph).
+    Each project has a generation counter that handlers bump after committing a write.
+    Entries are keyed by generation, so invalidation is O(1) and a read that raced
+    with a write can only ever store its result under the superseded generation.
+
+    Each entry also records the project's own data version (versioning.project_scope) it
+    was built at, read before loading, and only serves requests made at that same version.
+    Generation counters of the memory backend are per process, and even shared ones are
+    bumped only after the commit; the version check keeps any worker from sending an older
+    body under a newer ETag (which clients would then keep through 304s). Writes to other
+    projects leave the version, and so the entry, alone.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self.stats = CacheStats()
+        self.kinds = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def _generation_key(self, project_id: int) -> str:
+        return f"project:{project_id}:gen"
+
+    def generation(self, project_id: int) -> int:
+        """Read before loading from the database; pass to get()/set()"""
+        if not self.enabled:
+            return 0
+        return self.store.counter(self._generation_key(project_id))
+
+    def _key(self, kind: str, project_id: int, generation: int) -> str:
+        return f"project:{project_id}:v{generation}:{kind}"
+
+    def get(self, kind: str, project_id: int, generation: int, version: int) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        value = self.store.get(self._key(kind, project_id, generation))
+        if value is not None:
+            built_at, _, value = value.partition(b"\n")
+            if int(built_at) != version:
+                value = None
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def set(self, kind: str, project_id: int, generation: int, version: int, value: bytes):
+        if self.enabled:
+            self.store.set(self._key(kind, project_id, generation), b"%d\n%s" % (version, value))
+            self.kinds.add(kind)
+            self.stats.stores += 1
+
+    def lookup(self, kind: str, project_id: int, version: int) -> tuple[int, Optional[bytes]]:
+        """generation() then get(), read before loading; pass the generation on to set()"""
+        generation = self.generation(project_id)
+        return generation, self.get(kind, project_id, generation, version)
+
+    async def lookup_async(self, kind: str, project_id: int, version: int) -> tuple[int, Optional[bytes]]:
+        return await offload(self.store, self.lookup, kind, project_id, version)
+
+    async def set_async(self, kind: str, project_id: int, generation: int, version: int, value: bytes):
+        await offload(self.store, self.set, kind, project_id, generation, version, value)
+
+    def invalidate(self, *project_ids: int):
+        """Call after commit for every project whose rows were written"""
+        if not self.enabled:
+            return
+        for project_id in set(project_ids):
+            if project_id is not None:
+                generation = self.store.incr(self._generation_key(project_id))
+                for kind in self.kinds: # Free the superseded entries right away
+                    self.store.delete(self._key(kind, project_id, generation - 1))
+                self.stats.invalidations += 1
+
+    def clear(self):
+        if self.enabled:
+            self.store.clear()
+
+    def metrics(self) -> dict:
+        data = {
+            "backend": self.store.name if self.enabled else "off",
+            "entries": self.store.size() if self.enabled else 0,
+        }
+        data.update(self.stats.as_dict())
+        data["evictions"] = self.store.evictions if self.enabled else 0
+        return data
+
+def build_store(backend: str = CACHE_BACKEND, ttl: int = CACHE_TTL_SECONDS,
+                max_entries: int = CACHE_MAX_ENTRIES, prefix: str = REDIS_PREFIX, pattern: str = ENTRY_PATTERN):
+    """Store for a backend name, or None when caching is off"""
+    if backend == "off":
+        return None
+    if backend == "redis":
+        return RedisStore(ttl=ttl, prefix=prefix, pattern=pattern)
+    return MemoryStore(max_entries=max_entries, ttl=ttl)
+
+def build_cache(backend: str = CACHE_BACKEND) -> ProjectResponseCache:
+    return ProjectResponseCache(build_store(backend))
+
+project_cache = build_cache()
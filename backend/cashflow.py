@@ -0,0 +1,299 @@
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+from portfolio import category_exclusion
+
+# Rollup rows with this project_id hold the total over all projects
+PORTFOLIO_PROJECT_ID = 0
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def category_key(category) -> str:
+    return category or ""
+
+def payment_buckets(payment) -> set:
+    """(project_id, category, month) buckets a payment row contributes to"""
+    keys = set()
+    category = category_key(payment.category)
+    if payment.plan_date:
+        keys.add((payment.project_id, category, month_start(payment.plan_date)))
+    paid_on = payment.payment_date or payment.plan_date
+    if payment.status == "Paid" and paid_on:
+        keys.add((payment.project_id, category, month_start(paid_on)))
+    return keys
+
+def _aggregate(db: Session, project_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """
+    {(project_id, category, month): [planned, paid, unpaid, count]} from payment_schedule,
+    optionally for one project and for months in [start, end).
+    """
+    payment = models.PaymentSchedule
+    category = func.coalesce(payment.category, "")
+    is_paid = payment.status == "Paid"
+    totals = {}
+
+    def criteria(day):
+        clauses = []
+        if project_id is not None:
+            clauses.append(payment.project_id == project_id)
+        if start is not None:
+            clauses.append(day >= start)
+        if end is not None:
+            clauses.append(day < end)
+        return clauses
+
+    def bucket(pid, cat, year, month):
+        return totals.setdefault((pid, cat, date(int(year), int(month), 1)), [0.0, 0.0, 0.0, 0])
+
+    plan_year = func.extract("year", payment.plan_date)
+    plan_month = func.extract("month", payment.plan_date)
+    planned_rows = (
+        db.query(
+            payment.project_id,
+            category,
+            plan_year,
+            plan_month,
+            func.coalesce(func.sum(payment.planned_amount), 0.0),
+            func.coalesce(func.sum(case((is_paid, 0.0), else_=payment.planned_amount)), 0.0),
+            func.count(payment.id),
+        )
+        .filter(payment.plan_date.isnot(None), *criteria(payment.plan_date))
+        .group_by(payment.project_id, category, plan_year, plan_month)
+    )
+    for pid, cat, year, month, planned, unpaid, count in planned_rows:
+        totals_row = bucket(pid, cat, year, month)
+        totals_row[0] += planned
+        totals_row[2] += unpaid
+        totals_row[3] += count
+
+    paid_on = func.coalesce(payment.payment_date, payment.plan_date)
+    paid_year = func.extract("year", paid_on)
+    paid_month = func.extract("month", paid_on)
+    paid_rows = (
+        db.query(
+            payment.project_id,
+            category,
+            paid_year,
+            paid_month,
+            func.coalesce(func.sum(payment.paid_amount), 0.0),
+        )
+        .filter(is_paid, paid_on.isnot(None), *criteria(paid_on))
+        .group_by(payment.project_id, category, paid_year, paid_month)
+    )
+    for pid, cat, year, month, paid in paid_rows:
+        bucket(pid, cat, year, month)[1] += paid
+
+    return totals
+
+def _insert_buckets(db: Session, totals: dict):
+    rows = [
+        {
+            "project_id": pid,
+            "category": cat,
+            "month": month,
+            "planned_amount": planned,
+            "paid_amount": paid,
+            "unpaid_amount": unpaid,
+            "payment_count": count,
+        }
+        for (pid, cat, month), (planned, paid, unpaid, count) in totals.items()
+        if count or paid
+    ]
+    if rows:
+        db.execute(insert(models.CashflowMonth), rows)
+
+AMOUNT_COLUMNS = ("planned_amount", "paid_amount", "unpaid_amount", "payment_count")
+
+def _rebuild_portfolio(db: Session):
+    """Recompute every all-projects row from the per-project rows (full rebuilds only)"""
+    rollup = models.CashflowMonth
+    db.execute(delete(rollup).where(rollup.project_id == PORTFOLIO_PROJECT_ID))
+    db.execute(insert(rollup).from_select(
+        ["project_id", "category", "month", *AMOUNT_COLUMNS],
+        select(
+            literal(PORTFOLIO_PROJECT_ID),
+            rollup.category,
+            rollup.month,
+            func.sum(rollup.planned_amount),
+            func.sum(rollup.paid_amount),
+            func.sum(rollup.unpaid_amount),
+            func.sum(rollup.payment_count),
+        )
+        .where(rollup.project_id != PORTFOLIO_PROJECT_ID)
+        .group_by(rollup.category, rollup.month),
+    ))
+
+def _stored_buckets(db: Session, criteria) -> dict:
+    """{(project_id, category, month): [planned, paid, unpaid, count]} currently in the rollup"""
+    rollup = models.CashflowMonth
+    rows = db.query(
+        rollup.project_id, rollup.category, rollup.month,
+        rollup.planned_amount, rollup.paid_amount, rollup.unpaid_amount, rollup.payment_count,
+    ).filter(criteria)
+    return {(pid, cat, month): [planned, paid, unpaid, count] for pid, cat, month, planned, paid, unpaid, count in rows}
+
+def _apply_portfolio_deltas(db: Session, old: dict, new: dict):
+    """
+    Add the change between a project's old and new buckets to the all-projects rows,
+    as one upsert (+ delta) per touched (category, month). Each statement only adds
+    to the current row, so concurrent writers to different projects compose without
+    re-reading the other projects' rows.
+    """
+    deltas = {}
+    for totals, sign in ((old, -1), (new, 1)):
+        for (_, cat, month), values in totals.items():
+            delta = deltas.setdefault((cat, month), [0.0, 0.0, 0.0, 0])
+            for index, value in enumerate(values):
+                delta[index] += sign * value
+    rows = [
+        {"project_id": PORTFOLIO_PROJECT_ID, "category": cat, "month": month, **dict(zip(AMOUNT_COLUMNS, delta))}
+        for (cat, month), delta in deltas.items() if any(delta)
+    ]
+    if not rows:
+        return
+    rollup = models.CashflowMonth
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(rollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[rollup.project_id, rollup.category, rollup.month],
+        set_={column: getattr(rollup, column) + getattr(stmt.excluded, column) for column in AMOUNT_COLUMNS},
+    )
+    db.execute(stmt, rows)
+    # Drop rows nothing contributes to any more (paid amounts may keep float dust)
+    db.execute(delete(rollup).where(
+        rollup.project_id == PORTFOLIO_PROJECT_ID,
+        tuple_(rollup.category, rollup.month).in_([(row["category"], row["month"]) for row in rows]),
+        rollup.payment_count <= 0,
+        func.abs(rollup.paid_amount) < 1e-6,
+    ))
+
+def refresh_buckets(db: Session, keys: Iterable[tuple]):
+    """
+    Recompute the given (project_id, category, month) buckets from payment_schedule,
+    plus their all-projects totals. Call with the buckets of a payment before and
+    after a write, inside the write's transaction.
+    """
+    keys = {key for key in keys if key[0] != PORTFOLIO_PROJECT_ID}
+    if not keys:
+        return
+    db.flush()
+    rollup = models.CashflowMonth
+    by_project = {}
+    for pid, cat, month in keys:
+        by_project.setdefault(pid, set()).add((cat, month))
+
+    selected = tuple_(rollup.project_id, rollup.category, rollup.month).in_(keys)
+    old = _stored_buckets(db, selected)
+    db.execute(delete(rollup).where(selected))
+    new = {}
+    for pid, pairs in by_project.items():
+        months = [month for _, month in pairs]
+        totals = _aggregate(db, pid, min(months), next_month(max(months)))
+        new.update({key: value for key, value in totals.items() if (key[1], key[2]) in pairs})
+    _insert_buckets(db, new)
+    _apply_portfolio_deltas(db, old, new)
+
+def refresh_project(db: Session, project_id: int):
+    """Recompute every bucket of one project (bulk imports, batches, project deletes)"""
+    db.flush()
+    rollup = models.CashflowMonth
+    old = _stored_buckets(db, rollup.project_id == project_id)
+    db.execute(delete(rollup).where(rollup.project_id == project_id))
+    totals = _aggregate(db, project_id)
+    _insert_buckets(db, totals)
+    _apply_portfolio_deltas(db, old, totals)
+
+def rebuild(db: Session):
+    """Recompute the whole rollup from payment_schedule (backfill or repair)"""
+    db.execute(delete(models.CashflowMonth))
+    _insert_buckets(db, _aggregate(db))
+    _rebuild_portfolio(db)
+    db.commit()
+
+def ensure_backfilled(db: Session):
+    """Build the rollup for databases that had payments before it existed"""
+    if db.query(models.CashflowMonth.project_id).first() is None and db.query(models.PaymentSchedule.id).first() is not None:
+        rebuild(db)
+
+def cashflow_summary(
+    db: Session,
+    project_id: Optional[int] = None,
+    excluded: Optional[list[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    today: Optional[date] = None,
+):
+    """
+    Planned, paid and overdue amounts per month read from the rollup (one row per
+    category and month). Overdue depends on today: unpaid amounts of past months,
+    plus this month's unpaid payments planned before today.
+    """
+    excluded = [keyword for keyword in (excluded or []) if keyword]
+    today = today or date.today()
+    this_month = month_start(today)
+    rollup = models.CashflowMonth
+
+    query = db.query(
+        rollup.month,
+        func.sum(rollup.planned_amount),
+        func.sum(rollup.paid_amount),
+        func.sum(rollup.unpaid_amount),
+    ).filter(rollup.project_id == (project_id if project_id is not None else PORTFOLIO_PROJECT_ID))
+    exclusion = category_exclusion(excluded, rollup.category)
+    if exclusion is not None:
+        query = query.filter(exclusion)
+    if start is not None:
+        query = query.filter(rollup.month >= month_start(start))
+    if end is not None:
+        query = query.filter(rollup.month <= month_start(end))
+    rows = query.group_by(rollup.month).order_by(rollup.month).all()
+
+    # Only the current month needs a look at individual payments
+    payment = models.PaymentSchedule
+    current = db.query(func.coalesce(func.sum(payment.planned_amount), 0.0)).filter(
+        payment.plan_date >= this_month,
+        payment.plan_date < today,
+        payment.status != "Paid",
+    )
+    if project_id is not None:
+        current = current.filter(payment.project_id == project_id)
+    exclusion = category_exclusion(excluded, payment.category)
+    if exclusion is not None:
+        current = current.filter(exclusion)
+    current_overdue = current.scalar()
+
+    summary = {
+        "project_id": project_id,
+        "excluded_categories": excluded,
+        "total_planned": 0.0,
+        "total_paid": 0.0,
+        "total_overdue": 0.0,
+        "months": [],
+    }
+    for month, planned, paid, unpaid in rows:
+        if month < this_month:
+            overdue = unpaid
+        elif month == this_month:
+            overdue = current_overdue
+        else:
+            overdue = 0.0
+        summary["total_planned"] += planned
+        summary["total_paid"] += paid
+        summary["total_overdue"] += overdue
+        summary["months"].append({
+            "month": month.strftime("%Y-%m"),
+            "planned": planned,
+            "paid": paid,
+            "overdue": overdue,
+            "cumulative_planned": summary["total_planned"],
+            "cumulative_paid": summary["total_paid"],
+        })
+    return summary
@@ -1,14 +1,106 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:////app/data/sql_app_v2.db"
+# Database settings (override via environment)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////app/data/sql_app_v2.db")
+
+# SQLite pragmas applied on every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Connection pool (QueuePool) settings, per gunicorn worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+def normalize_url(url: str) -> str:
+    """Accept the postgres:// scheme some hosts hand out"""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def apply_sqlite_pragmas(engine, journal_mode=None, synchronous=None, busy_timeout_ms=None, mmap_size=None):
+    """Set journal mode, sync level, busy timeout and mmap size on each new SQLite connection"""
+    journal_mode = journal_mode or SQLITE_JOURNAL_MODE
+    synchronous = synchronous or SQLITE_SYNCHRONOUS
+    busy_timeout_ms = SQLITE_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+    mmap_size = SQLITE_MMAP_SIZE if mmap_size is None else mmap_size
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.close()
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, **pragmas):
+    """Create the engine for SQLite (WAL + pragmas) or PostgreSQL (pre-pinged QueuePool)"""
+    url = normalize_url(url)
+    if is_sqlite(url):
+        engine_kwargs = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" not in url and url.rstrip("/") != "sqlite:":
+            engine_kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        engine = create_engine(url, **engine_kwargs)
+        apply_sqlite_pragmas(engine, **pragmas)
+        return engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+def async_url(url: str) -> str:
+    """Map a sync URL onto its async driver (aiosqlite / asyncpg)"""
+    url = normalize_url(url)
+    scheme, rest = url.split("://", 1)
+    if is_sqlite(url):
+        return "sqlite+aiosqlite://" + rest
+    if scheme.split("+")[0] == "postgresql":
+        return "postgresql+asyncpg://" + rest
+    return url
+
+def build_async_engine(url: str = SQLALCHEMY_DATABASE_URL, **pragmas):
+    """Async counterpart of build_engine with the same pragmas and pool settings"""
+    url = async_url(url)
+    if is_sqlite(url):
+        engine_kwargs = {}
+        if ":memory:" not in url and not url.endswith("://"):
+            engine_kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        engine = create_async_engine(url, **engine_kwargs)
+        apply_sqlite_pragmas(engine.sync_engine, **pragmas)
+        return engine
+
+    return create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = build_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,3 +109,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+# Change event fan-out (override via environment)
+# memory: in-process only (single worker); redis: pub/sub shared by all gunicorn workers
+EVENT_BROKER = os.getenv("EVENT_BROKER", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "pms:project-changes")
+# Events buffered per connected client before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+RESYNC_EVENT = {"type": "resync"}
+
+def change_event(entity: str, action: str, project_id: Optional[int], ids: Iterable[int] = ()) -> dict:
+    """Compact change notification, e.g. {"type": "task.updated", "project_id": 3, "ids": [41]}"""
+    return {"type": f"{entity}.{action}", "project_id": project_id, "ids": [i for i in ids if i is not None]}
+
+class InProcessBroker:
+    """Delivers events to the WebSocket subscribers of this worker process"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self.loop = None
+
+    def publish(self, event: dict):
+        """Safe to call from sync handlers running in the threadpool"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and tell it to refetch instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_EVENT)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes to a Redis channel; every worker runs one listener that hands
+    received events to its local subscribers, so all workers see all writes.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, channel: str = EVENT_CHANNEL):
+        import redis # Optional dependency, only needed for EVENT_BROKER=redis
+
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self.client = redis.Redis.from_url(url)
+        self.listener = None
+
+    async def start(self):
+        await super().start()
+        self.listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+        await super().stop()
+
+    def publish(self, event: dict):
+        try:
+            self.client.publish(self.channel, json.dumps(event))
+        except Exception:
+            # The write is already committed; a lost notification only delays clients
+            logger.exception("Failed to publish change event")
+
+    async def _listen(self):
+        import redis.asyncio
+
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._deliver(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change event listener lost its connection, retrying")
+                # Subscribers may have missed events while disconnected
+                self._deliver(RESYNC_EVENT)
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+def build_broker(kind: str = EVENT_BROKER):
+    if kind == "redis":
+        return RedisBroker()
+    return InProcessBroker()
+
+broker = build_broker()
+
+def _matches(event: dict, project_id: Optional[int]) -> bool:
+    return project_id is None or event.get("project_id") in (None, project_id)
+
+async def forward(websocket, queue: asyncio.Queue, project_id: Optional[int] = None):
+    """Send queued events (optionally for one project) to a WebSocket until it disconnects"""
+    receiver = asyncio.ensure_future(websocket.receive())
+    getter = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                # Client messages (keep-alive pings) are ignored
+                receiver = asyncio.ensure_future(websocket.receive())
+            if getter in done:
+                event = getter.result()
+                getter = None
+                if _matches(event, project_id):
+                    await websocket.send_json(event)
+    finally:
+        receiver.cancel()
+        if getter is not None:
+            getter.cancel()
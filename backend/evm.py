@@ -0,0 +1,205 @@
+import os
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+import models
+
+# CPI/SPI at or above GOOD is "Good", at or above CRITICAL is "At Risk", below is "Critical"
+EVM_GOOD_INDEX = float(os.getenv("EVM_GOOD_INDEX", "0.95"))
+EVM_CRITICAL_INDEX = float(os.getenv("EVM_CRITICAL_INDEX", "0.85"))
+
+STATUS_GOOD, STATUS_AT_RISK, STATUS_CRITICAL = "Good", "At Risk", "Critical"
+
+def _floats(values):
+    return np.array(values, dtype=np.float64) # None -> nan
+
+def _days(values):
+    return np.array(values, dtype="datetime64[D]") # None -> NaT
+
+def load_project_columns(db: Session, project_ids: Optional[list[int]] = None) -> dict:
+    """Project budget, cost, dates, progress and current health as columnar arrays (one query)"""
+    project, health = models.Project, models.ProjectHealth
+    query = (
+        select(
+            project.id,
+            project.planned_cost,
+            project.actual_cost,
+            project.start_date,
+            project.end_date,
+            project.progress_percentage,
+            health.id,
+            health.schedule_status,
+            health.budget_status,
+        )
+        .outerjoin(health, health.project_id == project.id)
+        .order_by(project.id)
+    )
+    if project_ids is not None:
+        query = query.where(project.id.in_(project_ids))
+    rows = db.execute(query).all()
+    columns = list(zip(*rows)) if rows else [()] * 9
+    return {
+        "project_id": np.array(columns[0], dtype=np.int64),
+        "bac": np.nan_to_num(_floats(columns[1])),
+        "ac": np.nan_to_num(_floats(columns[2])),
+        "start": _days(columns[3]),
+        "end": _days(columns[4]),
+        "progress": np.nan_to_num(_floats(columns[5])),
+        "health_id": _floats(columns[6]),
+        "schedule_status": np.array(columns[7], dtype=object),
+        "budget_status": np.array(columns[8], dtype=object),
+    }
+
+def load_task_columns(db: Session, project_ids: Optional[list[int]] = None) -> dict:
+    """Task dates and completion as columnar arrays (one query)"""
+    task = models.ProjectTask
+    query = select(
+        task.project_id,
+        task.id,
+        task.parent_id,
+        task.start_date,
+        task.end_date,
+        task.completion_percentage,
+        task.status,
+    )
+    if project_ids is not None:
+        query = query.where(task.project_id.in_(project_ids))
+    rows = db.execute(query).all()
+    columns = list(zip(*rows)) if rows else [()] * 7
+    return {
+        "project_id": np.array(columns[0], dtype=np.int64),
+        "id": np.array(columns[1], dtype=np.int64),
+        "parent_id": _floats(columns[2]),
+        "start": _days(columns[3]),
+        "end": _days(columns[4]),
+        "completion": np.nan_to_num(_floats(columns[5])),
+        "completed": np.array(columns[6], dtype=object) == "Completed",
+    }
+
+def _elapsed_fraction(start, end, today):
+    """Share of [start, end] (inclusive days) elapsed by today, clipped to [0, 1]; nan without dates"""
+    duration = (end - start).astype("timedelta64[D]").astype(np.float64) + 1
+    elapsed = (today - start).astype("timedelta64[D]").astype(np.float64) + 1
+    duration = np.where(duration < 1, 1, duration)
+    return np.clip(elapsed / duration, 0.0, 1.0), duration
+
+def _status(index):
+    """Map CPI/SPI to a health status; undefined indexes (nothing planned or spent yet) are Good"""
+    status = np.select(
+        [np.isnan(index), index >= EVM_GOOD_INDEX, index >= EVM_CRITICAL_INDEX],
+        [STATUS_GOOD, STATUS_GOOD, STATUS_AT_RISK],
+        STATUS_CRITICAL,
+    )
+    return status.astype(object)
+
+def compute(projects: dict, tasks: dict, today: Optional[date] = None) -> dict:
+    """
+    Earned value metrics for every project in one vectorized pass.
+
+    Planned and earned fractions come from the project's dated leaf tasks, weighted
+    by duration; projects without dated tasks fall back to their own dates and
+    progress_percentage. PV = BAC x planned fraction, EV = BAC x earned fraction,
+    AC = actual_cost, CPI = EV / AC, SPI = EV / PV, EAC = BAC / CPI (AC + BAC - EV
+    while CPI is undefined).
+    """
+    today = np.datetime64(today or date.today(), "D")
+    n = len(projects["project_id"])
+    bac = projects["bac"]
+    ac = projects["ac"]
+
+    # Project-level fallback
+    planned, _ = _elapsed_fraction(projects["start"], projects["end"], today)
+    planned = np.nan_to_num(planned)
+    earned = np.clip(projects["progress"] / 100.0, 0.0, 1.0)
+
+    # Task-based fractions (leaf tasks only, so parent rollup rows are not counted twice)
+    if n and len(tasks["id"]):
+        position = np.clip(np.searchsorted(projects["project_id"], tasks["project_id"]), 0, n - 1)
+        known = projects["project_id"][position] == tasks["project_id"]
+        parents = tasks["parent_id"][~np.isnan(tasks["parent_id"])].astype(np.int64)
+        leaf = ~np.isin(tasks["id"], parents)
+        dated = ~np.isnat(tasks["start"]) & ~np.isnat(tasks["end"])
+        task_planned, duration = _elapsed_fraction(tasks["start"], tasks["end"], today)
+        task_done = np.where(tasks["completed"], 1.0, np.clip(tasks["completion"] / 100.0, 0.0, 1.0))
+
+        weight = np.nan_to_num(np.where(known & leaf & dated, duration, 0.0))
+        total = np.bincount(position, weights=weight, minlength=n)
+        planned_sum = np.bincount(position, weights=weight * np.nan_to_num(task_planned), minlength=n)
+        earned_sum = np.bincount(position, weights=weight * task_done, minlength=n)
+        has_tasks = total > 0
+        safe_total = np.where(has_tasks, total, 1.0)
+        planned = np.where(has_tasks, planned_sum / safe_total, planned)
+        earned = np.where(has_tasks, earned_sum / safe_total, earned)
+
+    pv = bac * planned
+    ev = bac * earned
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cpi = np.where(ac > 0, ev / ac, np.nan)
+        spi = np.where(pv > 0, ev / pv, np.nan)
+        eac = np.where(cpi > 0, bac / cpi, ac + (bac - ev))
+
+    return {
+        "project_id": projects["project_id"],
+        "bac": bac,
+        "pv": pv,
+        "ev": ev,
+        "ac": ac,
+        "cpi": cpi,
+        "spi": spi,
+        "eac": eac,
+        "vac": bac - eac,
+        "schedule_status": _status(spi),
+        "budget_status": _status(cpi),
+    }
+
+def to_records(metrics: dict) -> list[dict]:
+    """Row dicts for the API (nan -> None)"""
+    names = list(metrics)
+    records = []
+    for values in zip(*(metrics[name].tolist() for name in names)):
+        record = {}
+        for name, value in zip(names, values):
+            record[name] = None if isinstance(value, float) and np.isnan(value) else value
+        records.append(record)
+    return records
+
+def apply_health(db: Session, projects: dict, metrics: dict) -> list[int]:
+    """
+    Write changed schedule/budget statuses to project_health (creating missing rows)
+    with one executemany per statement. Does not commit; returns the changed project ids.
+    """
+    health_id = projects["health_id"]
+    has_health = ~np.isnan(health_id)
+    changed = has_health & (
+        (projects["schedule_status"] != metrics["schedule_status"])
+        | (projects["budget_status"] != metrics["budget_status"])
+    )
+    missing = ~has_health
+
+    updates = [
+        {"id": int(row_id), "schedule_status": schedule, "budget_status": budget}
+        for row_id, schedule, budget in zip(
+            health_id[changed], metrics["schedule_status"][changed], metrics["budget_status"][changed]
+        )
+    ]
+    inserts = [
+        {"project_id": int(project_id), "schedule_status": schedule, "budget_status": budget}
+        for project_id, schedule, budget in zip(
+            metrics["project_id"][missing], metrics["schedule_status"][missing], metrics["budget_status"][missing]
+        )
+    ]
+    if updates:
+        db.execute(update(models.ProjectHealth), updates)
+    if inserts:
+        db.execute(insert(models.ProjectHealth), inserts)
+    return metrics["project_id"][changed | missing].tolist()
+
+def recalculate(db: Session, project_ids: Optional[list[int]] = None, today: Optional[date] = None):
+    """Load, compute and write back health statuses. Returns (metrics, changed project ids); no commit"""
+    projects = load_project_columns(db, project_ids)
+    tasks = load_task_columns(db, project_ids)
+    metrics = compute(projects, tasks, today)
+    return metrics, apply_health(db, projects, metrics)
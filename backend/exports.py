@@ -0,0 +1,223 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+
+import openpyxl
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, select
+import models, database
+
+# Rows fetched from the database cursor per round-trip
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+# Bytes per response chunk
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+FORMATS = ("xlsx", "csv")
+
+class Export(NamedTuple):
+    name: str
+    title: str # Sheet title
+    columns: tuple # (header, column) pairs, in output order
+    query: Callable # (columns, project_id) -> select of the columns
+
+def _project_rows(model, *order_by):
+    def query(columns, project_id):
+        return select(*columns).where(model.project_id == project_id).order_by(*order_by, model.id)
+    return query
+
+_payment_totals = (
+    select(
+        models.PaymentSchedule.project_id,
+        func.sum(models.PaymentSchedule.planned_amount).label("planned"),
+        func.sum(models.PaymentSchedule.paid_amount).label("paid"),
+    )
+    .group_by(models.PaymentSchedule.project_id)
+    .subquery()
+)
+
+def _portfolio_query(columns, project_id=None):
+    return select(*columns).outerjoin(
+        _payment_totals, _payment_totals.c.project_id == models.Project.id
+    ).order_by(models.Project.id)
+
+# Payment and task headers match importers.PAYMENT_HEADERS / TASK_HEADERS, so an export re-imports
+# with its payment state and task hierarchy (ID / Parent ID); task dependencies are not exported
+EXPORTS = {
+    "payments": Export("payments", "Payment Schedule", (
+        ("Deliverable", models.PaymentSchedule.deliverable),
+        ("Phase", models.PaymentSchedule.phase),
+        ("Plan Date", models.PaymentSchedule.plan_date),
+        ("Planned Amount", models.PaymentSchedule.planned_amount),
+        ("Category", models.PaymentSchedule.category),
+        ("Remarks", models.PaymentSchedule.remark),
+        ("Status", models.PaymentSchedule.status),
+        ("Paid Amount", models.PaymentSchedule.paid_amount),
+        ("Payment Date", models.PaymentSchedule.payment_date),
+        ("PO Number", models.PaymentSchedule.po_number),
+        ("Invoice Number", models.PaymentSchedule.invoice_number),
+    ), _project_rows(models.PaymentSchedule, models.PaymentSchedule.plan_date)),
+    "tasks": Export("tasks", "Tasks", (
+        ("ID", models.ProjectTask.id),
+        ("Parent ID", models.ProjectTask.parent_id),
+        ("Task Name", models.ProjectTask.task_name),
+        ("Start Date", models.ProjectTask.start_date),
+        ("End Date", models.ProjectTask.end_date),
+        ("Duration", models.ProjectTask.duration),
+        ("% Complete", models.ProjectTask.completion_percentage),
+        ("Status", models.ProjectTask.status),
+        ("Completion Date", models.ProjectTask.completion_date),
+    ), _project_rows(models.ProjectTask)),
+    "matters": Export("matters", "Matters Arising", (
+        ("Date Raised", models.MattersArising.date_raised),
+        ("Matter Arising", models.MattersArising.issue_description),
+        ("Level", models.MattersArising.level),
+        ("Action / Updates", models.MattersArising.action_updates),
+        ("PIC", models.MattersArising.pic),
+        ("Target Date", models.MattersArising.target_date),
+        ("Status", models.MattersArising.status),
+        ("Date Closed", models.MattersArising.date_closed),
+        ("Remarks", models.MattersArising.remarks),
+    ), _project_rows(models.MattersArising, models.MattersArising.date_raised)),
+    "portfolio": Export("portfolio", "Portfolio", (
+        ("Project Code", models.Project.project_code),
+        ("Project Name", models.Project.name),
+        ("Project Manager", models.Project.project_manager),
+        ("Status", models.Project.status),
+        ("Start Date", models.Project.start_date),
+        ("End Date", models.Project.end_date),
+        ("Progress %", models.Project.progress_percentage),
+        ("Tasks", models.Project.task_count),
+        ("Completed Tasks", models.Project.completed_task_count),
+        ("Planned Cost", models.Project.planned_cost),
+        ("Actual Cost", models.Project.actual_cost),
+        ("Payments Planned", func.coalesce(_payment_totals.c.planned, 0.0)),
+        ("Payments Paid", func.coalesce(_payment_totals.c.paid, 0.0)),
+    ), _portfolio_query),
+}
+PROJECT_EXPORTS = ("payments", "tasks", "matters")
+
+def _statement(export: Export, project_id: Optional[int]):
+    return export.query([column for _, column in export.columns], project_id)
+
+def count_rows(export: Export, project_id: Optional[int] = None, engine=None) -> int:
+    with (engine or database.engine).connect() as conn:
+        return conn.execute(select(func.count()).select_from(_statement(export, project_id).subquery())).scalar()
+
+def iter_rows(export: Export, project_id: Optional[int] = None, engine=None, progress: Optional[Callable] = None):
+    """
+    Rows straight off a server-side cursor (a lazily stepped statement on SQLite),
+    a batch at a time; progress(rows_so_far) is called after each batch.
+    """
+    done = 0
+    with (engine or database.engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_ROWS).execute(_statement(export, project_id))
+        for partition in result.partitions():
+            yield from partition
+            done += len(partition)
+            if progress:
+                progress(done)
+
+def stream_csv(export: Export, project_id: Optional[int] = None, engine=None, progress: Optional[Callable] = None):
+    buffer = io.StringIO()
+    buffer.write("\ufeff") # BOM, so Excel opens the file as UTF-8
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in export.columns])
+    for row in iter_rows(export, project_id, engine, progress):
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def _discard_sheet(sheet):
+    """Remove the write-only sheet's spool file if saving never consumed it (e.g. a failed query)"""
+    writer = sheet._writer
+    if writer is not None and os.path.exists(writer.out):
+        writer.close()
+        writer.cleanup()
+
+def stream_xlsx(export: Export, project_id: Optional[int] = None, engine=None, progress: Optional[Callable] = None):
+    """
+    Rows go through a write_only sheet, which spools its XML to disk, so memory
+    stays flat. The zip can only be written once the sheet is complete; it goes
+    to an unlinked temporary file (nothing to leak) and is streamed from there.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(export.title)
+    try:
+        sheet.append([header for header, _ in export.columns])
+        for row in iter_rows(export, project_id, engine, progress):
+            sheet.append(tuple(row))
+        with tempfile.TemporaryFile() as archive:
+            workbook.save(archive)
+            archive.seek(0)
+            while chunk := archive.read(EXPORT_CHUNK_BYTES):
+                yield chunk
+    finally:
+        _discard_sheet(sheet)
+
+def attachment(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+def check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+def download_name(export: Export, fmt: str, project_id: Optional[int] = None) -> str:
+    scope = f"project_{project_id}_" if project_id is not None else ""
+    return f"{scope}{export.name}_{date.today().isoformat()}.{fmt}"
+
+def media_type(fmt: str) -> str:
+    return CSV_MEDIA_TYPE if fmt == "csv" else XLSX_MEDIA_TYPE
+
+def write_file(path: str, export: Export, fmt: str, project_id: Optional[int] = None, progress: Optional[Callable] = None):
+    """Write an export to disk (for background jobs); a partial file is removed on failure"""
+    stream = stream_csv if fmt == "csv" else stream_xlsx
+    try:
+        with open(path, "wb") as out:
+            for chunk in stream(export, project_id, progress=progress):
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+def export_response(export: Export, fmt: str, project_id: Optional[int] = None) -> StreamingResponse:
+    """Streamed download; the generator runs in the threadpool with its own connection"""
+    check_format(fmt)
+    stream = stream_csv if fmt == "csv" else stream_xlsx
+    headers = attachment(download_name(export, fmt, project_id))
+    return StreamingResponse(stream(export, project_id), media_type=media_type(fmt), headers=headers)
+
+# Import templates: built once per process and served from memory
+
+TEMPLATES = {
+    "payments": ("Payment Schedule Template", "payment_schedule_template.xlsx",
+                 ["Deliverable", "Phase", "Plan Date (YYYY-MM-DD)", "Planned Amount", "Category", "Remarks"],
+                 ["Milestone 1", "Phase 1", "2026-01-31", 5000.00, "Project Implementation", "Initial payment"]),
+    "tasks": ("Tasks Template", "task_template.xlsx",
+              ["Task Name", "Start Date (YYYY-MM-DD)", "End Date (YYYY-MM-DD)", "Status", "Completion %"],
+              ["Site survey", "2026-01-05", "2026-01-09", "Not Started", 0]),
+}
+
+@lru_cache(maxsize=None)
+def template_bytes(kind: str) -> bytes:
+    title, _, headers, sample = TEMPLATES[kind]
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = title
+    sheet.append(headers)
+    sheet.append(sample)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def template_response(kind: str) -> Response:
+    return Response(template_bytes(kind), media_type=XLSX_MEDIA_TYPE, headers=attachment(TEMPLATES[kind][1]))
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings shared by every deployment (the Dockerfile CMD passes -c gunicorn.conf.py).
+
+Prometheus multiprocess mode: each worker writes its metric samples to files under
+PROMETHEUS_MULTIPROC_DIR and /metrics merges them (see metrics.py). The variable is set
+here, in the master, so workers inherit it before they import prometheus_client.
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "pms-metrics"))
+
+def on_starting(server):
+    # Files left by a previous run would be merged into the new counters
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+def child_exit(server, worker):
+    # Drop the dead worker's in-flight gauge (counters and histograms keep its samples)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
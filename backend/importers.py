@@ -0,0 +1,338 @@
+from datetime import datetime, date
+from typing import Callable, Optional
+
+import openpyxl
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+import models, cashflow
+
+# Rows per executemany INSERT
+INSERT_CHUNK_ROWS = 2000
+
+PAYMENT_HEADERS = {
+    "deliverable": "deliverable",
+    "phase": "phase",
+    "plan date": "plan_date",
+    "plan date (yyyy-mm-dd)": "plan_date",
+    "planned amount": "planned_amount",
+    "category": "category",
+    "remarks": "remark",
+    "remark": "remark",
+    # Written by the payments export, so an exported schedule re-imports with its payment state
+    "status": "status",
+    "paid amount": "paid_amount",
+    "payment date": "payment_date",
+    "po number": "po_number",
+    "invoice number": "invoice_number",
+}
+# Legacy positional layout (Deliverable, Phase, Date, Amount, Remarks)
+PAYMENT_DEFAULT_COLUMNS = {"deliverable": 0, "phase": 1, "plan_date": 2, "planned_amount": 3, "remark": 4}
+
+def parse_date(raw) -> Optional[date]:
+    if not raw:
+        return None
+    if isinstance(raw, datetime):
+        return raw.date()
+    if isinstance(raw, date):
+        return raw
+    if isinstance(raw, str):
+        try:
+            return datetime.strptime(raw.strip(), "%Y-%m-%d").date()
+        except ValueError:
+            return None # Valid validation in real app needed
+    return None
+
+def header_columns(header_row, known_headers: dict, defaults: dict, required: str = "deliverable") -> dict:
+    """Map field name -> column index from a header row, falling back to the positional layout"""
+    columns = {}
+    for index, title in enumerate(header_row or ()):
+        field = known_headers.get(str(title).strip().lower()) if title is not None else None
+        if field and field not in columns:
+            columns[field] = index
+    return columns if required in columns else dict(defaults)
+
+def _cell(row, columns, field):
+    index = columns.get(field)
+    if index is None or index >= len(row):
+        return None
+    return row[index]
+
+def iter_payment_rows(rows, project_id: int, columns: dict):
+    """Turn worksheet value tuples into payment_schedule insert mappings"""
+    for row in rows:
+        if not row or not _cell(row, columns, "deliverable"): # Skip empty rows
+            continue
+        phase = _cell(row, columns, "phase")
+        planned_amount = _cell(row, columns, "planned_amount")
+        category = _cell(row, columns, "category")
+        remark = _cell(row, columns, "remark")
+        status = _cell(row, columns, "status")
+        paid_amount = _cell(row, columns, "paid_amount")
+        po_number = _cell(row, columns, "po_number")
+        invoice_number = _cell(row, columns, "invoice_number")
+        yield {
+            "project_id": project_id,
+            "category": str(category) if category else "Project Implementation",
+            "deliverable": str(_cell(row, columns, "deliverable")),
+            "phase": str(phase) if phase else None,
+            "plan_date": parse_date(_cell(row, columns, "plan_date")),
+            "planned_amount": float(planned_amount) if planned_amount else 0.0,
+            "paid_amount": float(paid_amount) if paid_amount else 0.0,
+            "status": str(status) if status else "Not Paid",
+            "remark": str(remark) if remark else None,
+            "payment_date": parse_date(_cell(row, columns, "payment_date")),
+            "po_number": str(po_number) if po_number else None,
+            "invoice_number": str(invoice_number) if invoice_number else None,
+        }
+
+def bulk_insert(db: Session, model, mappings, chunk_rows: int = INSERT_CHUNK_ROWS, progress: Optional[Callable] = None) -> int:
+    """executemany INSERT in fixed-size chunks; the caller owns the transaction"""
+    count = 0
+    chunk = []
+    for mapping in mappings:
+        chunk.append(mapping)
+        if len(chunk) >= chunk_rows:
+            db.execute(insert(model), chunk)
+            count += len(chunk)
+            chunk = []
+            if progress:
+                progress(count)
+    if chunk:
+        db.execute(insert(model), chunk)
+        count += len(chunk)
+    return count
+
+TASK_HEADERS = {
+    "task name": "task_name",
+    "name": "task_name",
+    "start": "start_date",
+    "start date": "start_date",
+    "start date (yyyy-mm-dd)": "start_date",
+    "finish": "end_date",
+    "finish date": "end_date",
+    "end": "end_date",
+    "end date": "end_date",
+    "end date (yyyy-mm-dd)": "end_date",
+    "duration": "duration",
+    "% complete": "completion_percentage",
+    "completion %": "completion_percentage",
+    "percent complete": "completion_percentage",
+    "status": "status",
+    "outline level": "outline_level",
+    "level": "outline_level",
+    "wbs": "wbs",
+    "outline number": "wbs",
+    # Written by the tasks export: the hierarchy as row ids
+    "id": "source_id",
+    "parent id": "source_parent_id",
+    "completion date": "completion_date",
+}
+# Frontend task template layout
+TASK_DEFAULT_COLUMNS = {"task_name": 0, "start_date": 1, "end_date": 2, "status": 3, "completion_percentage": 4}
+
+def parse_percentage(raw) -> int:
+    """Accept 50, 50.0 or "50%" (%-formatted cells are scaled by percent_rows first)"""
+    if raw is None or raw == "":
+        return 0
+    if isinstance(raw, str):
+        raw = raw.strip().rstrip("%").strip()
+        try:
+            raw = float(raw)
+        except ValueError:
+            return 0
+    value = float(raw)
+    return int(round(min(max(value, 0), 100)))
+
+def percent_rows(rows, column: Optional[int]):
+    """
+    Cell rows -> value rows, with a %-formatted number in the column scaled to 0-100.
+    Excel stores such cells as fractions (100% is 1), so only the number format tells
+    them apart from plain numbers like our own export's 1 for 1%.
+    """
+    for row in rows:
+        values = [cell.value for cell in row]
+        if column is not None and column < len(row):
+            value = values[column]
+            if isinstance(value, (int, float)) and "%" in (row[column].number_format or ""):
+                values[column] = value * 100
+        yield tuple(values)
+
+def task_status(raw, completion: int) -> str:
+    if raw:
+        return str(raw)
+    if completion >= 100:
+        return "Completed"
+    return "In Progress" if completion > 0 else "Not Started"
+
+def _source_key(raw) -> Optional[str]:
+    """Normalize an exported row id (5, 5.0 or "5") for matching"""
+    if raw in (None, ""):
+        return None
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)
+    return str(raw).strip()
+
+class TaskHierarchy:
+    """
+    Resolves each row's parent row in a single pass, from Outline Level (stack of open
+    ancestors) or, failing that, from WBS / Outline Number codes ("1.2.3" -> "1.2").
+    Workbooks with ID / Parent ID columns (the tasks export) link by those instead; a
+    parent listed after its child is linked once the whole sheet was read (deferred()).
+    """
+
+    def __init__(self):
+        self.level_stack = []
+        self.wbs_rows = {}
+        self.source_rows = {}
+        self.pending = []
+
+    def parent_by_id(self, row_index: int, source_id, source_parent) -> Optional[int]:
+        key = _source_key(source_id)
+        if key is not None:
+            self.source_rows[key] = row_index
+        parent_key = _source_key(source_parent)
+        if parent_key is None:
+            return None
+        parent = self.source_rows.get(parent_key)
+        if parent is None:
+            self.pending.append((row_index, parent_key))
+        return parent
+
+    def deferred(self) -> list:
+        """(child row, parent row) links whose parent came later in the sheet"""
+        return [
+            (child, self.source_rows[parent_key])
+            for child, parent_key in self.pending if parent_key in self.source_rows
+        ]
+
+    def parent_of(self, row_index: int, level, wbs) -> Optional[int]:
+        if level not in (None, ""):
+            try:
+                level = int(level)
+            except (TypeError, ValueError):
+                level = None
+        if isinstance(level, int):
+            while self.level_stack and self.level_stack[-1][0] >= level:
+                self.level_stack.pop()
+            parent = self.level_stack[-1][1] if self.level_stack else None
+            self.level_stack.append((level, row_index))
+            return parent
+        if wbs not in (None, ""):
+            code = str(wbs).strip()
+            self.wbs_rows[code] = row_index
+            if "." in code:
+                return self.wbs_rows.get(code.rsplit(".", 1)[0])
+        return None
+
+def iter_task_rows(rows, project_id: int, columns: dict, hierarchy: Optional[TaskHierarchy] = None):
+    """Yield (task insert mapping, parent row index) in sheet order"""
+    hierarchy = hierarchy or TaskHierarchy()
+    by_id = "source_parent_id" in columns
+    row_index = 0
+    for row in rows:
+        name = _cell(row, columns, "task_name") if row else None
+        if not name: # Skip empty rows
+            continue
+        completion = parse_percentage(_cell(row, columns, "completion_percentage"))
+        status = task_status(_cell(row, columns, "status"), completion)
+        duration = _cell(row, columns, "duration")
+        if by_id:
+            parent_index = hierarchy.parent_by_id(
+                row_index, _cell(row, columns, "source_id"), _cell(row, columns, "source_parent_id")
+            )
+        else:
+            parent_index = hierarchy.parent_of(
+                row_index, _cell(row, columns, "outline_level"), _cell(row, columns, "wbs")
+            )
+        yield {
+            "project_id": project_id,
+            "task_name": str(name).strip(),
+            "start_date": parse_date(_cell(row, columns, "start_date")),
+            "end_date": parse_date(_cell(row, columns, "end_date")),
+            "duration": str(duration) if duration not in (None, "") else None,
+            "completion_percentage": 100 if status == "Completed" else completion,
+            "completion_date": parse_date(_cell(row, columns, "completion_date")),
+            "status": status,
+            "parent_id": None,
+        }, parent_index
+        row_index += 1
+
+def data_rows(sheet) -> Optional[int]:
+    """Row count below the header from the sheet's stored dimensions (None if the file has none)"""
+    return sheet.max_row - 1 if sheet.max_row else None
+
+def import_task_workbook(path: str, project_id: int, db: Session, progress: Optional[Callable] = None):
+    """
+    Stream an MS-Project-style task workbook into project_tasks.
+    Rows are bulk inserted in chunks (RETURNING ids in parameter order) while an
+    in-memory row -> id map is filled; parent links are then set with one
+    executemany UPDATE. Nothing is committed: returns (count, completed_count).
+    progress(done, total) is called after each chunk.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        total = data_rows(wb.active)
+        rows = wb.active.iter_rows() # Cells, not values: the completion column needs its number format
+        header = next(rows, None)
+        columns = header_columns(
+            [cell.value for cell in header] if header else None, TASK_HEADERS, TASK_DEFAULT_COLUMNS, required="task_name"
+        )
+        rows = percent_rows(rows, columns.get("completion_percentage"))
+
+        task = models.ProjectTask
+        stmt = insert(task).returning(task.id, sort_by_parameter_order=True)
+        row_ids = []
+        links = []
+        completed_count = 0
+        chunk = []
+
+        def flush():
+            row_ids.extend(db.execute(stmt, chunk).scalars().all())
+            chunk.clear()
+            if progress:
+                progress(len(row_ids), total)
+
+        hierarchy = TaskHierarchy()
+        for mapping, parent_index in iter_task_rows(rows, project_id, columns, hierarchy):
+            if parent_index is not None:
+                links.append((len(row_ids) + len(chunk), parent_index))
+            if mapping["status"] == "Completed":
+                completed_count += 1
+            chunk.append(mapping)
+            if len(chunk) >= INSERT_CHUNK_ROWS:
+                flush()
+        if chunk:
+            flush()
+
+        links.extend(hierarchy.deferred())
+        if links:
+            db.execute(
+                update(task),
+                [{"id": row_ids[child], "parent_id": row_ids[parent]} for child, parent in links],
+            )
+        return len(row_ids), completed_count
+    finally:
+        wb.close()
+
+def import_payment_workbook(path: str, project_id: int, db: Session, progress: Optional[Callable] = None) -> int:
+    """
+    Stream a payment workbook (read_only mode) into payment_schedule with chunked
+    bulk inserts and a cash-flow rollup refresh in one transaction.
+    Blocking: run it off the event loop. progress(done, total) is called after each chunk.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        total = data_rows(wb.active)
+        rows = wb.active.iter_rows(values_only=True)
+        columns = header_columns(next(rows, None), PAYMENT_HEADERS, PAYMENT_DEFAULT_COLUMNS)
+        chunk_progress = (lambda done: progress(done, total)) if progress else None
+        try:
+            count = bulk_insert(db, models.PaymentSchedule, iter_payment_rows(rows, project_id, columns), progress=chunk_progress)
+            cashflow.refresh_project(db, project_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return count
+    finally:
+        wb.close()
@@ -0,0 +1,415 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+import models, database
+
+# Job runner settings (override via environment)
+# Jobs run concurrently per API process; 0 makes this process enqueue only
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# A running job whose runner has not written a heartbeat for this long is requeued (its process died)
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+# Uploads and generated files; must be shared by all workers (and survive restarts for durability)
+JOB_FILES_DIR = os.getenv("JOB_FILES_DIR", os.path.join(tempfile.gettempdir(), "pms-jobs"))
+# Progress and heartbeat writes are best effort: on SQLite they give up quickly rather than
+# queue behind a long import transaction (the job's own process still serves live progress)
+JOB_PROGRESS_INTERVAL = 1.0
+JOB_PROGRESS_BUSY_TIMEOUT_MS = 100
+PRUNE_INTERVAL_SECONDS = 3600
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a handler (from JobContext.progress) once cancellation was requested"""
+
+class JobLost(Exception):
+    """Raised on a handler's commit when another runner took the job over (it was requeued as stale)"""
+
+class Handler(NamedTuple):
+    run: Callable # (job: JobContext, db: Session) -> Optional[dict] result
+    submittable: bool # Accepts JSON params through POST /api/jobs (imports need an upload instead)
+    validate: Optional[Callable] # params -> None, raising ValueError
+
+HANDLERS = {}
+
+def handler(kind: str, submittable: bool = True, validate: Optional[Callable] = None):
+    """Register the function that runs jobs of this kind"""
+    def register(fn):
+        HANDLERS[kind] = Handler(fn, submittable, validate)
+        return fn
+    return register
+
+def _remove(path: Optional[str]):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+class JobContext:
+    """What a handler sees of its job: params, files, and progress reporting"""
+
+    def __init__(self, runner: "JobRunner", job: models.Job):
+        self.runner = runner
+        self.id = job.id
+        self.kind = job.kind
+        self.params = job.params or {}
+        self.project_id = job.project_id
+        self.input_path = job.input_path
+        self.attempt = job.attempts
+        self.output_path = None
+        self._reported = 0.0
+
+    def output(self, suffix: str) -> str:
+        """Path for the job's result file, served by /api/jobs/{id}/download (one per attempt)"""
+        self.output_path = os.path.join(JOB_FILES_DIR, f"job-{self.id}-{self.attempt}{suffix}")
+        return self.output_path
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Report progress (cheap; call as often as convenient). Raises JobCancelled when asked to stop."""
+        percent = min(99, int(done * 100 / total)) if total else None
+        if message is None:
+            message = f"{done} of {total}" if total else f"{done} done"
+        self.runner.live[self.id] = (percent, message)
+        now = time.monotonic()
+        if now - self._reported < JOB_PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        if self.runner.cancel_requested(self.id):
+            raise JobCancelled()
+        self.runner.record_progress(self.id, self.attempt, percent, message)
+
+class JobRunner:
+    """
+    Polls the jobs table and runs claimed jobs on a thread pool. Every API process
+    runs one; a claim is a conditional UPDATE (queued -> running), so each job runs
+    once however many processes poll. Jobs survive restarts: queued rows are picked
+    up again, and running rows whose heartbeat stopped are requeued up to
+    JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_seconds: float = JOB_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.live = {} # job id -> (percent, message) for jobs running in this process
+        self.cancelled = set() # Live jobs asked to stop through this process
+        self._executor = None
+        self._thread = None
+        self._slots = threading.Semaphore(max(workers, 0))
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._progress_engine = None
+        self._pruned = 0.0
+        self._recovered = 0.0
+        self._beat = 0.0
+
+    # Lifecycle
+
+    def start(self):
+        if self.workers <= 0 or self._thread is not None:
+            return
+        os.makedirs(JOB_FILES_DIR, exist_ok=True)
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        # Running jobs finish in the background; if the process exits first they are requeued as stale
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def wake(self):
+        """Look for work now instead of at the next poll"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                self._housekeeping()
+                while self._slots.acquire(blocking=False):
+                    job = self._claim()
+                    if job is None:
+                        self._slots.release()
+                        break
+                    self._executor.submit(self._run, job)
+            except Exception:
+                logger.exception("Job runner poll failed")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    # Queue operations (run on the runner thread or job threads)
+
+    def _claim(self) -> Optional[models.Job]:
+        job = models.Job
+        while True:
+            with Session(database.engine) as db:
+                job_id = db.execute(
+                    select(job.id).where(job.status == QUEUED).order_by(job.id).limit(1)
+                ).scalar()
+                if job_id is None:
+                    return None
+                now = datetime.utcnow()
+                claimed = db.execute(
+                    update(job)
+                    .where(job.id == job_id, job.status == QUEUED)
+                    .values(
+                        status=RUNNING, worker=self.worker_id, attempts=job.attempts + 1,
+                        started_at=now, heartbeat_at=now, progress=0, message=None, error=None,
+                    )
+                ).rowcount
+                db.commit()
+                if claimed: # Otherwise another process got it first; try the next one
+                    return db.get(job, job_id)
+
+    def _run(self, job: models.Job):
+        context = JobContext(self, job)
+        self.live[job.id] = (0, "Running")
+        db = database.SessionLocal()
+        event.listen(db, "before_commit", lambda session: self._confirm_owner(session, job.id, context.attempt))
+        try:
+            definition = HANDLERS.get(job.kind)
+            if definition is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            result = definition.run(context, db)
+            self._finish(job.id, context.attempt, SUCCEEDED, progress=100, result=result, output_path=context.output_path)
+        except JobLost:
+            db.rollback()
+            _remove(context.output_path)
+            logger.warning("Job %s (%s) was requeued while running here; this attempt was rolled back", job.id, job.kind)
+        except JobCancelled:
+            db.rollback()
+            _remove(context.output_path)
+            self._finish(job.id, context.attempt, CANCELLED, message="Cancelled")
+        except Exception as e:
+            db.rollback()
+            _remove(context.output_path)
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            self._finish(job.id, context.attempt, FAILED, error=str(e) or type(e).__name__)
+        finally:
+            db.close()
+            self.live.pop(job.id, None)
+            self.cancelled.discard(job.id)
+            self._slots.release()
+            self._wake.set()
+
+    def _confirm_owner(self, session: Session, job_id: int, attempt: int):
+        """
+        Before every commit of a handler's session: check, in the same transaction, that this
+        attempt still owns the job, and refresh its heartbeat. The attempt number matters when
+        a requeued job is claimed again by this same runner. On SQLite a long import blocks the
+        best-effort heartbeats, so the job can look stale; a requeue that got in first makes the
+        commit fail (the next attempt redoes the work), and one still waiting for the write lock
+        finds a fresh heartbeat once this commit releases it. Either way the work lands once.
+        """
+        job = models.Job
+        owned = session.execute(
+            update(job)
+            .where(job.id == job_id, job.worker == self.worker_id, job.attempts == attempt, job.status == RUNNING)
+            .values(heartbeat_at=datetime.utcnow())
+        ).rowcount
+        if not owned:
+            raise JobLost(f"Job {job_id} attempt {attempt} is no longer the running one")
+
+    def _finish(self, job_id: int, attempt: int, status: str, **values):
+        job = models.Job
+        with Session(database.engine) as db:
+            finished = db.execute(
+                update(job)
+                .where(job.id == job_id, job.worker == self.worker_id, job.attempts == attempt, job.status == RUNNING)
+                .values(status=status, finished_at=datetime.utcnow(), **values)
+            ).rowcount
+            db.commit()
+            if not finished: # Requeued (or cancelled away) meanwhile: the row belongs to another attempt
+                logger.warning("Job %s ended as %s after it was taken over; result not recorded", job_id, status)
+                _remove(values.get("output_path"))
+                return
+            if status in (SUCCEEDED, CANCELLED): # Failed jobs keep their upload for a retry
+                _remove(db.get(job, job_id).input_path)
+
+    def _best_effort(self, statement) -> bool:
+        """A bookkeeping write that is skipped if the database is busy (see JOB_PROGRESS_BUSY_TIMEOUT_MS)"""
+        if self._progress_engine is None:
+            if database.is_sqlite(database.SQLALCHEMY_DATABASE_URL):
+                self._progress_engine = database.build_engine(busy_timeout_ms=JOB_PROGRESS_BUSY_TIMEOUT_MS)
+            else:
+                self._progress_engine = database.engine
+        try:
+            with self._progress_engine.begin() as conn:
+                conn.execute(statement)
+            return True
+        except OperationalError:
+            return False
+
+    def record_progress(self, job_id: int, attempt: int, percent: Optional[int], message: Optional[str]):
+        values = {"message": message, "heartbeat_at": datetime.utcnow()}
+        if percent is not None:
+            values["progress"] = percent
+        job = models.Job
+        self._best_effort(update(job).where(job.id == job_id, job.attempts == attempt).values(**values))
+
+    def cancel_requested(self, job_id: int) -> bool:
+        if job_id in self.cancelled:
+            return True
+        with database.engine.connect() as conn:
+            return bool(conn.execute(select(models.Job.cancel_requested).where(models.Job.id == job_id)).scalar())
+
+    def _housekeeping(self):
+        now = time.monotonic()
+        if self.live and now - self._beat >= JOB_STALE_SECONDS / 10:
+            self._beat = now
+            self._best_effort(
+                update(models.Job).where(models.Job.id.in_(list(self.live))).values(heartbeat_at=datetime.utcnow())
+            )
+        if now - self._recovered >= JOB_STALE_SECONDS / 2:
+            self._recovered = now
+            with Session(database.engine) as db:
+                requeue_stale(db)
+        if now - self._pruned >= PRUNE_INTERVAL_SECONDS:
+            self._pruned = now
+            with Session(database.engine) as db:
+                prune(db)
+
+    def metrics(self) -> dict:
+        return {"worker": self.worker_id, "workers": self.workers, "running": sorted(self.live)}
+
+runner = JobRunner()
+
+# API-side operations (sync session; callers run them in the threadpool)
+
+def submit(db: Session, kind: str, params: Optional[dict] = None, project_id: Optional[int] = None,
+           input_path: Optional[str] = None) -> models.Job:
+    """Queue a job (commits); ValueError for an unknown kind or bad params"""
+    definition = HANDLERS.get(kind)
+    if definition is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if definition.validate:
+        definition.validate(params or {})
+    job = models.Job(kind=kind, status=QUEUED, params=params or {}, project_id=project_id, input_path=input_path)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+    return job
+
+def cancel(db: Session, job: models.Job) -> models.Job:
+    """
+    Queued jobs are cancelled at once; running ones stop at their next progress report, and
+    their owning runner records the status. ValueError (409) if the job can't be flagged yet.
+    """
+    if job.status in FINISHED:
+        raise ValueError(f"Job already {job.status}")
+    if job.status == QUEUED:
+        try:
+            dropped = db.execute(
+                update(models.Job)
+                .where(models.Job.id == job.id, models.Job.status == QUEUED)
+                .values(status=CANCELLED, finished_at=datetime.utcnow(), message="Cancelled")
+            ).rowcount
+            db.commit()
+        except OperationalError: # SQLite write lock held by a running import
+            db.rollback()
+            raise ValueError("The database is busy; try cancelling again in a moment")
+        db.refresh(job)
+        if dropped:
+            _remove(job.input_path)
+            return job
+        if job.status in FINISHED:
+            raise ValueError(f"Job already {job.status}")
+    # Running: on SQLite the job's own import transaction may hold the write lock, so the
+    # flag is a best-effort write; a job running here is also flagged in memory
+    if job.id in runner.live:
+        runner.cancelled.add(job.id)
+    flagged = runner._best_effort(update(models.Job).where(models.Job.id == job.id).values(cancel_requested=1))
+    if not flagged and job.id not in runner.cancelled:
+        raise ValueError("The job is busy writing; try cancelling again in a moment")
+    db.expire(job)
+    job.cancel_requested = 1
+    return job
+
+def retry(db: Session, job: models.Job) -> models.Job:
+    """Queue a failed or cancelled job again with the same params (and upload, if still present)"""
+    if job.status not in (FAILED, CANCELLED):
+        raise ValueError(f"Only failed or cancelled jobs can be retried (job is {job.status})")
+    if job.input_path and not os.path.exists(job.input_path):
+        raise ValueError("The uploaded file for this job is no longer available; upload it again")
+    job.status = QUEUED
+    job.attempts = 0
+    job.cancel_requested = 0
+    job.progress = 0
+    job.message = job.error = job.result = None
+    job.started_at = job.finished_at = None
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+    return job
+
+def view(job: models.Job) -> models.Job:
+    """Overlay live progress when the job runs in this process (its DB row may lag on SQLite)"""
+    live = runner.live.get(job.id)
+    if live and job.status == RUNNING:
+        percent, message = live
+        if percent is not None:
+            job.progress = percent
+        job.message = message
+    return job
+
+def requeue_stale(db: Session, stale_seconds: int = JOB_STALE_SECONDS):
+    """Put back jobs whose runner stopped heartbeating (process killed mid-job), or fail them after too many attempts"""
+    job = models.Job
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    stale = (job.status == RUNNING, job.heartbeat_at < cutoff)
+    db.execute(update(job).where(*stale, job.attempts < JOB_MAX_ATTEMPTS).values(status=QUEUED, worker=None))
+    db.execute(
+        update(job).where(*stale).values(
+            status=FAILED, finished_at=datetime.utcnow(), error="Worker stopped responding",
+        )
+    )
+    db.commit()
+
+def prune(db: Session, retention_days: int = JOB_RETENTION_DAYS):
+    """Delete finished jobs past retention along with their files"""
+    job = models.Job
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    expired = db.execute(
+        select(job.id, job.input_path, job.output_path).where(job.status.in_(FINISHED), job.finished_at < cutoff)
+    ).all()
+    for _, input_path, output_path in expired:
+        _remove(input_path)
+        _remove(output_path)
+    if expired:
+        db.execute(delete(job).where(job.id.in_([row[0] for row in expired])))
+        db.commit()
+
+async def store_upload(file, suffix: str = ".xlsx") -> str:
+    """Copy an UploadFile into JOB_FILES_DIR in fixed-size chunks; returns the path"""
+    os.makedirs(JOB_FILES_DIR, exist_ok=True)
+    path = os.path.join(JOB_FILES_DIR, f"upload-{uuid.uuid4().hex}{suffix}")
+    with open(path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            out.write(chunk)
+    return path
@@ -0,0 +1,145 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+import models
+
+# Loader strategies per relationship.
+# health is one-to-one so it rides along on the main SELECT (joined),
+# the one-to-many collections are fetched with one IN (...) query each (selectin).
+PROJECT_LIST_OPTIONS = (
+    joinedload(models.Project.health),
+    selectinload(models.Project.payments),
+    selectinload(models.Project.tasks),
+)
+
+PROJECT_DETAILS_OPTIONS = PROJECT_LIST_OPTIONS + (
+    selectinload(models.Project.matters),
+)
+
+def project_list_query(db: Session):
+    """Project query that loads health, payments and tasks in a fixed number of queries"""
+    return db.query(models.Project).options(*PROJECT_LIST_OPTIONS)
+
+def project_details_query(db: Session):
+    """Project query that also loads matters for the details view"""
+    return db.query(models.Project).options(*PROJECT_DETAILS_OPTIONS)
+
+def _ordered(query, criteria, keyset):
+    if criteria:
+        query = query.filter(*criteria)
+    if keyset is not None:
+        return keyset.apply(query)
+    return query.order_by(models.Project.id)
+
+def load_projects(db: Session, *criteria, keyset=None):
+    """Load projects (optionally filtered/paged) with all list relationships eager-loaded"""
+    return _ordered(project_list_query(db), criteria, keyset).all()
+
+# Column projections (no relationship tables are touched)
+PROJECT_COLUMNS = {column.name: column for column in models.Project.__table__.columns}
+PROJECT_SUMMARY_FIELDS = (
+    "id", "name", "project_code", "project_manager", "assigned_to_email", "status",
+    "progress_percentage", "start_date", "end_date", "planned_cost", "actual_cost",
+)
+
+def parse_project_fields(fields: str):
+    """Split a ?fields= value into known project column names (id is always included)"""
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in PROJECT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown project field(s): {', '.join(unknown)}")
+    return ["id"] + [name for name in requested if name != "id"]
+
+def load_project_rows(db: Session, field_names, *criteria, keyset=None):
+    """Load only the given project columns as plain dicts"""
+    query = db.query(*[PROJECT_COLUMNS[name] for name in field_names])
+    return [dict(row._mapping) for row in _ordered(query, criteria, keyset)]
+
+# Async loaders (same statements, executed on an AsyncSession)
+async def load_projects_async(db: AsyncSession, *criteria, keyset=None):
+    stmt = _ordered(select(models.Project).options(*PROJECT_LIST_OPTIONS), criteria, keyset)
+    result = await db.execute(stmt)
+    return list(result.unique().scalars().all())
+
+async def load_project_rows_async(db: AsyncSession, field_names, *criteria, keyset=None):
+    stmt = _ordered(select(*[PROJECT_COLUMNS[name] for name in field_names]), criteria, keyset)
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+async def load_project_details_async(db: AsyncSession, project_id: int):
+    stmt = select(models.Project).options(*PROJECT_DETAILS_OPTIONS).filter(models.Project.id == project_id)
+    result = await db.execute(stmt)
+    return result.unique().scalars().first()
+
+# Keyset pagination and filters
+PROJECT_SORTABLE = {
+    "id": models.Project.id,
+    "name": models.Project.name,
+    "start_date": models.Project.start_date,
+    "end_date": models.Project.end_date,
+}
+
+USER_SORTABLE = {
+    "id": models.User.id,
+    "email": models.User.email,
+}
+
+def project_filter_criteria(
+    status: Optional[list[str]] = None,
+    assigned_to_email: Optional[str] = None,
+    project_code: Optional[str] = None,
+    start_from: Optional[date] = None,
+    start_to: Optional[date] = None,
+    end_from: Optional[date] = None,
+    end_to: Optional[date] = None,
+):
+    """Translate list filters into WHERE criteria (each backed by an index on projects)"""
+    project = models.Project
+    criteria = []
+    if status:
+        criteria.append(project.status.in_(status))
+    if assigned_to_email:
+        criteria.append(project.assigned_to_email == assigned_to_email)
+    if project_code:
+        criteria.append(project.project_code == project_code)
+    if start_from:
+        criteria.append(project.start_date >= start_from)
+    if start_to:
+        criteria.append(project.start_date <= start_to)
+    if end_from:
+        criteria.append(project.end_date >= end_from)
+    if end_to:
+        criteria.append(project.end_date <= end_to)
+    return criteria
+
+# Delta sync: rows stamped with a version newer than the client's
+SYNC_MODELS = {
+    "projects": models.Project,
+    "tasks": models.ProjectTask,
+    "payments": models.PaymentSchedule,
+    "matters": models.MattersArising,
+}
+
+async def load_changes_async(db: AsyncSession, since: int, project_id: Optional[int] = None):
+    """Changed rows per synced table plus tombstones, each read through the version index"""
+    changes = {}
+    for key, model in SYNC_MODELS.items():
+        # since=0 is a full snapshot, including rows stamped before versioning existed
+        stmt = select(model).filter(model.version > since) if since else select(model)
+        if project_id is not None:
+            owner = model.id if model is models.Project else model.project_id
+            stmt = stmt.filter(owner == project_id)
+        result = await db.execute(stmt.order_by(model.version, model.id))
+        changes[key] = list(result.scalars().all())
+
+    changes["deleted"] = []
+    if since:
+        stmt = select(models.Tombstone).filter(models.Tombstone.version > since)
+        if project_id is not None:
+            stmt = stmt.filter(models.Tombstone.project_id == project_id)
+        result = await db.execute(stmt.order_by(models.Tombstone.version, models.Tombstone.id))
+        changes["deleted"] = list(result.scalars().all())
+    return changes
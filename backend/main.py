@@ -1,24 +1,60 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Query, Request, Response, WebSocket
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import bcrypt
+from starlette.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, date
 from typing import Optional
-import openpyxl
-from io import BytesIO
-import tempfile
+from contextlib import asynccontextmanager
 import os
+import uuid
 
-import models, schemas, database
+import models, schemas, database, loaders, portfolio, pagination, migrations, progress, batch, importers, versioning, cache, events, opex, cashflow, evm, scheduling, search, passwords, principals, exports, jobs, metrics
 
 # Create tables
 models.Base.metadata.create_all(bind=database.engine)
 
+# Add columns and indexes introduced after the tables already existed
+_added_columns = migrations.add_missing_columns(database.engine, models.Base.metadata)
+migrations.create_missing_indexes(database.engine, models.Base.metadata)
 
-app = FastAPI()
+# Data version tracking for ETag / conditional GET and delta sync
+versioning.ensure_scopes(database.engine)
+versioning.install()
+
+with database.SessionLocal() as _db:
+    cashflow.ensure_backfilled(_db)
+
+# Full-text index over projects, tasks, matters and payments
+search.install(database.engine)
+
+# Per-request SQL statement counts and pool checkout timing for /metrics
+metrics.instrument_engine(database.engine, "sync")
+metrics.instrument_engine(database.async_engine.sync_engine, "async")
+
+if ("projects", "task_count") in _added_columns:
+    with database.SessionLocal() as _db:
+        progress.rebuild_task_counters(_db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Per-worker change event fan-out for /ws/projects
+    await events.broker.start()
+    # bcrypt runs in its own process pool, off the request threadpool
+    passwords.hasher.start()
+    # Background jobs (imports, exports, recalculations) from the durable queue
+    jobs.runner.start()
+    yield
+    jobs.runner.stop()
+    passwords.hasher.stop()
+    await events.broker.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS Setup
 origins = ["*"]
@@ -29,23 +65,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
+# Outermost, so latency includes every other middleware
+app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+
+@app.exception_handler(passwords.HasherBusy)
+async def hasher_busy_handler(request: Request, exc: passwords.HasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # Security Config
 SECRET_KEY = "supersecretkey" # Change this in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Helper Functions
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-
-def get_password_hash(password):
-    # Hash password using bcrypt
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -53,50 +92,89 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex) # Identifies the token for caching and revocation
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def recalculate_project_progress(project_id: int, db: Session):
-    """Calculate project progress based on completed tasks"""
-    tasks = db.query(models.ProjectTask).filter(models.ProjectTask.project_id == project_id).all()
-    if not tasks:
-        progress = 0
-    else:
-        completed = [t for t in tasks if t.status == "Completed"]
-        progress = int((len(completed) / len(tasks)) * 100)
-    
-    db.query(models.Project).filter(models.Project.id == project_id).update({"progress_percentage": progress})
-    db.query(models.Project).filter(models.Project.id == project_id).update({"progress_percentage": progress})
-    db.commit()
+def make_keyset(sortable: dict, id_column, sort: str, cursor: Optional[str], limit: Optional[int]):
+    """Keyset pagination params, rejecting bad sort/cursor/limit with 400"""
+    try:
+        return pagination.Keyset(sortable, id_column, sort, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def apply_project_batch(db: Session, project_id: int, model, items, **kwargs):
+    """Validate and apply a create/update/delete batch for a project's child rows (no commit)"""
+    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not db_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if batch.batch_size(items) > batch.MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {batch.MAX_BATCH_ITEMS} items)")
+    return batch.apply_batch(db, project_id, model, items, **kwargs)
+
+async def conditional_get(request: Request, db: AsyncSession, scope: str):
+    """Cache headers for a scope's current data version, and whether the client copy is still fresh"""
+    version, updated_at = await versioning.read_version(db, scope)
+    headers = versioning.cache_headers(versioning.etag_for(scope, version), updated_at)
+    return headers, versioning.is_not_modified(request, headers["ETag"], updated_at)
+
+def project_changed(project_id: int, entity: str, action: str, ids=()):
+    """Call after commit: drop the project's cached reads and broadcast a change event"""
+    cache.project_cache.invalidate(project_id)
+    events.broker.publish(events.change_event(entity, action, project_id, ids))
+
+def batch_ids(results):
+    return [result.id for result in results if result.status == "ok"]
+
+def reschedule_successors(db: Session, project_id: int, task_ids) -> list[int]:
+    """Push dependent tasks after a date or link change (no commit); a cycle rolls back with 400"""
+    try:
+        return scheduling.reschedule(db, project_id, task_ids)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Auth Dependency
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str = Depends(oauth2_scheme)) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    payload["jti"] = principals.token_id(payload, token)
+    return payload
+
+async def get_current_user(
+    payload: dict = Depends(decode_token),
+    db: AsyncSession = Depends(database.get_async_db)
+) -> principals.Principal:
+    """The token's user; served from the principal cache without a query in the common case"""
+    principal = await principals.principal_cache.resolve(db, payload["sub"], payload["jti"])
+    if principal is None:
+        raise credentials_exception()
+    return principal
 
 # Routes
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
 @app.post("/users", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
+    db_user = await get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await passwords.hasher.hash(user.password)
     db_user = models.User(
         email=user.email, 
         password_hash=hashed_password,
@@ -104,42 +182,61 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @app.get("/api/users", response_model=list[schemas.User])
-def get_users(db: Session = Depends(database.get_db)):
-    """Get all users (for admin management)"""
-    users = db.query(models.User).all()
-    return users
+async def get_users(
+    request: Request,
+    response: Response,
+    role: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Get all users (for admin management), optionally filtered and paged with ?limit=&cursor="""
+    keyset = make_keyset(loaders.USER_SORTABLE, models.User.id, sort, cursor, limit)
+    headers, fresh = await conditional_get(request, db, "users")
+    if fresh:
+        return versioning.not_modified_response(headers)
+    stmt = select(models.User)
+    if role:
+        stmt = stmt.filter(models.User.role == role)
+    result = await db.execute(keyset.apply(stmt))
+    users, next_cursor = keyset.paginate(list(result.scalars().all()))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return versioning.apply_headers(users, response, headers)
 
 @app.put("/api/users/me/password")
-def update_password(
+async def update_password(
     pass_update: schemas.UserPasswordUpdate, 
-    current_user: models.User = Depends(get_current_user), 
-    db: Session = Depends(database.get_db)
+    current_user: principals.Principal = Depends(get_current_user), 
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Change current user's password"""
-    if not verify_password(pass_update.old_password, current_user.password_hash):
+    db_user = await db.get(models.User, current_user.id)
+    if not db_user or not await passwords.hasher.verify(pass_update.old_password, db_user.password_hash):
          raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    current_user.password_hash = get_password_hash(pass_update.new_password)
-    db.commit()
-    db.commit()
+    db_user.password_hash = await passwords.hasher.hash(pass_update.new_password)
+    await db.commit()
+    await principals.principal_cache.invalidate_async(current_user.email)
     return {"message": "Password updated successfully"}
 
 @app.put("/api/users/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(database.get_db)):
+async def update_user(user_id: int, user_update: schemas.UserUpdate, db: AsyncSession = Depends(database.get_async_db)):
     """Update user details"""
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    previous_email = db_user.email
     
     if user_update.email:
         # Check uniqueness if email is changed
-        existing_user = db.query(models.User).filter(models.User.email == user_update.email).first()
+        existing_user = await get_user_by_email(db, user_update.email)
         if existing_user and existing_user.id != user_id:
              raise HTTPException(status_code=400, detail="Email already registered")
         db_user.email = user_update.email
@@ -151,10 +248,11 @@ def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Dep
         db_user.role = user_update.role
         
     if user_update.password:
-        db_user.password_hash = get_password_hash(user_update.password)
+        db_user.password_hash = await passwords.hasher.hash(user_update.password)
         
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await principals.principal_cache.invalidate_async(previous_email)
+    await db.refresh(db_user)
     return db_user
 
 @app.delete("/api/users/{user_id}")
@@ -164,19 +262,25 @@ def delete_user(user_id: int, db: Session = Depends(database.get_db)):
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    email = db_user.email
     db.delete(db_user)
     db.commit()
+    principals.principal_cache.invalidate(email)
     return {"message": "User deleted successfully"}
 
 @app.post("/login", response_model=schemas.Token)
-def login(user: schemas.UserLogin, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: schemas.UserLogin, db: AsyncSession = Depends(database.get_async_db)):
+    db_user = await get_user_by_email(db, user.email)
+    if not db_user or not await passwords.hasher.verify(user.password, db_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Upgrade hashes stored with an older cost factor while the plaintext is at hand
+    if passwords.hasher.needs_rehash(db_user.password_hash):
+        db_user.password_hash = await passwords.hasher.hash(user.password)
+        await db.commit()
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": db_user.email}, expires_delta=access_token_expires
@@ -189,6 +293,17 @@ def login(user: schemas.UserLogin, db: Session = Depends(database.get_db)):
         "email": db_user.email
     }
 
+@app.post("/logout")
+async def logout(
+    payload: dict = Depends(decode_token),
+    current_user: principals.Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Revoke the presented access token"""
+    expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    await principals.principal_cache.revoke(db, current_user, payload["jti"], expires_at)
+    return {"message": "Logged out"}
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Project Management System API"}
@@ -231,21 +346,102 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(databas
     db.add(db_health)
     db.commit()
     db.refresh(db_project)
+    project_changed(db_project.id, "project", "created", [db_project.id])
     
     return db_project
 
+async def project_list_response(
+    db: AsyncSession,
+    request: Request,
+    response: Response,
+    view: str,
+    fields: Optional[str],
+    keyset: pagination.Keyset,
+    criteria: list
+):
+    """
+    Build a project list in the requested projection.
+    view=full returns ORM objects (serialized through schemas.Project),
+    view=summary and ?fields= select plain columns only and skip the relationship tables.
+    When another page exists its cursor is returned in the X-Next-Cursor header.
+    Answers If-None-Match / If-Modified-Since with 304 before loading anything.
+    """
+    headers, fresh = await conditional_get(request, db, "projects")
+    if fresh:
+        return versioning.not_modified_response(headers)
+
+    if fields:
+        try:
+            field_names = loaders.parse_project_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if keyset.sort_name not in field_names:
+            field_names.append(keyset.sort_name)
+        rows, next_cursor = keyset.paginate(
+            await loaders.load_project_rows_async(db, field_names, *criteria, keyset=keyset)
+        )
+        result = JSONResponse(jsonable_encoder(rows))
+    elif view == "summary":
+        rows, next_cursor = keyset.paginate(
+            await loaders.load_project_rows_async(db, loaders.PROJECT_SUMMARY_FIELDS, *criteria, keyset=keyset)
+        )
+        result = JSONResponse([schemas.ProjectSummary(**row).model_dump(mode="json") for row in rows])
+    elif view == "full":
+        result, next_cursor = keyset.paginate(await loaders.load_projects_async(db, *criteria, keyset=keyset))
+    else:
+        raise HTTPException(status_code=400, detail="Invalid view. Use 'summary' or 'full'")
+
+    if next_cursor:
+        headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return versioning.apply_headers(result, response, headers)
+
 @app.get("/api/projects", response_model=list[schemas.Project])
-def get_projects(db: Session = Depends(database.get_db)):
-    """Get all projects with their health metrics"""
-    projects = db.query(models.Project).all()
-    return projects
+async def get_projects(
+    request: Request,
+    response: Response,
+    view: str = "full",
+    fields: Optional[str] = None,
+    status: Optional[list[str]] = Query(default=None),
+    assigned_to_email: Optional[str] = None,
+    project_code: Optional[str] = None,
+    start_from: Optional[date] = None,
+    start_to: Optional[date] = None,
+    end_from: Optional[date] = None,
+    end_to: Optional[date] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Get all projects with their health metrics.
+    Supports view=summary or ?fields=a,b for slim lists, filters, sort=field|-field
+    and keyset pagination with ?limit= and the X-Next-Cursor header.
+    """
+    keyset = make_keyset(loaders.PROJECT_SORTABLE, models.Project.id, sort, cursor, limit)
+    criteria = loaders.project_filter_criteria(
+        status, assigned_to_email, project_code, start_from, start_to, end_from, end_to
+    )
+    return await project_list_response(db, request, response, view, fields, keyset, criteria)
 
 @app.get("/api/my-projects", response_model=list[schemas.Project])
-def get_my_projects(email: str, db: Session = Depends(database.get_db)):
+async def get_my_projects(
+    email: str,
+    request: Request,
+    response: Response,
+    view: str = "full",
+    fields: Optional[str] = None,
+    status: Optional[list[str]] = Query(default=None),
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
     """Get projects assigned to a specific user email"""
     # Note: In production we'd get email from JWT sub
-    projects = db.query(models.Project).filter(models.Project.assigned_to_email == email).all()
-    return projects
+    keyset = make_keyset(loaders.PROJECT_SORTABLE, models.Project.id, sort, cursor, limit)
+    criteria = loaders.project_filter_criteria(status, assigned_to_email=email)
+    return await project_list_response(db, request, response, view, fields, keyset, criteria)
 
 @app.put("/api/projects/{project_id}", response_model=schemas.Project)
 def update_project(
@@ -265,6 +461,7 @@ def update_project(
     
     db.commit()
     db.refresh(db_project)
+    project_changed(project_id, "project", "updated", [project_id])
     return db_project
 
 @app.delete("/api/projects/{project_id}")
@@ -279,24 +476,166 @@ def delete_project(project_id: int, db: Session = Depends(database.get_db)):
     
     # Delete associated payments, matters, tasks manually to ensure no FK errors
     db.query(models.PaymentSchedule).filter(models.PaymentSchedule.project_id == project_id).delete()
+    cashflow.refresh_project(db, project_id)
     db.query(models.MattersArising).filter(models.MattersArising.project_id == project_id).delete()
+    db.query(models.TaskDependency).filter(models.TaskDependency.project_id == project_id).delete()
     db.query(models.ProjectTask).filter(models.ProjectTask.project_id == project_id).delete()
     
     # Delete the project
     db.delete(db_project)
     db.commit()
+    project_changed(project_id, "project", "deleted", [project_id])
     
     return {"message": "Project deleted successfully", "id": project_id}
 
+# Portfolio Endpoints
+@app.get("/api/portfolio/summary", response_model=schemas.PortfolioSummary)
+def get_portfolio_summary(
+    exclude_category: list[str] = Query(default=[]),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Portfolio KPIs (budget, paid, committed, overdue, health counts) aggregated in SQL.
+    Pass exclude_category=Support&exclude_category=Maintenance to drop payments
+    whose category contains those keywords, as the dashboards do.
+    """
+    return portfolio.portfolio_summary(db, exclude_category)
+
+# Finance Endpoints
+@app.get("/api/finance/cashflow", response_model=schemas.CashflowSummary)
+def get_cashflow(
+    project_id: Optional[int] = None,
+    exclude_category: list[str] = Query(default=[]),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Planned vs paid (and overdue) amounts per month, across all projects or for one,
+    read from the maintained cash-flow rollup. start/end select a month range.
+    """
+    return cashflow.cashflow_summary(db, project_id, exclude_category, start, end)
+
+# Earned Value Endpoints
+@app.get("/api/evm", response_model=list[schemas.EvmMetrics])
+def get_evm_metrics(project_id: Optional[int] = None, db: Session = Depends(database.get_db)):
+    """PV, EV, AC, CPI, SPI and EAC per project as of today (read-only)"""
+    project_ids = [project_id] if project_id is not None else None
+    projects = evm.load_project_columns(db, project_ids)
+    evm_metrics = evm.compute(projects, evm.load_task_columns(db, project_ids))
+    return evm.to_records(evm_metrics)
+
+def recalculate_health(db: Session) -> dict:
+    """Recompute EVM for all projects and update schedule/budget health from the CPI/SPI thresholds"""
+    evm_metrics, changed = evm.recalculate(db)
+    db.commit()
+    if changed:
+        cache.project_cache.invalidate(*changed)
+        events.broker.publish(events.change_event("health", "updated", None, changed))
+    return {"projects": len(evm_metrics["project_id"]), "updated": len(changed)}
+
+@app.post("/api/evm/recalculate", response_model=schemas.EvmRecalculation)
+def recalculate_evm(db: Session = Depends(database.get_db)):
+    """Recompute EVM for all projects and update schedule/budget health from the CPI/SPI thresholds"""
+    return recalculate_health(db)
+
+# Delta Sync Endpoint
+@app.get("/api/sync", response_model=schemas.SyncChanges)
+async def sync_changes(
+    request: Request,
+    response: Response,
+    since: int = 0,
+    project_id: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Projects, tasks, payments and matters changed after data version `since`, plus deletes.
+    Start with since=0 for a full snapshot, then poll with the returned version.
+    """
+    headers, fresh = await conditional_get(request, db, "projects")
+    if fresh:
+        return versioning.not_modified_response(headers)
+
+    version, _ = await versioning.read_version(db, "projects")
+    changes = await loaders.load_changes_async(db, since, project_id)
+    return versioning.apply_headers({"since": since, "version": version, **changes}, response, headers)
+
+# Live Change Events
+@app.websocket("/ws/projects")
+async def project_changes_ws(websocket: WebSocket, project_id: Optional[int] = None):
+    """
+    Push compact change events ({"type": "task.updated", "project_id": 3, "ids": [41]})
+    as writes commit; pass project_id to receive only that project's events.
+    A {"type": "resync"} event means some events were dropped: refetch.
+    """
+    await websocket.accept()
+    queue = events.broker.subscribe()
+    try:
+        await events.forward(websocket, queue, project_id)
+    finally:
+        events.broker.unsubscribe(queue)
+
 # Project Details Endpoints
 @app.get("/api/projects/{project_id}/details", response_model=schemas.ProjectDetails)
-def get_project_details(project_id: int, db: Session = Depends(database.get_db)):
+async def get_project_details(
+    project_id: int,
+    request: Request,
+    db: AsyncSession = Depends(database.get_async_db)
+):
     """Get complete project details including payments, matters, and tasks"""
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not db_project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    return db_project
+    headers, fresh = await conditional_get(request, db, "projects")
+    if fresh:
+        return versioning.not_modified_response(headers)
+
+    # Serialized graph cached per project; its version and generation are read before loading
+    version, _ = await versioning.read_version(db, versioning.project_scope(project_id))
+    generation, body = await cache.project_cache.lookup_async("details", project_id, version)
+    if body is None:
+        db_project = await loaders.load_project_details_async(db, project_id)
+        if not db_project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        body = schemas.ProjectDetails.model_validate(db_project).model_dump_json().encode()
+        await cache.project_cache.set_async("details", project_id, generation, version, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/projects/{project_id}/schedule", response_model=schemas.ProjectSchedule)
+async def get_project_schedule(
+    project_id: int,
+    request: Request,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Task tree with rolled-up dates/completion, slack and critical path, ready for a Gantt chart"""
+    headers, fresh = await conditional_get(request, db, "projects")
+    if fresh:
+        return versioning.not_modified_response(headers)
+
+    version, _ = await versioning.read_version(db, versioning.project_scope(project_id))
+    generation, body = await cache.project_cache.lookup_async("schedule", project_id, version)
+    if body is None:
+        schedule = await scheduling.load_schedule_async(db, project_id)
+        if not schedule["task_count"] and await db.get(models.Project, project_id) is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        body = schemas.ProjectSchedule.model_validate(schedule).model_dump_json().encode()
+        await cache.project_cache.set_async("schedule", project_id, generation, version, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Search Endpoint
+@app.get("/api/search", response_model=schemas.SearchResults)
+async def search_everything(
+    q: str = Query(..., min_length=1, max_length=200),
+    entity: list[str] = Query(default=[]),
+    project_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Ranked full-text matches across projects, tasks, matters and payments"""
+    unknown = set(entity) - set(search.ENTITIES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"entity must be one of {', '.join(search.ENTITIES)}")
+    results = await search.search_async(db, q, entity, project_id, limit)
+    return {"query": q, "results": results}
 
 # Payment Schedule Endpoints
 @app.post("/api/projects/{project_id}/payment", response_model=schemas.PaymentSchedule)
@@ -328,8 +667,10 @@ def create_payment(
         supporting_document=payment.supporting_document
     )
     db.add(db_payment)
+    cashflow.refresh_buckets(db, cashflow.payment_buckets(db_payment))
     db.commit()
     db.refresh(db_payment)
+    project_changed(project_id, "payment", "created", [db_payment.id])
     
     return db_payment
 
@@ -346,11 +687,15 @@ def update_payment(
     
     # Update only provided fields
     update_data = payment.dict(exclude_unset=True)
+    buckets = cashflow.payment_buckets(db_payment)
     for field, value in update_data.items():
         setattr(db_payment, field, value)
     
+    # Refresh the cash-flow months the payment moved out of and into
+    cashflow.refresh_buckets(db, buckets | cashflow.payment_buckets(db_payment))
     db.commit()
     db.refresh(db_payment)
+    project_changed(db_payment.project_id, "payment", "updated", [db_payment.id])
     
     return db_payment
 
@@ -370,10 +715,25 @@ def delete_payment(
         raise HTTPException(status_code=404, detail="Payment not found")
     
     db.delete(db_payment)
+    cashflow.refresh_buckets(db, cashflow.payment_buckets(db_payment))
     db.commit()
+    project_changed(project_id, "payment", "deleted", [payment_id])
     
     return {"message": "Payment deleted successfully"}
 
+@app.post("/api/projects/{project_id}/payments:batch", response_model=schemas.BatchResult)
+def batch_payments(
+    project_id: int,
+    items: schemas.PaymentScheduleBatch,
+    db: Session = Depends(database.get_db)
+):
+    """Create, update and delete many payments in one transaction"""
+    results, _, _ = apply_project_batch(db, project_id, models.PaymentSchedule, items)
+    cashflow.refresh_project(db, project_id)
+    db.commit()
+    project_changed(project_id, "payment", "batch", batch_ids(results))
+    return batch.summarize(results)
+
 # Matters Arising Endpoints
 @app.post("/api/projects/{project_id}/matter", response_model=schemas.MattersArising)
 def create_matter(
@@ -404,6 +764,7 @@ def create_matter(
     db.add(db_matter)
     db.commit()
     db.refresh(db_matter)
+    project_changed(project_id, "matter", "created", [db_matter.id])
     
     return db_matter
 
@@ -425,9 +786,22 @@ def update_matter(
     
     db.commit()
     db.refresh(db_matter)
+    project_changed(db_matter.project_id, "matter", "updated", [db_matter.id])
     
     return db_matter
 
+@app.post("/api/projects/{project_id}/matters:batch", response_model=schemas.BatchResult)
+def batch_matters(
+    project_id: int,
+    items: schemas.MattersArisingBatch,
+    db: Session = Depends(database.get_db)
+):
+    """Create, update and delete many matters in one transaction"""
+    results, _, _ = apply_project_batch(db, project_id, models.MattersArising, items)
+    db.commit()
+    project_changed(project_id, "matter", "batch", batch_ids(results))
+    return batch.summarize(results)
+
 # Project Task Endpoints
 
 @app.post("/api/projects/{project_id}/task", response_model=schemas.ProjectTask)
@@ -460,11 +834,12 @@ def create_task(
         # order_index=task.order_index
     )
     db.add(db_task)
+    
+    # Maintain project task counters/progress in the same transaction
+    progress.apply_task_delta(db, project_id, added=1, completed=progress.task_completed(db_task.status))
     db.commit()
     db.refresh(db_task)
-    
-    # Auto-recalculate project progress
-    recalculate_project_progress(project_id, db)
+    project_changed(project_id, "task", "created", [db_task.id])
     
     return db_task
 
@@ -488,25 +863,23 @@ def update_task(
     update_data = task.dict(exclude_unset=True)
     
     # Auto-set completion date logic
-    if "status" in update_data:
-        if update_data["status"] == "Completed":
-            # If completion_date is provided and not null, trust it.
-            # If not provided, and not in DB, default to now.
-            if "completion_date" in update_data and update_data["completion_date"]:
-                pass # Use provided date
-            elif not db_task.completion_date:
-                update_data["completion_date"] = datetime.now().date()
-        elif update_data["status"] != "Completed":
-            update_data["completion_date"] = None
+    update_data = progress.apply_completion_date(db_task, update_data)
 
+    was_completed = progress.task_completed(db_task.status)
+    old_dates = (db_task.start_date, db_task.end_date)
     for field, value in update_data.items():
         setattr(db_task, field, value)
     
+    # Maintain project task counters/progress in the same transaction
+    progress.apply_task_delta(db, project_id, completed=progress.task_completed(db_task.status) - was_completed)
+
+    # Moving a task pushes its successors, committed together with the edit
+    moved = []
+    if (db_task.start_date, db_task.end_date) != old_dates:
+        moved = reschedule_successors(db, project_id, [task_id])
     db.commit()
     db.refresh(db_task)
-    
-    # Auto-recalculate project progress
-    recalculate_project_progress(project_id, db)
+    project_changed(project_id, "task", "updated", [task_id] + moved)
     
     return db_task
 
@@ -525,106 +898,455 @@ def delete_task(
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    scheduling.delete_links(db, project_id, [task_id])
     db.delete(db_task)
-    db.commit()
     
-    # Auto-recalculate project progress
-    recalculate_project_progress(project_id, db)
+    # Maintain project task counters/progress in the same transaction
+    progress.apply_task_delta(db, project_id, added=-1, completed=-progress.task_completed(db_task.status))
+    db.commit()
+    project_changed(project_id, "task", "deleted", [task_id])
     
     return {"message": "Task deleted successfully"}
 
+@app.post("/api/projects/{project_id}/tasks:batch", response_model=schemas.BatchResult)
+def batch_tasks(
+    project_id: int,
+    items: schemas.ProjectTaskBatch,
+    db: Session = Depends(database.get_db)
+):
+    """Create, update and delete many tasks in one transaction with a single progress update"""
+    scheduling.delete_links(db, project_id, items.delete)
+    results, added, completed = apply_project_batch(
+        db, project_id, models.ProjectTask, items,
+        prepare_update=progress.apply_completion_date,
+        completed=lambda task: progress.task_completed(task.status),
+    )
+    progress.apply_task_delta(db, project_id, added=added, completed=completed)
+    redated = [item.id for item in items.update if {"start_date", "end_date"} & item.model_fields_set]
+    moved = reschedule_successors(db, project_id, redated) if redated else []
+    db.commit()
+    project_changed(project_id, "task", "batch", batch_ids(results) + moved)
+    return batch.summarize(results)
+
+# Task Dependency Endpoints
+def get_dependency_or_404(db: Session, dependency_id: int) -> models.TaskDependency:
+    db_link = db.query(models.TaskDependency).filter(models.TaskDependency.id == dependency_id).first()
+    if not db_link:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    return db_link
+
+def validate_dependency_type(dependency_type: Optional[str]):
+    if dependency_type is not None and dependency_type not in scheduling.DEPENDENCY_TYPES:
+        raise HTTPException(status_code=400, detail=f"dependency_type must be one of {', '.join(scheduling.DEPENDENCY_TYPES)}")
+
+@app.get("/api/projects/{project_id}/dependencies", response_model=list[schemas.TaskDependency])
+def list_dependencies(project_id: int, db: Session = Depends(database.get_db)):
+    """Predecessor/successor links between a project's tasks"""
+    return (
+        db.query(models.TaskDependency)
+        .filter(models.TaskDependency.project_id == project_id)
+        .order_by(models.TaskDependency.id)
+        .all()
+    )
+
+@app.post("/api/projects/{project_id}/dependencies", response_model=schemas.TaskDependency)
+def create_dependency(
+    project_id: int,
+    link: schemas.TaskDependencyCreate,
+    db: Session = Depends(database.get_db)
+):
+    """Link two tasks of a project and push the successor chain if the new link requires it"""
+    validate_dependency_type(link.dependency_type)
+    task_ids = {link.predecessor_id, link.successor_id}
+    found = db.query(models.ProjectTask.id).filter(
+        models.ProjectTask.project_id == project_id,
+        models.ProjectTask.id.in_(task_ids)
+    ).count()
+    if found != len(task_ids):
+        raise HTTPException(status_code=404, detail="Task not found")
+    existing = db.query(models.TaskDependency.id).filter(
+        models.TaskDependency.predecessor_id == link.predecessor_id,
+        models.TaskDependency.successor_id == link.successor_id
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Dependency already exists")
+    if scheduling.creates_cycle(db, project_id, link.predecessor_id, link.successor_id):
+        raise HTTPException(status_code=400, detail="Dependency would create a cycle")
+
+    db_link = models.TaskDependency(
+        project_id=project_id,
+        predecessor_id=link.predecessor_id,
+        successor_id=link.successor_id,
+        dependency_type=link.dependency_type or "FS",
+        lag_days=link.lag_days or 0
+    )
+    db.add(db_link)
+    moved = reschedule_successors(db, project_id, [link.predecessor_id])
+    db.commit()
+    db.refresh(db_link)
+    project_changed(project_id, "dependency", "created", [db_link.id])
+    if moved:
+        project_changed(project_id, "task", "updated", moved)
+    return db_link
+
+@app.put("/api/dependencies/{dependency_id}", response_model=schemas.TaskDependency)
+def update_dependency(
+    dependency_id: int,
+    link: schemas.TaskDependencyUpdate,
+    db: Session = Depends(database.get_db)
+):
+    """Change a link's type or lag and re-propagate from its predecessor"""
+    db_link = get_dependency_or_404(db, dependency_id)
+    update_data = link.dict(exclude_unset=True)
+    validate_dependency_type(update_data.get("dependency_type"))
+    for field, value in update_data.items():
+        if value is not None:
+            setattr(db_link, field, value)
+    moved = reschedule_successors(db, db_link.project_id, [db_link.predecessor_id])
+    db.commit()
+    db.refresh(db_link)
+    project_changed(db_link.project_id, "dependency", "updated", [dependency_id])
+    if moved:
+        project_changed(db_link.project_id, "task", "updated", moved)
+    return db_link
+
+@app.delete("/api/dependencies/{dependency_id}")
+def delete_dependency(dependency_id: int, db: Session = Depends(database.get_db)):
+    """Remove a link; tasks keep their current dates"""
+    db_link = get_dependency_or_404(db, dependency_id)
+    project_id = db_link.project_id
+    db.delete(db_link)
+    db.commit()
+    project_changed(project_id, "dependency", "deleted", [dependency_id])
+    return {"message": "Dependency deleted successfully"}
+
+# OPEX Ledger Endpoints
+@app.get("/api/opex/items", response_model=list[schemas.OpexLedgerItemTotals])
+def get_opex_items(fiscal_year: int, db: Session = Depends(database.get_db)):
+    """Ledger lines for a fiscal year with actual spend and balance aggregated in SQL"""
+    return opex.ledger_items(db, fiscal_year)
+
+@app.post("/api/opex/items", response_model=schemas.OpexLedgerItem)
+def create_opex_item(item: schemas.OpexLedgerItemCreate, db: Session = Depends(database.get_db)):
+    """Create a new OPEX ledger line"""
+    db_item = models.OpexLedgerItem(**item.dict())
+    db.add(db_item)
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+@app.put("/api/opex/items/{item_id}", response_model=schemas.OpexLedgerItem)
+def update_opex_item(item_id: int, item: schemas.OpexLedgerItemUpdate, db: Session = Depends(database.get_db)):
+    """Update an OPEX ledger line"""
+    db_item = db.query(models.OpexLedgerItem).filter(models.OpexLedgerItem.id == item_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Ledger item not found")
+
+    update_data = item.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_item, field, value)
+
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+@app.delete("/api/opex/items/{item_id}")
+def delete_opex_item(item_id: int, db: Session = Depends(database.get_db)):
+    """Delete an OPEX ledger line and its transactions"""
+    db_item = db.query(models.OpexLedgerItem).filter(models.OpexLedgerItem.id == item_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Ledger item not found")
+
+    db.query(models.OpexTransaction).filter(models.OpexTransaction.item_id == item_id).delete()
+    db.delete(db_item)
+    db.commit()
+    return {"message": "Ledger item deleted successfully", "id": item_id}
+
+@app.get("/api/opex/items/{item_id}/transactions", response_model=list[schemas.OpexTransaction])
+def get_opex_transactions(item_id: int, db: Session = Depends(database.get_db)):
+    """Transactions of a ledger line in date order"""
+    tx = models.OpexTransaction
+    return db.query(tx).filter(tx.item_id == item_id).order_by(tx.transaction_date, tx.id).all()
+
+@app.post("/api/opex/items/{item_id}/transactions", response_model=schemas.OpexTransaction)
+def create_opex_transaction(
+    item_id: int,
+    transaction: schemas.OpexTransactionCreate,
+    db: Session = Depends(database.get_db)
+):
+    """Record a debit or credit against a ledger line"""
+    db_item = db.query(models.OpexLedgerItem).filter(models.OpexLedgerItem.id == item_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Ledger item not found")
+
+    db_transaction = models.OpexTransaction(item_id=item_id, **transaction.dict())
+    db.add(db_transaction)
+    db.commit()
+    db.refresh(db_transaction)
+    return db_transaction
+
+@app.put("/api/opex/transactions/{transaction_id}", response_model=schemas.OpexTransaction)
+def update_opex_transaction(
+    transaction_id: int,
+    transaction: schemas.OpexTransactionUpdate,
+    db: Session = Depends(database.get_db)
+):
+    """Update a ledger transaction"""
+    db_transaction = db.query(models.OpexTransaction).filter(models.OpexTransaction.id == transaction_id).first()
+    if not db_transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+
+    update_data = transaction.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_transaction, field, value)
+
+    db.commit()
+    db.refresh(db_transaction)
+    return db_transaction
+
+@app.delete("/api/opex/transactions/{transaction_id}")
+def delete_opex_transaction(transaction_id: int, db: Session = Depends(database.get_db)):
+    """Delete a ledger transaction"""
+    db_transaction = db.query(models.OpexTransaction).filter(models.OpexTransaction.id == transaction_id).first()
+    if not db_transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+
+    db.delete(db_transaction)
+    db.commit()
+    return {"message": "Transaction deleted successfully"}
+
+@app.get("/api/opex/summary", response_model=schemas.OpexSummary)
+def get_opex_summary(fiscal_year: int, db: Session = Depends(database.get_db)):
+    """Fiscal year OPEX totals with per-category and per-month rollups"""
+    return opex.opex_summary(db, fiscal_year)
+
 
 # --- Excel Import/Export Endpoints ---
 
 @app.get("/api/payments/template")
 def get_payment_template():
-    # Create a workbook and select active sheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Payment Schedule Template"
-    
-    # Define headers
-    headers = ["Deliverable", "Phase", "Plan Date (YYYY-MM-DD)", "Planned Amount", "Category", "Remarks"]
-    ws.append(headers)
-    
-    # Add sample row
-    ws.append(["Milestone 1", "Phase 1", "2026-01-31", 5000.00, "Project Implementation", "Initial payment"])
-    
-    # Save to temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        wb.save(tmp.name)
-        tmp_path = tmp.name
-        
-    return FileResponse(tmp_path, filename="payment_schedule_template.xlsx", media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return exports.template_response("payments")
+
+@app.get("/api/tasks/template")
+def get_task_template():
+    return exports.template_response("tasks")
 
-@app.post("/api/projects/{project_id}/payments/import")
+@app.get("/api/projects/{project_id}/export/{kind}")
+def export_project_rows(project_id: int, kind: str, format: str = "xlsx", db: Session = Depends(database.get_db)):
+    """Stream a project's payments, tasks or matters as .xlsx or .csv"""
+    if kind not in exports.PROJECT_EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {kind}")
+    if not db.get(models.Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        return exports.export_response(exports.EXPORTS[kind], format, project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/portfolio/export")
+def export_portfolio(format: str = "xlsx"):
+    """Stream every project with its task counts, costs and payment totals as .xlsx or .csv"""
+    try:
+        return exports.export_response(exports.EXPORTS["portfolio"], format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def xlsx_upload(file: UploadFile):
+    if not file.filename.endswith('.xlsx'):
+         raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel file (.xlsx)")
+
+@app.post("/api/projects/{project_id}/payments/import", response_model=schemas.Job, status_code=202)
 async def import_payments(
     project_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(database.get_db)
 ):
-    # Verify project exists
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    """Queue a payment workbook import; poll /api/jobs/{id} for progress"""
+    # Verify project exists (sync session, so keep it off the event loop)
+    project = await run_in_threadpool(db.get, models.Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    xlsx_upload(file)
 
-    # verify file extension
-    if not file.filename.endswith('.xlsx'):
-         raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel file (.xlsx)")
+    input_path = await jobs.store_upload(file)
+    return await run_in_threadpool(jobs.submit, db, "payments.import", {"project_id": project_id}, project_id, input_path)
+
+@app.post("/api/projects/{project_id}/tasks/import", response_model=schemas.Job, status_code=202)
+async def import_tasks(
+    project_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(database.get_db)
+):
+    """Queue an MS-Project-style task workbook import (Outline Level/WBS resolve into parent_id)"""
+    project = await run_in_threadpool(db.get, models.Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    xlsx_upload(file)
+
+    input_path = await jobs.store_upload(file)
+    return await run_in_threadpool(jobs.submit, db, "tasks.import", {"project_id": project_id}, project_id, input_path)
+
+# --- Background Jobs ---
+
+@jobs.handler("payments.import", submittable=False)
+def run_payment_import(job: jobs.JobContext, db: Session):
+    project_id = job.params["project_id"]
+    count = importers.import_payment_workbook(job.input_path, project_id, db, progress=job.progress)
+    project_changed(project_id, "payment", "imported")
+    return {"imported": count, "message": f"Successfully imported {count} payment records"}
+
+@jobs.handler("tasks.import", submittable=False)
+def run_task_import(job: jobs.JobContext, db: Session):
+    project_id = job.params["project_id"]
+    count, completed = importers.import_task_workbook(job.input_path, project_id, db, progress=job.progress)
+    # One counter/progress update for the whole import, same transaction
+    progress.apply_task_delta(db, project_id, added=count, completed=completed)
+    db.commit()
+    project_changed(project_id, "task", "imported")
+    return {"imported": count, "message": f"Successfully imported {count} tasks"}
+
+def validate_export(params: dict):
+    kind = params.get("export")
+    if kind not in exports.EXPORTS:
+        raise ValueError(f"Unknown export: {kind} (expected one of {', '.join(exports.EXPORTS)})")
+    exports.check_format(params.get("format", "xlsx"))
+    if kind in exports.PROJECT_EXPORTS and not isinstance(params.get("project_id"), int):
+        raise ValueError(f"The {kind} export needs a project_id")
+
+@jobs.handler("export", validate=validate_export)
+def run_export(job: jobs.JobContext, db: Session):
+    """Large exports and the portfolio report, written to a file for /api/jobs/{id}/download"""
+    export = exports.EXPORTS[job.params["export"]]
+    fmt = job.params.get("format", "xlsx")
+    project_id = job.params.get("project_id") if export.name in exports.PROJECT_EXPORTS else None
+    total = exports.count_rows(export, project_id)
+    path = job.output(f".{fmt}")
+    exports.write_file(path, export, fmt, project_id, progress=lambda done: job.progress(done, total))
+    return {
+        "rows": total,
+        "filename": exports.download_name(export, fmt, project_id),
+        "download_url": f"/api/jobs/{job.id}/download",
+    }
 
+@jobs.handler("evm.recalculate")
+def run_evm_recalculation(job: jobs.JobContext, db: Session):
+    return recalculate_health(db)
+
+@jobs.handler("cashflow.rebuild")
+def run_cashflow_rebuild(job: jobs.JobContext, db: Session):
+    cashflow.rebuild(db)
+    cache.project_cache.clear()
+    return {"message": "Cash-flow rollup rebuilt"}
+
+@jobs.handler("progress.rebuild")
+def run_progress_rebuild(job: jobs.JobContext, db: Session):
+    progress.rebuild_task_counters(db)
+    db.commit()
+    cache.project_cache.clear()
+    return {"message": "Task counters and project progress rebuilt"}
+
+@jobs.handler("search.rebuild")
+def run_search_rebuild(job: jobs.JobContext, db: Session):
+    search.install(database.engine, rebuild=True)
+    return {"message": "Search index rebuilt"}
+
+def get_job_or_404(db: Session, job_id: int) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", response_model=schemas.Job, status_code=202)
+def create_job(job: schemas.JobCreate, db: Session = Depends(database.get_db)):
+    """Queue an export, report or bulk recalculation (imports are queued by their upload endpoints)"""
+    definition = jobs.HANDLERS.get(job.kind)
+    if definition is None or not definition.submittable:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {job.kind}")
+    project_id = job.params.get("project_id")
+    if project_id is not None and (not isinstance(project_id, int) or not db.get(models.Project, project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
     try:
-        contents = await file.read()
-        wb = openpyxl.load_workbook(BytesIO(contents))
-        ws = wb.active
-        
-        imported_count = 0
-        
-        # Iterate rows, skipping header (min_row=2)
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row or not row[0]: # Skip empty rows
-                continue
-                
-            # Map columns (Deliverable, Phase, Date, Amount, Remarks)
-            deliverable = row[0]
-            phase = row[1]
-            plan_date_raw = row[2]
-            planned_amount = row[3]
-            remark = row[4]
-            
-            # Date Parsing
-            plan_date = None
-            if plan_date_raw:
-                if isinstance(plan_date_raw, datetime) or isinstance(plan_date_raw, date):
-                     plan_date = plan_date_raw
-                     if isinstance(plan_date, datetime):
-                         plan_date = plan_date.date()
-                elif isinstance(plan_date_raw, str):
-                    try:
-                        plan_date = datetime.strptime(plan_date_raw, "%Y-%m-%d").date()
-                    except ValueError:
-                        pass # Valid validation in real app needed
-            
-            # Create payment record
-            db_payment = models.PaymentSchedule(
-                project_id=project_id,
-                deliverable=str(deliverable),
-                phase=str(phase) if phase else None,
-                plan_date=plan_date,
-                planned_amount=float(planned_amount) if planned_amount else 0.0,
-                status="Not Paid",
-                remark=str(remark) if remark else None
-            )
-            db.add(db_payment)
-            imported_count += 1
-            
-        db.commit()
-        return {"message": f"Successfully imported {imported_count} payment records"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
+        return jobs.submit(db, job.kind, job.params, project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/jobs", response_model=list[schemas.Job])
+def get_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    project_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(database.get_db)
+):
+    """Most recent jobs first"""
+    query = db.query(models.Job)
+    if status:
+        query = query.filter(models.Job.status == status)
+    if kind:
+        query = query.filter(models.Job.kind == kind)
+    if project_id is not None:
+        query = query.filter(models.Job.project_id == project_id)
+    return [jobs.view(job) for job in query.order_by(models.Job.id.desc()).limit(limit).all()]
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.Job)
+def get_job(job_id: int, db: Session = Depends(database.get_db)):
+    """Poll a job's status and progress"""
+    return jobs.view(get_job_or_404(db, job_id))
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=schemas.Job)
+def cancel_job(job_id: int, db: Session = Depends(database.get_db)):
+    try:
+        return jobs.cancel(db, get_job_or_404(db, job_id))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/api/jobs/{job_id}/retry", response_model=schemas.Job, status_code=202)
+def retry_job(job_id: int, db: Session = Depends(database.get_db)):
+    try:
+        return jobs.retry(db, get_job_or_404(db, job_id))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/download")
+def download_job_output(job_id: int, db: Session = Depends(database.get_db)):
+    """The file produced by a finished export job"""
+    job = get_job_or_404(db, job_id)
+    if job.status != jobs.SUCCEEDED or not job.output_path or not os.path.exists(job.output_path):
+        raise HTTPException(status_code=404, detail="This job has no file to download")
+    filename = (job.result or {}).get("filename") or os.path.basename(job.output_path)
+    media_type = exports.media_type(filename.rsplit(".", 1)[-1])
+    return FileResponse(job.output_path, filename=filename, media_type=media_type)
 
 # --- System Administration Endpoints ---
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint, aggregated over all gunicorn workers"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/api/system/cache-stats")
+def get_cache_stats():
+    """Project response cache backend, size and hit rate (counters are per worker process)"""
+    return cache.project_cache.metrics()
+
+@app.get("/api/system/principal-cache-stats")
+def get_principal_cache_stats():
+    """Authenticated-user cache backend and hit rate (counters are per worker process)"""
+    return principals.principal_cache.metrics()
+
+@app.get("/api/system/job-stats")
+def get_job_stats(db: Session = Depends(database.get_db)):
+    """Job counts by status (all processes) and this process's runner"""
+    rows = db.query(models.Job.status, func.count(models.Job.id)).group_by(models.Job.status).all()
+    data = jobs.runner.metrics()
+    data["jobs"] = dict(rows)
+    return data
+
+@app.get("/api/system/hasher-stats")
+def get_hasher_stats():
+    """Password hashing pool size, cost factor and queue state (per worker process)"""
+    return passwords.hasher.metrics()
+
 @app.get("/api/system/reset-db-force")
 def reset_database_force(db: Session = Depends(database.get_db)):
     """
@@ -636,9 +1358,14 @@ def reset_database_force(db: Session = Depends(database.get_db)):
     
     # 2. Re-create all tables
     models.Base.metadata.create_all(bind=database.engine)
+    versioning.ensure_scopes(database.engine)
+    search.install(database.engine, rebuild=True)
+    cache.project_cache.clear()
+    principals.principal_cache.clear()
+    events.broker.publish(events.RESYNC_EVENT)
     
     # 3. Seed Default Admin
-    hashed_password = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = passwords.hash_password_sync("admin")
     admin_user = models.User(
         email="admin@ijn.com.my",
         password_hash=hashed_password,
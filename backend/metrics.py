@@ -0,0 +1,174 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from starlette.routing import Route, get_route_path
+
+# Multiprocess collection: every gunicorn worker writes its samples to files in this directory
+# and /metrics (whichever worker serves it) merges them. It must be set before prometheus_client
+# is imported, i.e. in the gunicorn master (gunicorn.conf.py does this and clears it on start);
+# unset, metrics cover the current process only (uvicorn --reload, scripts).
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+UNMATCHED_ROUTE = "<unmatched>" # 404s; raw paths would make the route label unbounded
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template, method and status",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to the end of the response body, by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled, by route template (summed over live workers)",
+    ["method", "route"], multiprocess_mode="livesum",
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request, by route template",
+    ["method", "route"], buckets=QUERY_COUNT_BUCKETS,
+)
+POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool (waiting plus any new connect)",
+    ["engine"], buckets=CHECKOUT_BUCKETS,
+)
+
+# Statements executed by the current request; None outside requests (background jobs, startup)
+_query_count: ContextVar[Optional[list]] = ContextVar("query_count", default=None)
+
+PREFIX_SEGMENTS = 2 # Routes are bucketed by their first path segments (/api/projects/...)
+
+def _prefix(path: str) -> tuple:
+    return tuple(path.split("/", PREFIX_SEGMENTS + 1)[1:PREFIX_SEGMENTS + 1])
+
+class RouteTable:
+    """
+    Resolves a request to its route's path template (/api/projects/{project_id}) the way the
+    router will: first match in registration order, using the compiled path regexes directly
+    (Route.matches() builds a child scope per route). Only routes sharing the request's
+    leading static segments, or with a parameter among them, are tried.
+    """
+
+    def __init__(self, router):
+        self.routes = [
+            (route.path_regex, route.methods, route.path)
+            for route in router.routes if isinstance(route, Route)
+        ]
+        self._buckets = {}
+
+    def _candidates(self, prefix: tuple) -> list:
+        bucket = self._buckets.get(prefix)
+        if bucket is None:
+            bucket = [
+                entry for entry in self.routes
+                if all("{" in part or part == want for part, want in zip(_prefix(entry[2]), prefix))
+            ]
+            if len(self._buckets) < 1024: # Prefixes from arbitrary 404 paths are not kept forever
+                self._buckets[prefix] = bucket
+        return bucket
+
+    def resolve(self, method: str, path: str) -> str:
+        partial = None
+        for regex, methods, template in self._candidates(_prefix(path)):
+            if regex.match(path):
+                if methods is None or method in methods:
+                    return template
+                if partial is None:
+                    partial = template # Path matched, method did not (405)
+        return partial or UNMATCHED_ROUTE
+
+class _RouteMetrics(NamedTuple):
+    in_progress: Gauge
+    latency: Histogram
+    queries: Histogram
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (streamed bodies are timed to the last chunk). The route is
+    resolved up front so the in-flight gauge carries it while the request runs.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+        self.routes = None # Built on the first request, once every route is registered
+        self._children = {} # (method, route) -> labelled metrics; bounded by the route table
+
+    def _route_metrics(self, method: str, route: str) -> _RouteMetrics:
+        children = self._children.get((method, route))
+        if children is None:
+            children = self._children[(method, route)] = _RouteMetrics(
+                IN_PROGRESS.labels(method, route),
+                REQUEST_LATENCY.labels(method, route),
+                REQUEST_QUERIES.labels(method, route),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        if self.routes is None:
+            self.routes = RouteTable(self.router)
+        route = self.routes.resolve(method, get_route_path(scope))
+        children = self._route_metrics(method, route)
+        status = [500] # If the app raises before starting a response
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _query_count.set(queries)
+        children.in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            children.in_progress.dec()
+            _query_count.reset(token)
+            REQUESTS.labels(method, route, str(status[0])).inc()
+            children.latency.observe(elapsed)
+            children.queries.observe(queries[0])
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    queries = _query_count.get()
+    if queries is not None:
+        queries[0] += 1
+
+def instrument_engine(engine, name: str):
+    """Count statements per request and time pool checkouts (pass AsyncEngine.sync_engine for async)"""
+    event.listen(engine, "before_cursor_execute", _count_query)
+    # Every Connection gets its DBAPI connection through raw_connection(), so timing it covers
+    # the wait for a free pool slot; wrapped on the engine so it survives pool re-creation
+    raw_connection = engine.raw_connection
+    checkout = POOL_CHECKOUT.labels(name)
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+def render() -> bytes:
+    """Exposition text: merged from every worker's files in multiprocess mode"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
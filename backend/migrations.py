@@ -0,0 +1,32 @@
+from sqlalchemy import inspect, text
+
+def add_missing_columns(engine, metadata):
+    """
+    Add columns declared on the models but missing from existing tables.
+    create_all only creates new tables, so older databases get new columns here.
+    New columns must be nullable or carry a server_default.
+    Returns the list of (table, column) pairs that were added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+                added.append((table.name, column.name))
+    return added
+
+def create_missing_indexes(engine, metadata):
+    """Create indexes declared on the models that existing tables do not have yet"""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -1,7 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from database import Base
 
+def current_data_version(context):
+    """Column default: the data version bumped for the write in progress (see versioning.py)"""
+    return context.connection.info.get("data_version", 0)
+
+def sync_columns():
+    """version/updated_at pair stamped on every insert and update, for delta sync"""
+    return (
+        Column(BigInteger, default=current_data_version, onupdate=current_data_version, server_default="0", index=True),
+        Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -11,6 +23,14 @@ class User(Base):
     full_name = Column(String, nullable=True)
     role = Column(String, default="staff") # admin or staff
 
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Logged-out access tokens, kept until they would have expired anyway
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -32,6 +52,13 @@ class Project(Base):
     end_date = Column(Date, nullable=False)
     planned_cost = Column(Float, nullable=False)
     actual_cost = Column(Float, default=0.0)
+
+    # Task counters maintained on every task write (see progress.py)
+    task_count = Column(Integer, default=0, server_default="0", nullable=False)
+    completed_task_count = Column(Integer, default=0, server_default="0", nullable=False)
+
+    # Delta sync stamps
+    version, updated_at = sync_columns()
     
     # Relationship to health metrics
     health = relationship("ProjectHealth", back_populates="project", uselist=False)
@@ -39,6 +66,15 @@ class Project(Base):
     matters = relationship("MattersArising", back_populates="project", cascade="all, delete-orphan")
     tasks = relationship("ProjectTask", back_populates="project", cascade="all, delete-orphan")
 
+    # Composite indexes for filtered keyset pagination (filter column, then id)
+    __table_args__ = (
+        Index("ix_projects_status_id", "status", "id"),
+        Index("ix_projects_assigned_to_email_id", "assigned_to_email", "id"),
+        Index("ix_projects_start_date_id", "start_date", "id"),
+        Index("ix_projects_end_date_id", "end_date", "id"),
+        Index("ix_projects_name_id", "name", "id"),
+    )
+
 class ProjectHealth(Base):
     __tablename__ = "project_health"
 
@@ -74,9 +110,18 @@ class PaymentSchedule(Base):
     po_number = Column(String, nullable=True)
     invoice_number = Column(String, nullable=True)
     supporting_document = Column(String, nullable=True)
+
+    # Delta sync stamps
+    version, updated_at = sync_columns()
     
     project = relationship("Project", back_populates="payments")
 
+    __table_args__ = (
+        # Cash-flow bucket refreshes and current-month overdue lookups
+        Index("ix_payment_schedule_project_plan_date", "project_id", "plan_date"),
+        Index("ix_payment_schedule_plan_date", "plan_date"),
+    )
+
 class MattersArising(Base):
     __tablename__ = "matters_arising"
 
@@ -93,6 +138,9 @@ class MattersArising(Base):
     status = Column(String, default="Open") # Open, Closed, Completed
     date_closed = Column(Date, nullable=True)
     remarks = Column(String, nullable=True)
+
+    # Delta sync stamps
+    version, updated_at = sync_columns()
     
     project = relationship("Project", back_populates="matters")
 
@@ -111,9 +159,122 @@ class ProjectTask(Base):
     
     # Hierarchy
     parent_id = Column(Integer, ForeignKey("project_tasks.id"), nullable=True)
-    
-    
+
+    # Delta sync stamps
+    version, updated_at = sync_columns()
     
     # Relationships
     project = relationship("Project", back_populates="tasks")
 
+class TaskDependency(Base):
+    __tablename__ = "task_dependencies"
+
+    # Predecessor -> successor link between two tasks of the same project
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    predecessor_id = Column(Integer, ForeignKey("project_tasks.id"), nullable=False)
+    successor_id = Column(Integer, ForeignKey("project_tasks.id"), nullable=False, index=True)
+    dependency_type = Column(String, nullable=False, default="FS") # FS, SS, FF or SF
+    lag_days = Column(Integer, nullable=False, default=0) # Negative for lead time
+
+    __table_args__ = (
+        Index("ux_task_dependencies_link", "predecessor_id", "successor_id", unique=True),
+    )
+
+class CashflowMonth(Base):
+    __tablename__ = "cashflow_months"
+
+    # Maintained rollup of payment_schedule (see cashflow.py); project_id 0 holds the all-projects total
+    project_id = Column(Integer, primary_key=True)
+    category = Column(String, primary_key=True) # "" for payments without a category
+    month = Column(Date, primary_key=True) # First day of the month
+    planned_amount = Column(Float, nullable=False, default=0.0) # By plan_date
+    paid_amount = Column(Float, nullable=False, default=0.0) # By payment_date (plan_date if unset)
+    unpaid_amount = Column(Float, nullable=False, default=0.0) # Not yet paid, by plan_date
+    payment_count = Column(Integer, nullable=False, default=0)
+
+class OpexLedgerItem(Base):
+    __tablename__ = "opex_ledger_items"
+
+    # Department OPEX budget line, grouped under a category heading per fiscal year
+    id = Column(Integer, primary_key=True, index=True)
+    fiscal_year = Column(Integer, nullable=False)
+    category = Column(String, nullable=False)
+    code = Column(String, nullable=True) # Account code
+    name = Column(String, nullable=False)
+    planned_amount = Column(Float, default=0.0) # Budget Plan
+    approved_amount = Column(Float, default=0.0) # Opening balance for transactions
+    status = Column(String, default="Draft")
+
+    transactions = relationship("OpexTransaction", back_populates="item", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_opex_ledger_items_year_category", "fiscal_year", "category", "id"),
+    )
+
+class OpexTransaction(Base):
+    __tablename__ = "opex_transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey("opex_ledger_items.id"), nullable=False)
+    transaction_date = Column(Date, nullable=False)
+    po_number = Column(String, nullable=True)
+    item_name = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    entry_type = Column(String, default="Debit") # Debit (spend) or Credit (refund / top-up)
+    amount = Column(Float, default=0.0)
+
+    item = relationship("OpexLedgerItem", back_populates="transactions")
+
+    __table_args__ = (
+        # Per-item totals and running balances, and per-period (month) rollups
+        Index("ix_opex_transactions_item_date", "item_id", "transaction_date", "id"),
+        Index("ix_opex_transactions_date", "transaction_date"),
+    )
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    # One row per scope ("projects", "users"), bumped on every write (see versioning.py)
+    scope = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+
+    # Deleted rows of synced tables, so /api/sync can report deletes
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=True)
+    version = Column(BigInteger, default=current_data_version, nullable=False, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # Background work queue (see jobs.py); each row is also the progress record clients poll
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False) # e.g. payments.import, export, evm.recalculate
+    status = Column(String, nullable=False, default="queued") # queued, running, succeeded, failed, cancelled
+    project_id = Column(Integer, nullable=True, index=True)
+    params = Column(JSON, nullable=True)
+    input_path = Column(String, nullable=True) # Uploaded file, kept until the job succeeds (for retries)
+    output_path = Column(String, nullable=True) # Generated file served by /api/jobs/{id}/download
+    progress = Column(Integer, nullable=False, default=0) # Percent
+    message = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Integer, nullable=False, default=0)
+    worker = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Queue scan: oldest queued job first
+        Index("ix_jobs_status_id", "status", "id"),
+    )
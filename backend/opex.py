@@ -0,0 +1,133 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+import models
+
+def signed_amount():
+    """Spend contributed by a transaction: debits add, credits subtract (as the ledger UI does)"""
+    tx = models.OpexTransaction
+    return case((tx.entry_type == "Debit", tx.amount), else_=-tx.amount)
+
+def item_actuals_subquery(db: Session, fiscal_year: int):
+    """Per-item transaction count and net spend, aggregated over the (item_id, date) index"""
+    tx = models.OpexTransaction
+    item = models.OpexLedgerItem
+    return (
+        db.query(
+            tx.item_id.label("item_id"),
+            func.count(tx.id).label("transaction_count"),
+            func.coalesce(func.sum(signed_amount()), 0.0).label("actual_amount"),
+        )
+        .join(item, item.id == tx.item_id)
+        .filter(item.fiscal_year == fiscal_year)
+        .group_by(tx.item_id)
+        .subquery()
+    )
+
+def ledger_items(db: Session, fiscal_year: int):
+    """Ledger lines of a fiscal year with their transaction totals, in category order"""
+    item = models.OpexLedgerItem
+    actuals = item_actuals_subquery(db, fiscal_year)
+    actual_amount = func.coalesce(actuals.c.actual_amount, 0.0)
+    rows = (
+        db.query(
+            item,
+            func.coalesce(actuals.c.transaction_count, 0),
+            actual_amount,
+        )
+        .outerjoin(actuals, actuals.c.item_id == item.id)
+        .filter(item.fiscal_year == fiscal_year)
+        .order_by(item.category, item.id)
+        .all()
+    )
+    results = []
+    for db_item, transaction_count, actual in rows:
+        results.append({
+            "id": db_item.id,
+            "fiscal_year": db_item.fiscal_year,
+            "category": db_item.category,
+            "code": db_item.code,
+            "name": db_item.name,
+            "planned_amount": db_item.planned_amount or 0.0,
+            "approved_amount": db_item.approved_amount or 0.0,
+            "status": db_item.status,
+            "transaction_count": transaction_count,
+            "actual_amount": actual,
+            "balance": (db_item.approved_amount or 0.0) - actual,
+        })
+    return results
+
+def category_totals(db: Session, fiscal_year: int):
+    """Plan, approved and actual amounts grouped by category"""
+    item = models.OpexLedgerItem
+    actuals = item_actuals_subquery(db, fiscal_year)
+    return (
+        db.query(
+            item.category,
+            func.count(item.id),
+            func.coalesce(func.sum(item.planned_amount), 0.0),
+            func.coalesce(func.sum(item.approved_amount), 0.0),
+            func.coalesce(func.sum(actuals.c.actual_amount), 0.0),
+        )
+        .outerjoin(actuals, actuals.c.item_id == item.id)
+        .filter(item.fiscal_year == fiscal_year)
+        .group_by(item.category)
+        .order_by(item.category)
+        .all()
+    )
+
+def period_totals(db: Session, fiscal_year: int):
+    """Debits and credits grouped by transaction month"""
+    tx = models.OpexTransaction
+    item = models.OpexLedgerItem
+    year = func.extract("year", tx.transaction_date)
+    month = func.extract("month", tx.transaction_date)
+    is_debit = tx.entry_type == "Debit"
+    return (
+        db.query(
+            year,
+            month,
+            func.coalesce(func.sum(case((is_debit, tx.amount), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_debit, 0.0), else_=tx.amount)), 0.0),
+        )
+        .join(item, item.id == tx.item_id)
+        .filter(item.fiscal_year == fiscal_year)
+        .group_by(year, month)
+        .order_by(year, month)
+        .all()
+    )
+
+def opex_summary(db: Session, fiscal_year: int):
+    """Fiscal year totals with per-category and per-month rollups (two GROUP BY queries)"""
+    summary = {
+        "fiscal_year": fiscal_year,
+        "planned_amount": 0.0,
+        "approved_amount": 0.0,
+        "actual_amount": 0.0,
+        "balance": 0.0,
+        "categories": [],
+        "periods": [],
+    }
+
+    for category, count, planned, approved, actual in category_totals(db, fiscal_year):
+        summary["planned_amount"] += planned
+        summary["approved_amount"] += approved
+        summary["actual_amount"] += actual
+        summary["categories"].append({
+            "category": category,
+            "item_count": count,
+            "planned_amount": planned,
+            "approved_amount": approved,
+            "actual_amount": actual,
+            "balance": approved - actual,
+        })
+    summary["balance"] = summary["approved_amount"] - summary["actual_amount"]
+
+    for year, month, debit, credit in period_totals(db, fiscal_year):
+        summary["periods"].append({
+            "period": f"{int(year):04d}-{int(month):02d}",
+            "debit": debit,
+            "credit": credit,
+            "net": debit - credit,
+        })
+
+    return summary
@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(value, row_id: int) -> str:
+    """Opaque cursor holding the last row's sort value and id"""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+class Keyset:
+    """
+    Keyset (seek) pagination over (sort column, id).
+    Each page is an index range scan starting after the previous page's last row,
+    so latency does not grow with the page number the way OFFSET does.
+    """
+
+    def __init__(self, sortable: dict, id_column, sort: str = "id", cursor: Optional[str] = None, limit: Optional[int] = None):
+        descending = sort.startswith("-")
+        name = sort.lstrip("-")
+        if name not in sortable:
+            raise ValueError(f"Invalid sort field. Use one of: {', '.join(sortable)}")
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        self.sort_name = name
+        self.sort_column = sortable[name]
+        self.id_column = id_column
+        self.descending = descending
+        self.limit = limit
+        self.after = self._decode(cursor) if cursor else None
+
+    def _decode(self, cursor: str):
+        value, row_id = decode_cursor(cursor)
+        return (value if self.sort_column is self.id_column else self._coerce(value)), row_id
+
+    def _coerce(self, value):
+        """The cursor's sort value as the sort column's type; ValueError if it cannot be one"""
+        if value is None:
+            return None
+        python_type = self.sort_column.type.python_type
+        if python_type is date:
+            if not isinstance(value, str):
+                raise ValueError("Invalid cursor")
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                raise ValueError("Invalid cursor")
+        if python_type is str:
+            valid = isinstance(value, str)
+        else:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if not valid:
+            raise ValueError("Invalid cursor")
+        return value
+
+    def apply(self, query):
+        column, id_column = self.sort_column, self.id_column
+        if self.after is not None:
+            value, last_id = self.after
+            if column is id_column:
+                query = query.filter(id_column < last_id if self.descending else id_column > last_id)
+            elif self.descending:
+                query = query.filter(or_(column < value, and_(column == value, id_column < last_id)))
+            else:
+                query = query.filter(or_(column > value, and_(column == value, id_column > last_id)))
+
+        if column is id_column:
+            order = (id_column.desc(),) if self.descending else (id_column,)
+        else:
+            order = (column.desc(), id_column.desc()) if self.descending else (column, id_column)
+        query = query.order_by(*order)
+
+        if self.limit is not None:
+            # One extra row tells us whether another page exists
+            query = query.limit(self.limit + 1)
+        return query
+
+    def paginate(self, rows: list):
+        """Trim the look-ahead row and return (rows, next_cursor)"""
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        last = rows[-1]
+        if isinstance(last, dict):
+            value, row_id = last[self.sort_name], last["id"]
+        else:
+            value, row_id = getattr(last, self.sort_name), last.id
+        return rows, encode_cursor(value, row_id)
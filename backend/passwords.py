@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+# bcrypt cost factor for new hashes; logins transparently rehash passwords stored with another cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes per API process (0 runs bcrypt on the default thread executor instead)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify jobs admitted at once (running + queued); later callers wait up to HASH_QUEUE_TIMEOUT
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(max(HASH_WORKERS, 1) * 8)))
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "5"))
+
+class HasherBusy(Exception):
+    """The hashing queue stayed full for HASH_QUEUE_TIMEOUT seconds"""
+
+# Worker functions (module level so the process pool can pickle them)
+
+def hash_password_sync(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+def verify_password_sync(password: str, hashed: Optional[str]) -> bool:
+    if not hashed:
+        return False
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError: # Not a bcrypt hash
+        return False
+
+def hash_rounds(hashed: Optional[str]) -> Optional[int]:
+    """Cost factor of a stored "$2b$12$..." hash"""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed: Optional[str], rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_rounds(hashed) != rounds
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated, size-bounded process pool so hashing neither holds
+    the request threadpool nor competes with request handling for the GIL.
+    At most `queue_limit` jobs are admitted at a time; callers beyond that wait
+    for a slot and get HasherBusy after `queue_timeout` (backpressure).
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT,
+                 queue_timeout: float = HASH_QUEUE_TIMEOUT, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.rounds = rounds
+        self._executor = None
+        self._slots = None
+        self._loop = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn: forking a process that already runs threads and an event loop is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.queue_limit)
+        return self._slots
+
+    async def _run(self, fn, *args):
+        self.start()
+        slots = self._semaphore()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HasherBusy()
+        self.in_flight += 1
+        try:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            except BrokenProcessPool: # A worker died (e.g. OOM-killed): replace the pool and retry once
+                self.stop()
+                self.start()
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password_sync, password, self.rounds)
+
+    async def verify(self, password: str, hashed: Optional[str]) -> bool:
+        return await self._run(verify_password_sync, password, hashed)
+
+    def needs_rehash(self, hashed: Optional[str]) -> bool:
+        return needs_rehash(hashed, self.rounds)
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+hasher = PasswordHasher()
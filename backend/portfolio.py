@@ -0,0 +1,134 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import case, func, not_, or_
+from sqlalchemy.orm import Session
+import models
+
+# Status buckets used by the dashboards
+PRE_STATUSES = ("Not Started",)
+COMPLETED_STATUSES = ("Completed",)
+HEALTH_COLUMNS = ("schedule_status", "budget_status", "risk_status", "scope_status", "resource_status")
+
+def category_exclusion(excluded: list[str], column=None):
+    """
+    WHERE clause dropping rows whose category (payment category by default) contains any
+    excluded keyword. Case-sensitive like the frontend's includes(): LIKE ignores case on
+    SQLite, so containment is tested as replace(category, keyword, '') != category, which
+    compares exactly on every backend. Blank keywords are ignored.
+    """
+    excluded = [keyword for keyword in (excluded or []) if keyword]
+    if not excluded:
+        return None
+    category = func.coalesce(column if column is not None else models.PaymentSchedule.category, "")
+    return not_(or_(*[func.replace(category, keyword, "") != category for keyword in excluded]))
+
+def _health_bucket():
+    """Worst health status across all dimensions: Critical > At Risk > Good"""
+    columns = [getattr(models.ProjectHealth, name) for name in HEALTH_COLUMNS]
+    return case(
+        (or_(*[c == "Critical" for c in columns]), "Critical"),
+        (or_(*[c == "At Risk" for c in columns]), "At Risk"),
+        else_="Good",
+    )
+
+def project_status_totals(db: Session):
+    """Project count and planned cost grouped by status"""
+    return (
+        db.query(
+            models.Project.status,
+            func.count(models.Project.id),
+            func.coalesce(func.sum(models.Project.planned_cost), 0.0),
+        )
+        .group_by(models.Project.status)
+        .all()
+    )
+
+def payment_category_totals(db: Session, excluded: list[str], today: date):
+    """Committed, paid and overdue amounts grouped by payment category"""
+    payment = models.PaymentSchedule
+    is_paid = payment.status == "Paid"
+    is_overdue = (payment.status != "Paid") & (payment.plan_date < today)
+    query = db.query(
+        payment.category,
+        func.count(payment.id),
+        func.coalesce(func.sum(payment.planned_amount), 0.0),
+        func.coalesce(func.sum(case((is_paid, payment.paid_amount), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((is_overdue, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((is_overdue, payment.planned_amount), else_=0.0)), 0.0),
+    )
+    exclusion = category_exclusion(excluded)
+    if exclusion is not None:
+        query = query.filter(exclusion)
+    return query.group_by(payment.category).all()
+
+def running_health_totals(db: Session):
+    """Running project count grouped by their worst health status"""
+    bucket = _health_bucket().label("bucket")
+    return (
+        db.query(bucket, func.count(models.Project.id))
+        .select_from(models.Project)
+        .outerjoin(models.ProjectHealth, models.ProjectHealth.project_id == models.Project.id)
+        .filter(models.Project.status.notin_(PRE_STATUSES + COMPLETED_STATUSES))
+        .group_by(bucket)
+        .all()
+    )
+
+def portfolio_summary(db: Session, excluded: Optional[list[str]] = None, today: Optional[date] = None):
+    """Portfolio KPIs computed with three GROUP BY queries"""
+    excluded = [keyword for keyword in (excluded or []) if keyword]
+    today = today or date.today()
+
+    summary = {
+        "total_projects": 0,
+        "pre_count": 0,
+        "active_count": 0,
+        "completed_count": 0,
+        "delayed_count": 0,
+        "total_planned_cost": 0.0,
+        "total_committed": 0.0,
+        "total_paid": 0.0,
+        "overdue_count": 0,
+        "total_overdue_amount": 0.0,
+        "critical_count": 0,
+        "at_risk_count": 0,
+        "on_track_count": 0,
+        "excluded_categories": excluded,
+        "categories": [],
+    }
+
+    for project_status, count, planned_cost in project_status_totals(db):
+        summary["total_projects"] += count
+        summary["total_planned_cost"] += planned_cost
+        if project_status in PRE_STATUSES:
+            summary["pre_count"] += count
+        elif project_status in COMPLETED_STATUSES:
+            summary["completed_count"] += count
+        else:
+            summary["active_count"] += count
+            if project_status == "Delayed":
+                summary["delayed_count"] += count
+
+    for category, count, committed, paid, overdue_count, overdue_amount in payment_category_totals(db, excluded, today):
+        summary["total_committed"] += committed
+        summary["total_paid"] += paid
+        summary["overdue_count"] += overdue_count
+        summary["total_overdue_amount"] += overdue_amount
+        summary["categories"].append({
+            "category": category,
+            "payment_count": count,
+            "committed": committed,
+            "paid": paid,
+            "overdue_count": overdue_count,
+            "overdue_amount": overdue_amount,
+        })
+
+    for bucket, count in running_health_totals(db):
+        if bucket == "Critical":
+            summary["critical_count"] += count
+        elif bucket == "At Risk":
+            summary["at_risk_count"] += count
+        else:
+            summary["on_track_count"] += count
+
+    return summary
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, cache
+
+# Resolved users are cached per access token for this long (override via environment).
+# Edits to a user and logouts drop the cached entries right away, which only holds for every
+# worker if the store is shared: the cache follows CACHE_BACKEND when that is redis and is
+# off otherwise. PRINCIPAL_CACHE_BACKEND=memory is only safe with a single worker process.
+PRINCIPAL_CACHE_BACKEND = os.getenv("PRINCIPAL_CACHE_BACKEND", "redis" if cache.CACHE_BACKEND == "redis" else "off")
+PRINCIPAL_TTL_SECONDS = int(os.getenv("PRINCIPAL_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "4096"))
+PRINCIPAL_REDIS_PREFIX = cache.REDIS_PREFIX + "auth:"
+
+class Principal(NamedTuple):
+    """The authenticated user, detached from any session"""
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: str
+
+def token_id(payload: dict, token: str) -> str:
+    """The token's jti claim (tokens issued without one are keyed by their digest)"""
+    return payload.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class PrincipalCache:
+    """
+    Token -> principal lookups that skip the users table while an entry is fresh.
+    Entries are keyed by the subject's generation counter, which every change to
+    the user bumps, so invalidation is O(1) and covers all of the user's tokens.
+    The revocation list itself lives in the database (revoked_tokens): a revoked
+    token is never cached, and revoking bumps the generation, so the next request
+    with it misses and is rejected by the lookup query.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self.stats = cache.CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def _generation_key(self, email: str) -> str:
+        return f"user:{email}:gen"
+
+    def _key(self, email: str, generation: int, jti: str) -> str:
+        return f"user:{email}:v{generation}:{jti}"
+
+    def _lookup(self, email: str, jti: str) -> tuple[str, Optional[bytes]]:
+        key = self._key(email, self.store.counter(self._generation_key(email)), jti)
+        return key, self.store.get(key)
+
+    async def resolve(self, db: AsyncSession, email: str, jti: str) -> Optional[Principal]:
+        """The token subject's principal, or None if the user is gone or the token was revoked"""
+        if self.enabled:
+            # A shared store's round-trips run on the threadpool (see cache.offload)
+            key, value = await cache.offload(self.store, self._lookup, email, jti)
+            if value is not None:
+                self.stats.hits += 1
+                return Principal(*json.loads(value))
+            self.stats.misses += 1
+
+        # One round-trip for both the user and the revocation list
+        result = await db.execute(
+            select(models.User, models.RevokedToken.jti)
+            .outerjoin(models.RevokedToken, models.RevokedToken.jti == jti)
+            .filter(models.User.email == email)
+        )
+        row = result.first()
+        if row is None or row[1] is not None:
+            return None
+        user = row[0]
+        principal = Principal(user.id, user.email, user.full_name, user.role)
+        if self.enabled:
+            await cache.offload(self.store, self.store.set, key, json.dumps(principal).encode("utf-8"))
+            self.stats.stores += 1
+        return principal
+
+    def invalidate(self, *emails: str):
+        """Call after committing a change to these users (role, email, password, deletion)"""
+        if not self.enabled:
+            return
+        for email in set(emails):
+            if email:
+                self.store.incr(self._generation_key(email))
+                self.stats.invalidations += 1
+
+    async def invalidate_async(self, *emails: str):
+        await cache.offload(self.store, self.invalidate, *emails)
+
+    async def revoke(self, db: AsyncSession, principal: Principal, jti: str, expires_at: datetime):
+        """Add a token to the revocation list (commits), pruning entries that have expired"""
+        await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at < datetime.utcnow()))
+        await db.merge(models.RevokedToken(jti=jti, user_id=principal.id, expires_at=expires_at))
+        await db.commit()
+        await self.invalidate_async(principal.email)
+
+    def clear(self):
+        if self.enabled:
+            self.store.clear()
+
+    def metrics(self) -> dict:
+        data = {
+            "backend": self.store.name if self.enabled else "off",
+            "ttl_seconds": self.store.ttl if self.enabled else 0,
+        }
+        data.update(self.stats.as_dict())
+        data["evictions"] = self.store.evictions if self.enabled else 0
+        return data
+
+principal_cache = PrincipalCache(cache.build_store(
+    PRINCIPAL_CACHE_BACKEND, ttl=PRINCIPAL_TTL_SECONDS, max_entries=PRINCIPAL_CACHE_MAX_ENTRIES, prefix=PRINCIPAL_REDIS_PREFIX,
+    pattern="user:*:v*",
+))
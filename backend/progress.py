@@ -0,0 +1,128 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+import models
+
+# "count": completed tasks / total tasks (maintained counters, O(1) per write)
+# "weighted": completion_percentage rolled up through the parent_id hierarchy
+PROGRESS_MODE = os.getenv("PROGRESS_MODE", "count")
+
+def _counter_progress(total, completed):
+    """progress_percentage expression computed from the counter columns"""
+    return case((total > 0, (completed * 100) // total), else_=0)
+
+def apply_task_delta(db: Session, project_id: int, added: int = 0, completed: int = 0):
+    """
+    Adjust a project's task counters after a task write and refresh its progress.
+    Runs inside the caller's transaction; the caller commits once.
+    """
+    project = models.Project
+    if added or completed:
+        total = project.task_count + added
+        done = project.completed_task_count + completed
+        db.query(project).filter(project.id == project_id).update(
+            {
+                project.task_count: total,
+                project.completed_task_count: done,
+                project.progress_percentage: _counter_progress(total, done),
+            },
+            synchronize_session=False,
+        )
+    if PROGRESS_MODE == "weighted":
+        db.flush()
+        db.query(project).filter(project.id == project_id).update(
+            {project.progress_percentage: weighted_progress(db, project_id)},
+            synchronize_session=False,
+        )
+
+def task_completed(status) -> int:
+    return 1 if status == "Completed" else 0
+
+def apply_completion_date(db_task, update_data: dict) -> dict:
+    """Auto-set completion_date when a task's status changes"""
+    if "status" in update_data:
+        if update_data["status"] == "Completed":
+            # If completion_date is provided and not null, trust it.
+            # If not provided, and not in DB, default to now.
+            if "completion_date" in update_data and update_data["completion_date"]:
+                pass # Use provided date
+            elif not db_task.completion_date:
+                update_data["completion_date"] = datetime.now().date()
+        elif update_data["status"] != "Completed":
+            update_data["completion_date"] = None
+    return update_data
+
+def weighted_progress(db: Session, project_id: int) -> int:
+    """
+    Roll completion_percentage up the WBS tree: a parent is the mean of its children,
+    the project is the mean of its top-level tasks. Completed tasks count as 100.
+    """
+    rows = (
+        db.query(
+            models.ProjectTask.id,
+            models.ProjectTask.parent_id,
+            models.ProjectTask.completion_percentage,
+            models.ProjectTask.status,
+        )
+        .filter(models.ProjectTask.project_id == project_id)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    own = {}
+    children = {}
+    for task_id, parent_id, completion, status in rows:
+        own[task_id] = 100.0 if status == "Completed" else float(min(max(completion or 0, 0), 100))
+    roots = []
+    for task_id, parent_id, _, _ in rows:
+        if parent_id in own and parent_id != task_id:
+            children.setdefault(parent_id, []).append(task_id)
+        else:
+            roots.append(task_id)
+
+    # Post-order walk without recursion; "seen" guards against parent_id cycles
+    value = {}
+    seen = set()
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            task_id, expanded = stack.pop()
+            if expanded:
+                kids = [value[k] for k in children.get(task_id, []) if k in value]
+                value[task_id] = sum(kids) / len(kids) if kids else own[task_id]
+                continue
+            if task_id in seen:
+                continue
+            seen.add(task_id)
+            stack.append((task_id, True))
+            stack.extend((k, False) for k in children.get(task_id, []))
+
+    top = [value[r] for r in roots if r in value]
+    return int(sum(top) / len(top)) if top else 0
+
+def rebuild_task_counters(db: Session, project_id=None):
+    """Recount task_count/completed_task_count from project_tasks (backfill or repair)"""
+    task = models.ProjectTask
+    total = (
+        db.query(func.count(task.id)).filter(task.project_id == models.Project.id).scalar_subquery()
+    )
+    done = (
+        db.query(func.count(task.id))
+        .filter(task.project_id == models.Project.id, task.status == "Completed")
+        .scalar_subquery()
+    )
+    query = db.query(models.Project)
+    if project_id is not None:
+        query = query.filter(models.Project.id == project_id)
+    query.update(
+        {
+            models.Project.task_count: total,
+            models.Project.completed_task_count: done,
+            models.Project.progress_percentage: _counter_progress(total, done),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
@@ -1,12 +1,7 @@
-import bcrypt
 from datetime import date, timedelta
 from sqlalchemy.orm import Session
 import models, database
-
-def get_password_hash(password):
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+from passwords import hash_password_sync as get_password_hash
 
 def reseed():
     # Drop and recreate tables to apply schema changes
@@ -0,0 +1,340 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+
+DEPENDENCY_TYPES = ("FS", "SS", "FF", "SF")
+ID_CHUNK = 5000 # Ids per IN list; databases cap the bound parameters of a statement
+
+def task_rows_query(project_id: int):
+    """Schedule columns of a project's tasks"""
+    task = models.ProjectTask
+    return (
+        select(
+            task.id,
+            task.parent_id,
+            task.task_name,
+            task.status,
+            task.start_date,
+            task.end_date,
+            task.completion_percentage,
+        )
+        .where(task.project_id == project_id)
+        .order_by(task.id)
+    )
+
+def link_rows_query(project_id: int):
+    """(id, predecessor, successor, type, lag) of a project's dependency links"""
+    link = models.TaskDependency
+    return (
+        select(link.id, link.predecessor_id, link.successor_id, link.dependency_type, link.lag_days)
+        .where(link.project_id == project_id)
+        .order_by(link.id)
+    )
+
+def _days(start: Optional[date], end: Optional[date]) -> Optional[int]:
+    """Inclusive calendar days from start to end"""
+    if start is None or end is None:
+        return None
+    return max((end - start).days + 1, 1)
+
+def _index_links(links) -> tuple[dict, dict]:
+    """{predecessor: [(successor, type, lag)]} and {successor: [(predecessor, type, lag)]}"""
+    successors, predecessors = {}, {}
+    for _, predecessor, successor, kind, lag in links:
+        successors.setdefault(predecessor, []).append((successor, kind, lag or 0))
+        predecessors.setdefault(successor, []).append((predecessor, kind, lag or 0))
+    return successors, predecessors
+
+def _downstream(successors: dict, sources: Iterable[int]) -> set:
+    """Every task reachable from the sources through successor links"""
+    reached = set()
+    stack = list(sources)
+    while stack:
+        for successor, _, _ in successors.get(stack.pop(), ()):
+            if successor not in reached:
+                reached.add(successor)
+                stack.append(successor)
+    return reached
+
+def _topological(nodes: set, successors: dict) -> list:
+    """Kahn's algorithm over the links between `nodes`; ValueError if they contain a cycle"""
+    indegree = dict.fromkeys(nodes, 0)
+    for node in nodes:
+        for successor, _, _ in successors.get(node, ()):
+            if successor in indegree:
+                indegree[successor] += 1
+    ready = [node for node, count in indegree.items() if count == 0]
+    order = []
+    while ready:
+        node = ready.pop()
+        order.append(node)
+        for successor, _, _ in successors.get(node, ()):
+            if successor in indegree:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    ready.append(successor)
+    if len(order) < len(nodes):
+        raise ValueError("Task dependencies contain a cycle")
+    return order
+
+def _earliest_start(kind: str, lag: int, predecessor_start: date, predecessor_end: date, duration: int) -> date:
+    """Earliest start a link allows for a successor of `duration` days (inclusive dates)"""
+    if kind == "SS":
+        return predecessor_start + timedelta(days=lag)
+    if kind == "FF":
+        return predecessor_end + timedelta(days=lag - duration + 1)
+    if kind == "SF":
+        return predecessor_start + timedelta(days=lag - duration)
+    return predecessor_end + timedelta(days=lag + 1) # FS
+
+def _latest_finish(kind: str, lag: int, successor_start: int, successor_finish: int, duration: int) -> int:
+    """Latest finish (ordinal) a link allows for a predecessor of `duration` days; mirrors _earliest_start"""
+    if kind == "SS":
+        return successor_start - lag + duration - 1
+    if kind == "FF":
+        return successor_finish - lag
+    if kind == "SF":
+        return successor_finish - lag + duration
+    return successor_start - lag - 1 # FS
+
+def _late_finish(nodes: dict, links, finish: date) -> dict:
+    """
+    Backward pass over dated leaf tasks: the latest finish (ordinal) each can have
+    without pushing a successor or the schedule finish. Links touching summary or
+    undated tasks are ignored; cyclic data falls back to the schedule finish.
+    """
+    dated = {
+        node_id for node_id, node in nodes.items()
+        if not node["children"] and node["start_date"] and node["end_date"]
+    }
+    successors, _ = _index_links(link for link in links if link[1] in dated and link[2] in dated)
+    try:
+        order = _topological(dated, successors)
+    except ValueError:
+        order, successors = list(dated), {}
+
+    def duration(node_id):
+        node = nodes[node_id]
+        return (node["end_date"] - node["start_date"]).days + 1
+
+    late = {}
+    for node_id in reversed(order):
+        latest = finish.toordinal()
+        for successor, kind, lag in successors.get(node_id, ()):
+            successor_start = late[successor] - duration(successor) + 1
+            latest = min(latest, _latest_finish(kind, lag, successor_start, late[successor], duration(node_id)))
+        late[node_id] = latest
+    return late
+
+def _link_tree(nodes: dict) -> list:
+    """
+    Attach every node to its parent in one pass. Tasks whose parent is missing
+    (another project, deleted) become roots, and so does one node of any
+    parent_id cycle, so the result is always a forest.
+    """
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        if parent is None or parent is node:
+            roots.append(node)
+        else:
+            parent["children"].append(node)
+
+    reached = set()
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        reached.add(node["id"])
+        stack.extend(node["children"])
+    for node in nodes.values():
+        if node["id"] in reached:
+            continue
+        nodes[node["parent_id"]]["children"].remove(node) # Break the cycle here
+        roots.append(node)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            reached.add(current["id"])
+            stack.extend(current["children"])
+    return roots
+
+def _sort_key(node: dict):
+    """Siblings in start-date order, undated last"""
+    return (node["start_date"] is None, node["start_date"] or date.min, node["id"])
+
+def _preorder(roots: list) -> list:
+    """Depth-first order with depth and WBS numbers assigned"""
+    order = []
+    stack = [(node, 0, str(index)) for index, node in reversed(list(enumerate(roots, 1)))]
+    while stack:
+        node, depth, wbs = stack.pop()
+        node["depth"] = depth
+        node["wbs"] = wbs
+        order.append(node)
+        children = node["children"]
+        for index in range(len(children), 0, -1):
+            stack.append((children[index - 1], depth + 1, f"{wbs}.{index}"))
+    return order
+
+def build_schedule(project_id: int, rows, links=()) -> dict:
+    """
+    Gantt-ready task tree from flat (id, parent_id, name, status, start, end,
+    completion) rows: linked in one O(n) pass, then siblings sorted by date.
+
+    Summary tasks span their children's dates and report completion weighted
+    by leaf duration. Total slack is the days a task can slip before it delays
+    a successor link or the schedule finish (the minimum over children for
+    summaries); tasks without slack form the critical path. Bars are
+    positioned by offset_days from the schedule start.
+    """
+    nodes = {}
+    for task_id, parent_id, name, status, start, end, completion in rows:
+        nodes[task_id] = {
+            "id": task_id,
+            "parent_id": parent_id,
+            "task_name": name,
+            "status": status,
+            "start_date": start,
+            "end_date": end,
+            "completion_percentage": 100.0 if status == "Completed" else float(completion or 0),
+            "children": [],
+        }
+    roots = _link_tree(nodes)
+
+    # Rollups, children before parents; weights are leaf days (undated leaves count as one day)
+    weight = {}
+    earned = {}
+    for node in reversed(_preorder(roots)):
+        children = node["children"]
+        node["is_summary"] = bool(children)
+        if not children:
+            weight[node["id"]] = _days(node["start_date"], node["end_date"]) or 1
+            earned[node["id"]] = weight[node["id"]] * node["completion_percentage"]
+            continue
+        starts = [child["start_date"] for child in children if child["start_date"]]
+        ends = [child["end_date"] for child in children if child["end_date"]]
+        if node["start_date"]:
+            starts.append(node["start_date"])
+        if node["end_date"]:
+            ends.append(node["end_date"])
+        node["start_date"] = min(starts) if starts else None
+        node["end_date"] = max(ends) if ends else None
+        weight[node["id"]] = sum(weight[child["id"]] for child in children)
+        earned[node["id"]] = sum(earned[child["id"]] for child in children)
+        node["completion_percentage"] = earned[node["id"]] / weight[node["id"]]
+        children.sort(key=_sort_key) # By rolled-up dates
+
+    roots.sort(key=_sort_key)
+    order = _preorder(roots)
+    starts = [node["start_date"] for node in roots if node["start_date"]]
+    ends = [node["end_date"] for node in roots if node["end_date"]]
+    schedule_start = min(starts) if starts else None
+    schedule_finish = max(ends) if ends else None
+    late = _late_finish(nodes, links, schedule_finish) if schedule_finish else {}
+
+    for node in reversed(order):
+        if node["children"]:
+            slacks = [child["total_slack"] for child in node["children"] if child["total_slack"] is not None]
+            node["total_slack"] = min(slacks) if slacks else None
+        elif node["id"] in late:
+            node["total_slack"] = late[node["id"]] - node["end_date"].toordinal()
+        else:
+            node["total_slack"] = None
+        node["is_critical"] = node["total_slack"] is not None and node["total_slack"] <= 0
+        node["duration_days"] = _days(node["start_date"], node["end_date"])
+        node["offset_days"] = (node["start_date"] - schedule_start).days if node["start_date"] and schedule_start else None
+        node["completion_percentage"] = round(node["completion_percentage"], 1)
+
+    total_weight = sum(weight[node["id"]] for node in roots)
+    return {
+        "project_id": project_id,
+        "start_date": schedule_start,
+        "end_date": schedule_finish,
+        "duration_days": _days(schedule_start, schedule_finish),
+        "completion_percentage": round(sum(earned[node["id"]] for node in roots) / total_weight, 1) if total_weight else 0.0,
+        "task_count": len(order),
+        "critical_path": [node["id"] for node in order if node["is_critical"] and not node["is_summary"]],
+        "tasks": roots,
+        "dependencies": [
+            {"id": link_id, "predecessor_id": predecessor, "successor_id": successor, "dependency_type": kind, "lag_days": lag}
+            for link_id, predecessor, successor, kind, lag in links
+        ],
+    }
+
+async def load_schedule_async(db: AsyncSession, project_id: int) -> dict:
+    tasks = await db.execute(task_rows_query(project_id))
+    links = await db.execute(link_rows_query(project_id))
+    return build_schedule(project_id, tasks.all(), links.all())
+
+# Rescheduling
+
+def creates_cycle(db: Session, project_id: int, predecessor_id: int, successor_id: int) -> bool:
+    """Whether a predecessor -> successor link would close a loop (the predecessor is downstream of the successor)"""
+    if predecessor_id == successor_id:
+        return True
+    successors, _ = _index_links(db.execute(link_rows_query(project_id)).all())
+    return predecessor_id in _downstream(successors, [successor_id])
+
+def reschedule(db: Session, project_id: int, source_ids: Iterable[int]) -> list[int]:
+    """
+    Forward pass after the sources' dates (or their links) changed: successors are
+    pushed later, keeping their duration, until every FS/SS/FF/SF link and lag is
+    satisfied. Only the downstream subgraph of the sources is visited, in
+    topological order, and tasks are never pulled earlier. Raises ValueError on a
+    cycle. Flushes but does not commit; returns the ids of moved tasks.
+    """
+    source_ids = list(source_ids)
+    db.flush()
+    successors, predecessors = _index_links(db.execute(link_rows_query(project_id)).all())
+    affected = _downstream(successors, source_ids)
+    if not affected:
+        return []
+    order = _topological(affected, successors)
+
+    # Dates of the affected tasks and of their predecessors only, not the whole plan
+    needed = set(affected)
+    for node in affected:
+        needed.update(predecessor for predecessor, _, _ in predecessors.get(node, ()))
+    needed = sorted(needed)
+    task = models.ProjectTask
+    dates = {}
+    for offset in range(0, len(needed), ID_CHUNK):
+        rows = db.execute(
+            select(task.id, task.start_date, task.end_date).where(task.id.in_(needed[offset:offset + ID_CHUNK]))
+        )
+        dates.update((task_id, (start, end)) for task_id, start, end in rows)
+
+    moved = {}
+    for node in order:
+        start, end = dates.get(node, (None, None))
+        if start is None or end is None:
+            continue
+        duration = (end - start).days + 1
+        required = start
+        for predecessor, kind, lag in predecessors.get(node, ()):
+            predecessor_start, predecessor_end = dates.get(predecessor, (None, None))
+            if predecessor_start and predecessor_end:
+                required = max(required, _earliest_start(kind, lag, predecessor_start, predecessor_end, duration))
+        if required > start:
+            dates[node] = moved[node] = (required, end + (required - start))
+
+    if moved:
+        db.execute(update(task), [
+            {"id": task_id, "start_date": start, "end_date": end}
+            for task_id, (start, end) in moved.items()
+        ])
+    return list(moved)
+
+def delete_links(db: Session, project_id: int, task_ids: Iterable[int]):
+    """Drop the dependency links of a project's tasks that are about to be deleted"""
+    task_ids = list(task_ids)
+    if task_ids:
+        link = models.TaskDependency
+        db.execute(delete(link).where(
+            link.project_id == project_id,
+            or_(link.predecessor_id.in_(task_ids), link.successor_id.in_(task_ids)),
+        ))
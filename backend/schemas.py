@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -85,6 +85,23 @@ class Project(ProjectBase):
     class Config:
         from_attributes = True
 
+class ProjectSummary(BaseModel):
+    """Lightweight list projection without health, payments or tasks"""
+    id: int
+    name: str
+    project_code: Optional[str] = None
+    project_manager: Optional[str] = None
+    assigned_to_email: Optional[str] = None
+    status: Optional[str] = None
+    progress_percentage: Optional[int] = 0
+    start_date: date
+    end_date: date
+    planned_cost: float
+    actual_cost: Optional[float] = 0.0
+
+    class Config:
+        from_attributes = True
+
 # Payment Schedule Schemas
 class PaymentScheduleBase(BaseModel):
     category: Optional[str] = "Project Implementation"
@@ -211,6 +228,147 @@ class ProjectTask(ProjectTaskBase):
     class Config:
         from_attributes = True
 
+# Task Dependency Schemas
+class TaskDependencyBase(BaseModel):
+    predecessor_id: int
+    successor_id: int
+    dependency_type: Optional[str] = "FS" # FS, SS, FF or SF
+    lag_days: Optional[int] = 0
+
+class TaskDependencyCreate(TaskDependencyBase):
+    pass
+
+class TaskDependencyUpdate(BaseModel):
+    dependency_type: Optional[str] = None
+    lag_days: Optional[int] = None
+
+class TaskDependency(TaskDependencyBase):
+    id: int
+    project_id: int
+
+    class Config:
+        from_attributes = True
+
+# OPEX Ledger Schemas
+class OpexLedgerItemBase(BaseModel):
+    category: str
+    code: Optional[str] = None
+    name: str
+    planned_amount: Optional[float] = 0.0
+    approved_amount: Optional[float] = 0.0
+    status: Optional[str] = "Draft"
+
+class OpexLedgerItemCreate(OpexLedgerItemBase):
+    fiscal_year: int
+
+class OpexLedgerItemUpdate(BaseModel):
+    category: Optional[str] = None
+    code: Optional[str] = None
+    name: Optional[str] = None
+    planned_amount: Optional[float] = None
+    approved_amount: Optional[float] = None
+    status: Optional[str] = None
+
+class OpexLedgerItem(OpexLedgerItemBase):
+    id: int
+    fiscal_year: int
+
+    class Config:
+        from_attributes = True
+
+class OpexLedgerItemTotals(OpexLedgerItem):
+    transaction_count: int = 0
+    actual_amount: float = 0.0
+    balance: float = 0.0
+
+class OpexTransactionBase(BaseModel):
+    transaction_date: date
+    po_number: Optional[str] = None
+    item_name: Optional[str] = None
+    description: Optional[str] = None
+    entry_type: Optional[str] = "Debit"
+    amount: Optional[float] = 0.0
+
+class OpexTransactionCreate(OpexTransactionBase):
+    pass
+
+class OpexTransactionUpdate(BaseModel):
+    transaction_date: Optional[date] = None
+    po_number: Optional[str] = None
+    item_name: Optional[str] = None
+    description: Optional[str] = None
+    entry_type: Optional[str] = None
+    amount: Optional[float] = None
+
+class OpexTransaction(OpexTransactionBase):
+    id: int
+    item_id: int
+
+    class Config:
+        from_attributes = True
+
+class OpexCategoryTotals(BaseModel):
+    category: str
+    item_count: int = 0
+    planned_amount: float = 0.0
+    approved_amount: float = 0.0
+    actual_amount: float = 0.0
+    balance: float = 0.0
+
+class OpexPeriodTotals(BaseModel):
+    period: str # YYYY-MM
+    debit: float = 0.0
+    credit: float = 0.0
+    net: float = 0.0
+
+class OpexSummary(BaseModel):
+    fiscal_year: int
+    planned_amount: float = 0.0
+    approved_amount: float = 0.0
+    actual_amount: float = 0.0
+    balance: float = 0.0
+    categories: list[OpexCategoryTotals] = []
+    periods: list[OpexPeriodTotals] = []
+
+# Batch Mutation Schemas
+class ProjectTaskBatchUpdate(ProjectTaskUpdate):
+    id: int
+
+class ProjectTaskBatch(BaseModel):
+    create: list[ProjectTaskCreate] = []
+    update: list[ProjectTaskBatchUpdate] = []
+    delete: list[int] = []
+
+class PaymentScheduleBatchUpdate(PaymentScheduleUpdate):
+    id: int
+
+class PaymentScheduleBatch(BaseModel):
+    create: list[PaymentScheduleCreate] = []
+    update: list[PaymentScheduleBatchUpdate] = []
+    delete: list[int] = []
+
+class MattersArisingBatchUpdate(MattersArisingUpdate):
+    id: int
+
+class MattersArisingBatch(BaseModel):
+    create: list[MattersArisingCreate] = []
+    update: list[MattersArisingBatchUpdate] = []
+    delete: list[int] = []
+
+class BatchItemResult(BaseModel):
+    op: str # create, update, delete
+    index: int # Position within its create/update/delete list
+    id: Optional[int] = None
+    status: str = "ok" # ok, error
+    detail: Optional[str] = None
+
+class BatchResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: list[BatchItemResult] = []
+
 # Composite Project Details Schema
 class ProjectDetails(Project):
     payments: list[PaymentSchedule] = []
@@ -219,3 +377,174 @@ class ProjectDetails(Project):
     
     class Config:
         from_attributes = True
+
+# Portfolio Summary Schemas
+class PortfolioCategoryTotals(BaseModel):
+    category: Optional[str] = None
+    payment_count: int = 0
+    committed: float = 0.0
+    paid: float = 0.0
+    overdue_count: int = 0
+    overdue_amount: float = 0.0
+
+class PortfolioSummary(BaseModel):
+    total_projects: int = 0
+    pre_count: int = 0
+    active_count: int = 0
+    completed_count: int = 0
+    delayed_count: int = 0
+    total_planned_cost: float = 0.0
+    total_committed: float = 0.0
+    total_paid: float = 0.0
+    overdue_count: int = 0
+    total_overdue_amount: float = 0.0
+    critical_count: int = 0
+    at_risk_count: int = 0
+    on_track_count: int = 0
+    excluded_categories: list[str] = []
+    categories: list[PortfolioCategoryTotals] = []
+
+# Cash Flow Schemas
+class CashflowPoint(BaseModel):
+    month: str # YYYY-MM
+    planned: float = 0.0
+    paid: float = 0.0
+    overdue: float = 0.0
+    cumulative_planned: float = 0.0
+    cumulative_paid: float = 0.0
+
+class CashflowSummary(BaseModel):
+    project_id: Optional[int] = None
+    excluded_categories: list[str] = []
+    total_planned: float = 0.0
+    total_paid: float = 0.0
+    total_overdue: float = 0.0
+    months: list[CashflowPoint] = []
+
+# Schedule Schemas
+class ScheduleTask(BaseModel):
+    id: int
+    parent_id: Optional[int] = None
+    task_name: str
+    status: Optional[str] = None
+    wbs: str
+    depth: int
+    is_summary: bool
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    duration_days: Optional[int] = None
+    offset_days: Optional[int] = None # Days from the schedule start, for bar placement
+    completion_percentage: float
+    total_slack: Optional[int] = None
+    is_critical: bool
+    children: list["ScheduleTask"] = []
+
+class ScheduleDependency(TaskDependencyBase):
+    id: int
+
+class ProjectSchedule(BaseModel):
+    project_id: int
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    duration_days: Optional[int] = None
+    completion_percentage: float
+    task_count: int
+    critical_path: list[int] = []
+    tasks: list[ScheduleTask] = []
+    dependencies: list[ScheduleDependency] = []
+
+# Search Schemas
+class SearchHit(BaseModel):
+    entity: str # project, task, matter or payment
+    id: int
+    project_id: int
+    project_name: Optional[str] = None
+    title: str
+    snippet: Optional[str] = None
+    score: float # Higher is more relevant
+
+class SearchResults(BaseModel):
+    query: str
+    results: list[SearchHit] = []
+
+# Earned Value Schemas
+class EvmMetrics(BaseModel):
+    project_id: int
+    bac: float = 0.0 # Budget at completion (planned_cost)
+    pv: float = 0.0
+    ev: float = 0.0
+    ac: float = 0.0
+    cpi: Optional[float] = None # None until there is actual cost
+    spi: Optional[float] = None # None until there is planned value
+    eac: float = 0.0
+    vac: float = 0.0
+    schedule_status: str
+    budget_status: str
+
+class EvmRecalculation(BaseModel):
+    projects: int = 0
+    updated: int = 0
+
+# Delta Sync Schemas
+class SyncStamp(BaseModel):
+    version: int = 0
+    updated_at: Optional[datetime] = None
+
+class SyncProject(ProjectBase, SyncStamp):
+    id: int
+    task_count: int = 0
+    completed_task_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+class SyncProjectTask(ProjectTask, SyncStamp):
+    pass
+
+class SyncPaymentSchedule(PaymentSchedule, SyncStamp):
+    pass
+
+class SyncMattersArising(MattersArising, SyncStamp):
+    pass
+
+class SyncTombstone(BaseModel):
+    table_name: str
+    row_id: int
+    project_id: Optional[int] = None
+    version: int
+
+    class Config:
+        from_attributes = True
+
+class SyncChanges(BaseModel):
+    since: int
+    version: int # Pass back as ?since= on the next poll
+    projects: list[SyncProject] = []
+    tasks: list[SyncProjectTask] = []
+    payments: list[SyncPaymentSchedule] = []
+    matters: list[SyncMattersArising] = []
+    deleted: list[SyncTombstone] = []
+
+# Background Job Schemas
+class JobCreate(BaseModel):
+    kind: str # e.g. export, evm.recalculate, cashflow.rebuild
+    params: dict = {}
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str # queued, running, succeeded, failed, cancelled
+    project_id: Optional[int] = None
+    params: Optional[dict] = None
+    progress: int = 0
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,178 @@
+import os
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# PostgreSQL text search configuration ("simple" does no stemming, fine for mixed-language text)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+MAX_QUERY_TERMS = 8
+INDEX_TABLE = "search_index"
+
+class Source(NamedTuple):
+    entity: str
+    table: str
+    code: int # rowid = id * len(SOURCES) + code, so a row's index entry is a rowid lookup
+    project_column: str
+    title: str
+    body: tuple
+
+SOURCES = (
+    Source("project", "projects", 0, "id", "name", ("project_code", "description")),
+    Source("task", "project_tasks", 1, "project_id", "task_name", ()),
+    Source("matter", "matters_arising", 2, "project_id", "issue_description", ("action_updates", "remarks")),
+    Source("payment", "payment_schedule", 3, "project_id", "deliverable", ("invoice_number", "po_number")),
+)
+ENTITIES = tuple(source.entity for source in SOURCES)
+
+def _title(source: Source, row: str) -> str:
+    return f"coalesce({row}{source.title}, '')"
+
+def _body(source: Source, row: str) -> str:
+    if not source.body:
+        return "''"
+    return " || ' ' || ".join(f"coalesce({row}{column}, '')" for column in source.body)
+
+def _rowid(source: Source, row: str) -> str:
+    return f"{row}id * {len(SOURCES)} + {source.code}"
+
+def _document(source: Source) -> str:
+    """Title and body as one PostgreSQL tsvector (must match the expression index)"""
+    return f"to_tsvector('{SEARCH_TS_CONFIG}', {_title(source, '')} || ' ' || {_body(source, '')})"
+
+# SQLite: one FTS5 table kept in sync by triggers, so ORM writes, bulk statements
+# and imports are all covered
+
+def _sqlite_ddl():
+    yield (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+        "title, body, entity UNINDEXED, entity_id UNINDEXED, project_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    for source in SOURCES:
+        insert_new = (
+            f"INSERT INTO {INDEX_TABLE}(rowid, title, body, entity, entity_id, project_id) VALUES ("
+            f"{_rowid(source, 'new.')}, {_title(source, 'new.')}, {_body(source, 'new.')}, "
+            f"'{source.entity}', new.id, new.{source.project_column});"
+        )
+        delete_old = f"DELETE FROM {INDEX_TABLE} WHERE rowid = {_rowid(source, 'old.')};"
+        columns = ", ".join(dict.fromkeys((source.title, *source.body, source.project_column)))
+        yield f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_ai AFTER INSERT ON {source.table} BEGIN {insert_new} END"
+        yield f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_ad AFTER DELETE ON {source.table} BEGIN {delete_old} END"
+        yield (
+            f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_au AFTER UPDATE OF {columns} ON {source.table} "
+            f"BEGIN {delete_old} {insert_new} END"
+        )
+
+def _sqlite_rebuild():
+    yield f"DELETE FROM {INDEX_TABLE}"
+    for source in SOURCES:
+        yield (
+            f"INSERT INTO {INDEX_TABLE}(rowid, title, body, entity, entity_id, project_id) "
+            f"SELECT {_rowid(source, '')}, {_title(source, '')}, {_body(source, '')}, "
+            f"'{source.entity}', id, {source.project_column} FROM {source.table}"
+        )
+
+# PostgreSQL: expression GIN indexes on the source tables, maintained by the database itself
+
+def _postgres_ddl():
+    for source in SOURCES:
+        yield f"CREATE INDEX IF NOT EXISTS ix_{source.table}_search ON {source.table} USING gin ({_document(source)})"
+
+def install(engine, rebuild: bool = False):
+    """
+    Create the search index (and triggers) if missing. The SQLite index is filled
+    from the source tables when it is empty but they are not, or when rebuild is set.
+    """
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.begin() as conn:
+        for statement in (_sqlite_ddl() if sqlite else _postgres_ddl()):
+            conn.execute(text(statement))
+        if not sqlite:
+            return
+        if not rebuild:
+            indexed = conn.execute(text(f"SELECT rowid FROM {INDEX_TABLE} LIMIT 1")).first()
+            rebuild = indexed is None and any(
+                conn.execute(text(f"SELECT 1 FROM {source.table} LIMIT 1")).first() for source in SOURCES
+            )
+        if rebuild:
+            for statement in _sqlite_rebuild():
+                conn.execute(text(statement))
+
+# Queries
+
+def query_terms(q: str) -> list[str]:
+    """Words of the user's query; everything else (quotes, operators) is dropped"""
+    return re.findall(r"\w+", q.lower())[:MAX_QUERY_TERMS]
+
+def _sqlite_search(terms, entities, project_id, limit):
+    # Every term must match, as a prefix; title hits weigh 10x body hits
+    clauses = [f"{INDEX_TABLE} MATCH :query"]
+    params = {"query": " ".join(f'"{term}"*' for term in terms), "limit": limit}
+    if entities:
+        clauses.append("entity IN :entities")
+        params["entities"] = list(entities)
+    if project_id is not None:
+        clauses.append("project_id = :project_id")
+        params["project_id"] = project_id
+    statement = text(
+        f"SELECT entity, entity_id, project_id, title, snippet({INDEX_TABLE}, -1, '', '', '…', 16) AS snippet, "
+        f"-bm25({INDEX_TABLE}, 10.0, 1.0) AS score "
+        f"FROM {INDEX_TABLE} WHERE {' AND '.join(clauses)} ORDER BY score DESC LIMIT :limit"
+    )
+    if entities:
+        statement = statement.bindparams(bindparam("entities", expanding=True))
+    return statement, params
+
+def _postgres_search(terms, entities, project_id, limit):
+    params = {"query": " & ".join(f"{term}:*" for term in terms), "limit": limit}
+    selects = []
+    for source in SOURCES:
+        if entities and source.entity not in entities:
+            continue
+        where = f"{_document(source)} @@ q.query"
+        if project_id is not None:
+            where += f" AND {source.project_column} = :project_id"
+            params["project_id"] = project_id
+        selects.append(
+            f"SELECT '{source.entity}' AS entity, id AS entity_id, {source.project_column} AS project_id, "
+            f"{_title(source, '')} AS title, left({_body(source, '')}, 160) AS snippet, "
+            f"ts_rank({_document(source)}, q.query) AS score "
+            f"FROM {source.table}, to_tsquery('{SEARCH_TS_CONFIG}', :query) AS q(query) WHERE {where}"
+        )
+    return text(" UNION ALL ".join(selects) + " ORDER BY score DESC LIMIT :limit"), params
+
+async def search_async(
+    db: AsyncSession,
+    q: str,
+    entities: Optional[list[str]] = None,
+    project_id: Optional[int] = None,
+    limit: int = 20,
+) -> list[dict]:
+    """Ranked matches across projects, tasks, matters and payments, with their project names"""
+    terms = query_terms(q)
+    if not terms:
+        return []
+    search = _sqlite_search if db.bind.dialect.name == "sqlite" else _postgres_search
+    statement, params = search(terms, entities, project_id, limit)
+    rows = (await db.execute(statement, params)).mappings().all()
+
+    project_ids = {row["project_id"] for row in rows}
+    names = {}
+    if project_ids:
+        result = await db.execute(select(models.Project.id, models.Project.name).where(models.Project.id.in_(project_ids)))
+        names = dict(result.all())
+    return [
+        {
+            "entity": row["entity"],
+            "id": row["entity_id"],
+            "project_id": row["project_id"],
+            "project_name": names.get(row["project_id"]),
+            "title": row["title"],
+            "snippet": row["snippet"] or None,
+            "score": row["score"],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from datetime import date
+
+import openpyxl
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import models, importers
+
+# Use in-memory SQLite
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+
+# (cell value, number format, expected % complete)
+CASES = [
+    (1.0, "0%", 100), # Excel stores 100% as 1
+    (0.99, "0%", 99),
+    (0.5, "0.0%", 50),
+    (0, "0%", 0),
+    (1, "General", 1), # Plain numbers are percentages already (the tasks export writes 1 for 1%)
+    (50, "General", 50),
+    ("75%", "General", 75),
+    (None, "General", 0),
+]
+
+def test_completion_percentages():
+    print("Testing % Complete parsing in the task import...")
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Task Name", "Start Date", "End Date", "Status", "% Complete"])
+    for index, (value, number_format, _) in enumerate(CASES):
+        ws.append([f"Task {index}", date(2026, 1, 1), date(2026, 1, 31), "In Progress", value])
+        ws.cell(row=ws.max_row, column=5).number_format = number_format
+    path = os.path.join(tempfile.mkdtemp(), "tasks.xlsx")
+    wb.save(path)
+
+    db = TestingSessionLocal()
+    try:
+        project = models.Project(name="Percent Test", start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), planned_cost=1.0)
+        db.add(project)
+        db.flush()
+        importers.import_task_workbook(path, project.id, db)
+        tasks = db.query(models.ProjectTask).order_by(models.ProjectTask.id).all()
+
+        assert len(tasks) == len(CASES)
+        for task, (value, number_format, expected) in zip(tasks, CASES):
+            print(f"{value!r:>8} ({number_format}) -> {task.completion_percentage}%")
+            assert task.completion_percentage == expected, f"{value!r} ({number_format}): expected {expected}"
+        print("✅ MATCH")
+    finally:
+        db.close()
+        os.remove(path)
+
+if __name__ == "__main__":
+    test_completion_percentages()
@@ -0,0 +1,196 @@
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+
+# Writes to these tables bump their own scope's version; everything else bumps "projects"
+SCOPE_BY_TABLE = {
+    "users": "users",
+    "opex_ledger_items": "opex",
+    "opex_transactions": "opex",
+}
+SCOPES = ("projects", "users", "opex")
+UNTRACKED_TABLES = {
+    models.DataVersion.__tablename__,
+    models.Tombstone.__tablename__,
+    models.CashflowMonth.__tablename__, # Derived from payment_schedule in the same transaction
+    models.RevokedToken.__tablename__,
+    models.Job.__tablename__, # Queue bookkeeping, polled via /api/jobs
+}
+# Tables with version/updated_at stamps and tombstones for /api/sync
+SYNCED_TABLES = {
+    models.Project.__tablename__,
+    models.ProjectTask.__tablename__,
+    models.PaymentSchedule.__tablename__,
+    models.MattersArising.__tablename__,
+}
+
+def project_scope(project_id: int) -> str:
+    """Per-project version row, stamped on every write to the project or its child rows"""
+    return f"project:{project_id}"
+
+def scope_for_table(table_name: str) -> Optional[str]:
+    if table_name in UNTRACKED_TABLES:
+        return None
+    return SCOPE_BY_TABLE.get(table_name, "projects")
+
+def ensure_scopes(engine):
+    """Create missing version rows, seeded from the clock so a wiped database never reuses an old ETag"""
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(models.DataVersion.scope)).scalars())
+        for scope in SCOPES:
+            if scope not in existing:
+                conn.execute(insert(models.DataVersion).values(
+                    scope=scope, version=int(time.time() * 1000), updated_at=datetime.utcnow()
+                ))
+
+def _bump(connection, scopes):
+    """
+    Increment the scopes' versions in the current transaction. The new "projects"
+    version is left on connection.info where the version column defaults pick it up.
+    """
+    now = datetime.utcnow()
+    for scope in sorted(scopes):
+        connection.execute(
+            update(models.DataVersion)
+            .where(models.DataVersion.scope == scope)
+            .values(version=models.DataVersion.version + 1, updated_at=now)
+        )
+        if scope == "projects":
+            connection.info["data_version"] = connection.execute(
+                select(models.DataVersion.version).where(models.DataVersion.scope == scope)
+            ).scalar()
+
+def _stamp_projects(connection, project_ids):
+    """Set the projects' own version rows to the data version of the write in progress"""
+    project_ids = sorted({project_id for project_id in project_ids if project_id is not None})
+    if not project_ids:
+        return
+    dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(models.DataVersion).values([
+        {"scope": project_scope(project_id), "version": connection.info["data_version"], "updated_at": datetime.utcnow()}
+        for project_id in project_ids
+    ])
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[models.DataVersion.scope],
+        set_={"version": stmt.excluded.version, "updated_at": stmt.excluded.updated_at},
+    ))
+
+def _project_id(obj):
+    return obj.id if isinstance(obj, models.Project) else getattr(obj, "project_id", None)
+
+def _statement_project_ids(connection, state, table):
+    """Projects touched by a bulk statement, read before it runs"""
+    project_column = table.c.id if table.name == models.Project.__tablename__ else table.c.project_id
+    params = state.parameters or {}
+    rows = params if isinstance(params, list) else [params]
+    if state.is_insert:
+        return {row.get(project_column.key) for row in rows}
+    if state.statement.whereclause is not None:
+        touched = select(project_column).where(state.statement.whereclause)
+    else: # Bulk UPDATE by primary key
+        touched = select(project_column).where(table.c.id.in_([row["id"] for row in rows if "id" in row]))
+    return set(connection.execute(touched.distinct()).scalars())
+
+def _before_flush(session, flush_context, instances):
+    """Bump versions for objects about to be flushed and record tombstones for deletes"""
+    scopes, project_ids = set(), set()
+    changed = list(session.new) + list(session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in changed:
+        scope = scope_for_table(obj.__table__.name)
+        scopes.add(scope)
+        if scope == "projects":
+            project_ids.add(_project_id(obj))
+    scopes.discard(None)
+    if not scopes:
+        return
+    connection = session.connection()
+    _bump(connection, scopes)
+    _stamp_projects(connection, project_ids)
+    for obj in list(session.deleted):
+        table_name = obj.__table__.name
+        if table_name in SYNCED_TABLES:
+            session.add(models.Tombstone(table_name=table_name, row_id=obj.id, project_id=_project_id(obj)))
+
+def _do_orm_execute(state):
+    """Bump versions (and tombstone deletes) for bulk statements that bypass the flush"""
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = getattr(state.statement, "table", None)
+    scope = scope_for_table(table.name) if table is not None else None
+    if not scope:
+        return
+    connection = state.session.connection()
+    _bump(connection, {scope})
+    if scope == "projects":
+        _stamp_projects(connection, _statement_project_ids(connection, state, table))
+    if state.is_delete and table.name in SYNCED_TABLES:
+        project_column = table.c.id if table.name == models.Project.__tablename__ else table.c.project_id
+        doomed = select(table.c.id, project_column)
+        if state.statement.whereclause is not None:
+            doomed = doomed.where(state.statement.whereclause)
+        rows = connection.execute(doomed).all()
+        if rows:
+            connection.execute(insert(models.Tombstone), [
+                {"table_name": table.name, "row_id": row_id, "project_id": project_id}
+                for row_id, project_id in rows
+            ])
+
+def install():
+    """Track writes on every Session (sync sessions and the ones behind AsyncSession)"""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+
+# Conditional GET helpers
+
+async def read_version(db: AsyncSession, scope: str):
+    """(version, updated_at) for a scope: a single primary-key lookup"""
+    result = await db.execute(
+        select(models.DataVersion.version, models.DataVersion.updated_at).where(models.DataVersion.scope == scope)
+    )
+    row = result.first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+def etag_for(scope: str, version: int) -> str:
+    return f'W/"{scope}-{version}"'
+
+def is_not_modified(request: Request, etag: str, updated_at: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+def cache_headers(etag: str, updated_at: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+def apply_headers(result, response: Response, headers: dict):
+    """Attach headers to a returned Response, or to the injected response otherwise"""
+    target = result if isinstance(result, Response) else response
+    for name, value in headers.items():
+        target.headers[name] = value
+    return result
@@ -21,5 +21,37 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+/**
+ * Poll a background job until it finishes; resolves with the job, rejects if it failed.
+ * onProgress receives every polled job (progress %, message).
+ */
+export const waitForJob = async (jobId, onProgress, intervalMs = 1000) => {
+    for (;;) {
+        const { data: job } = await api.get(`/api/jobs/${jobId}`);
+        if (onProgress) onProgress(job);
+        if (job.status === 'succeeded') return job;
+        if (job.status === 'failed' || job.status === 'cancelled') {
+            throw new Error(job.error || `Job ${job.status}`);
+        }
+        await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+};
+
+/** Most items one /:batch request may carry (backend batch.MAX_BATCH_ITEMS). */
+export const MAX_BATCH_ITEMS = 5000;
+
+/**
+ * POST one batch operation ('create', 'update' or 'delete') over any number of items,
+ * as consecutive requests of at most MAX_BATCH_ITEMS; resolves with the summed counts.
+ */
+export const postBatch = async (url, operation, items) => {
+    const totals = { created: 0, updated: 0, deleted: 0, failed: 0 };
+    for (let start = 0; start < items.length; start += MAX_BATCH_ITEMS) {
+        const { data } = await api.post(url, { [operation]: items.slice(start, start + MAX_BATCH_ITEMS) });
+        Object.keys(totals).forEach((key) => { totals[key] += data[key] || 0; });
+    }
+    return totals;
+};
+
 export default api;
 
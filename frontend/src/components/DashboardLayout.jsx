@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { NavLink, useNavigate, useLocation, Outlet } from 'react-router-dom';
+import api from '../api';
 import {
     LayoutGrid,
     Briefcase,
@@ -52,7 +53,12 @@ const DashboardLayout = ({ children, headerActions }) => {
     const [isProjectsOpen, setIsProjectsOpen] = useState(true);
     const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
 
-    const handleLogout = () => {
+    const handleLogout = async () => {
+        try {
+            await api.post('/logout'); // Revoke the token server-side
+        } catch (error) {
+            // Expired or already revoked: nothing left to revoke
+        }
         localStorage.removeItem('token');
         navigate('/login');
     };
@@ -1,61 +1,55 @@
-import React, { useMemo } from 'react';
+import React, { useEffect, useMemo, useState } from 'react';
 import { ChevronLeft, ChevronRight } from 'lucide-react';
+import api from '../api';
+
+const PADDING_BEFORE = 7; // days shown before the schedule start
+const PADDING_AFTER = 14;
+
+// Depth-first rows from the server's precomputed schedule tree
+const flattenSchedule = (nodes, rows = []) => {
+    nodes.forEach(node => {
+        rows.push(node);
+        flattenSchedule(node.children || [], rows);
+    });
+    return rows;
+};
+
+const TaskTimeline = ({ projectId, tasks, onTaskClick }) => {
+    const [schedule, setSchedule] = useState(null);
+
+    // Refetch whenever the parent reloads its task list (the server caches the tree per project)
+    useEffect(() => {
+        let cancelled = false;
+        api.get(`/api/projects/${projectId}/schedule`)
+            .then(response => { if (!cancelled) setSchedule(response.data); })
+            .catch(error => console.error("Error fetching schedule:", error));
+        return () => { cancelled = true; };
+    }, [projectId, tasks]);
+
+    const rows = useMemo(() => (schedule ? flattenSchedule(schedule.tasks) : []), [schedule]);
+    const tasksById = useMemo(() => new Map((tasks || []).map(t => [t.id, t])), [tasks]);
 
-const TaskTimeline = ({ tasks, onTaskClick }) => {
     // 1. Calculate Timeline Range
     const { minDate, maxDate, totalDays } = useMemo(() => {
-        if (!tasks || tasks.length === 0) {
-            const now = new Date();
-            return { minDate: now, maxDate: now, totalDays: 1 };
-        }
-
-        let min = new Date();
-        let max = new Date();
-        let hasValidDates = false;
-
-        tasks.forEach(t => {
-            if (t.start_date) {
-                const s = new Date(t.start_date);
-                if (!hasValidDates || s < min) min = s;
-                hasValidDates = true;
-            }
-            if (t.end_date) {
-                const e = new Date(t.end_date);
-                if (!hasValidDates || e > max) max = e;
-                hasValidDates = true;
-            }
-        });
+        const min = schedule && schedule.start_date ? new Date(schedule.start_date) : new Date();
+        const max = schedule && schedule.end_date ? new Date(schedule.end_date) : new Date(min);
 
         // Add padding (buffer)
-        min.setDate(min.getDate() - 7);
-        max.setDate(max.getDate() + 14);
-
-        const diffTime = Math.abs(max - min);
-        const totalDays = Math.ceil(diffTime / (1000 * 60 * 60 * 24));
+        min.setDate(min.getDate() - PADDING_BEFORE);
+        max.setDate(max.getDate() + PADDING_AFTER);
 
+        const totalDays = ((schedule && schedule.duration_days) || 1) + PADDING_BEFORE + PADDING_AFTER;
         return { minDate: min, maxDate: max, totalDays };
-    }, [tasks]);
+    }, [schedule]);
 
     // 2. Constants for rendering
     const DAY_WIDTH = 40; // width per day in pixels
     const HEADER_HEIGHT = 50;
     const ROW_HEIGHT = 48;
 
-    // 3. Helper to get position
-    const getPosition = (dateStr) => {
-        if (!dateStr) return 0;
-        const date = new Date(dateStr);
-        const diff = Math.ceil((date - minDate) / (1000 * 60 * 60 * 24));
-        return diff * DAY_WIDTH;
-    };
-
-    const getDurationWidth = (start, end) => {
-        if (!start || !end) return DAY_WIDTH; // Default width
-        const s = new Date(start);
-        const e = new Date(end);
-        const diff = Math.ceil((e - s) / (1000 * 60 * 60 * 24));
-        return Math.max(diff, 1) * DAY_WIDTH;
-    };
+    // 3. Bar geometry comes precomputed from the schedule endpoint
+    const getPosition = (row) => (row.offset_days + PADDING_BEFORE) * DAY_WIDTH;
+    const getDurationWidth = (row) => Math.max(row.duration_days || 1, 1) * DAY_WIDTH;
 
     // 4. Generate Calendar Header
     const calendarDays = useMemo(() => {
@@ -77,7 +71,7 @@ const TaskTimeline = ({ tasks, onTaskClick }) => {
         }
     };
 
-    if (!tasks || tasks.length === 0) {
+    if (rows.length === 0) {
         return (
             <div className="flex flex-col items-center justify-center h-64 bg-slate-50 rounded-lg border border-slate-200 border-dashed text-slate-400">
                 <p>No scheduled tasks to display.</p>
@@ -120,16 +114,24 @@ const TaskTimeline = ({ tasks, onTaskClick }) => {
 
                     {/* Task Rows */}
                     <div>
-                        {tasks.map((task, index) => {
-                            const left = getPosition(task.start_date);
-                            const width = getDurationWidth(task.start_date, task.end_date);
+                        {rows.map((row) => {
+                            const task = tasksById.get(row.id) || row;
+                            const left = getPosition(row);
+                            const width = getDurationWidth(row);
+                            const barStyle = row.is_summary
+                                ? 'top-4 h-3 bg-slate-700 hover:bg-slate-800'
+                                : `top-2.5 h-7 ${getStatusColor(row.status)}`;
 
                             return (
-                                <div key={task.id} className="flex border-b border-slate-50 hover:bg-slate-50 transition-colors" style={{ height: ROW_HEIGHT }}>
+                                <div key={row.id} className="flex border-b border-slate-50 hover:bg-slate-50 transition-colors" style={{ height: ROW_HEIGHT }}>
                                     {/* Sticky Sidebar */}
                                     <div className="min-w-[250px] sticky left-0 z-10 bg-white border-r border-slate-200 flex items-center px-4 text-sm font-medium text-slate-700 truncate group">
-                                        <span className="truncate w-full cursor-pointer hover:text-blue-600" onClick={() => onTaskClick(task)}>
-                                            {task.task_name}
+                                        <span
+                                            className={`truncate w-full cursor-pointer hover:text-blue-600 ${row.is_summary ? 'font-bold' : ''}`}
+                                            style={{ paddingLeft: `${row.depth * 16}px` }}
+                                            onClick={() => onTaskClick(task)}
+                                        >
+                                            {row.task_name}
                                         </span>
                                     </div>
 
@@ -143,17 +145,17 @@ const TaskTimeline = ({ tasks, onTaskClick }) => {
                                         </div>
 
                                         {/* Task Bar */}
-                                        {task.start_date && (
+                                        {row.offset_days !== null && (
                                             <div
                                                 onClick={() => onTaskClick(task)}
-                                                className={`absolute top-2.5 h-7 rounded-md cursor-pointer shadow-sm flex items-center px-2 text-white text-xs truncate transition-all opacity-80 hover:opacity-100 z-10 ${getStatusColor(task.status)}`}
+                                                className={`absolute rounded-md cursor-pointer shadow-sm flex items-center px-2 text-white text-xs truncate transition-all opacity-80 hover:opacity-100 z-10 ${barStyle} ${row.is_critical ? 'ring-2 ring-red-500' : ''}`}
                                                 style={{
                                                     left: `${left}px`,
                                                     width: `${width}px`
                                                 }}
-                                                title={`${task.task_name} (${task.start_date} - ${task.end_date})`}
+                                                title={`${row.task_name} (${row.start_date} - ${row.end_date}) · ${row.completion_percentage}% · slack ${row.total_slack ?? '-'}d${row.is_critical ? ' · critical' : ''}`}
                                             >
-                                                {width > 60 && task.task_name}
+                                                {!row.is_summary && width > 60 && row.task_name}
                                             </div>
                                         )}
                                     </div>
@@ -9,6 +9,7 @@ import {
     ResponsiveContainer, Tooltip as RechartsTooltip, Legend, LineChart, Line, XAxis, YAxis, CartesianGrid, AreaChart, Area
 } from 'recharts';
 import api from '../api';
+import { subscribeProjectChanges } from '../utils/liveUpdates';
 import NewProjectModal from '../components/NewProjectModal';
 
 // --- Components ---
@@ -168,6 +169,8 @@ const Dashboard = () => {
 
     useEffect(() => {
         fetchProjects();
+        // Pick up other users' changes without a manual reload
+        return subscribeProjectChanges(fetchProjects);
     }, []);
 
     const handleQuickUpdateStatus = async (projectId, newStatus) => {
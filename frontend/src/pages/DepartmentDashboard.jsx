@@ -69,6 +69,14 @@ const DepartmentDashboard = () => {
         fetchProjects();
     }, []);
 
+    // OPEX totals for the current fiscal year, aggregated server-side
+    const [opexSummary, setOpexSummary] = useState(null);
+    useEffect(() => {
+        api.get('/api/opex/summary', { params: { fiscal_year: new Date().getFullYear() } })
+            .then(response => setOpexSummary(response.data))
+            .catch(error => console.error("Failed to fetch OPEX summary", error));
+    }, []);
+
     const handleSaveProfile = () => {
         setDeptProfile(tempProfile);
         setIsEditingProfile(false);
@@ -96,20 +104,9 @@ const DepartmentDashboard = () => {
 
         const utilization = totalBudget > 0 ? (totalPaid / totalBudget) * 100 : 0;
 
-        // OPEX Financials (From FinancialPage localStorage)
-        const opexLedger = JSON.parse(localStorage.getItem('opex_ledger_data') || '[]');
-        let totalOpexForecast = 0;
-        let totalOpexActual = 0;
-
-        opexLedger.forEach(item => {
-            totalOpexForecast += Number(item.approve || 0);
-            const txKey = `opex_tx_${item.code}`;
-            const transactions = JSON.parse(localStorage.getItem(txKey) || '[]');
-            const itemActual = transactions.reduce((sum, tx) => {
-                return tx.type === 'Debit' ? sum + Number(tx.amount || 0) : sum - Number(tx.amount || 0);
-            }, 0);
-            totalOpexActual += itemActual;
-        });
+        // OPEX Financials (from the OPEX ledger summary)
+        const totalOpexForecast = opexSummary ? opexSummary.approved_amount : 0;
+        const totalOpexActual = opexSummary ? opexSummary.actual_amount : 0;
 
         const opexVariance = totalOpexForecast > 0 ? ((totalOpexActual - totalOpexForecast) / totalOpexForecast) * 100 : 0;
         const opexStatus = opexVariance > 5 ? 'Overspend' : opexVariance > 0 ? 'Watching' : 'Stable';
@@ -131,9 +128,9 @@ const DepartmentDashboard = () => {
             // OPEX Results
             opexVariance,
             opexStatus,
-            hasOpexData: opexLedger.length > 0
+            hasOpexData: !!opexSummary && opexSummary.categories.length > 0
         };
-    }, [projects]);
+    }, [projects, opexSummary]);
 
     const StatusChip = ({ status }) => {
         let color = 'bg-slate-100 text-slate-500 border-slate-200';
@@ -236,55 +236,104 @@ const FinancialPage = () => {
     return null;
 };
 
+// OPEX ledger rows as the ledger table uses them <-> /api/opex payloads
+const itemFromApi = (item) => ({
+    id: item.id,
+    code: item.code || '',
+    cat: item.category,
+    name: item.name,
+    plan: item.planned_amount,
+    approve: item.approved_amount,
+    actual: item.actual_amount || 0,
+    status: item.status
+});
+
+const itemToApi = (row) => ({
+    category: row.cat,
+    code: row.code,
+    name: row.name,
+    planned_amount: Number(row.plan || 0),
+    approved_amount: Number(row.approve || 0),
+    status: row.status
+});
+
+const toIsoDate = (value) => {
+    const parsed = new Date(value);
+    return isNaN(parsed) ? new Date().toISOString().slice(0, 10) : parsed.toISOString().slice(0, 10);
+};
+
+// One-time move of a ledger kept in browser localStorage (older versions) to the server
+const migrateLocalLedger = async (year) => {
+    const saved = JSON.parse(localStorage.getItem('opex_ledger_data') || '[]');
+    if (!saved.length) return;
+    // Claim the data first so a concurrent mount cannot migrate it twice
+    localStorage.removeItem('opex_ledger_data');
+    const migratedCodes = new Set();
+    for (let index = 0; index < saved.length; index++) {
+        const row = saved[index];
+        const txKey = `opex_tx_${row.code}`;
+        let created = false;
+        try {
+            const response = await api.post('/api/opex/items', { ...itemToApi(row), fiscal_year: year });
+            created = true;
+            if (migratedCodes.has(row.code)) continue; // Rows sharing a code shared one transaction list
+            migratedCodes.add(row.code);
+            for (const tx of JSON.parse(localStorage.getItem(txKey) || '[]')) {
+                await api.post(`/api/opex/items/${response.data.id}/transactions`, {
+                    transaction_date: toIsoDate(tx.date),
+                    po_number: tx.po,
+                    item_name: tx.item,
+                    description: tx.desc,
+                    entry_type: tx.type,
+                    amount: Number(tx.amount || 0)
+                });
+            }
+            localStorage.removeItem(txKey);
+        } catch (error) {
+            // Keep what was not moved yet for the next attempt, including this row unless the server
+            // confirmed it was created (retrying that would duplicate it)
+            localStorage.setItem('opex_ledger_data', JSON.stringify(saved.slice(created ? index + 1 : index)));
+            throw error;
+        }
+    }
+};
+
 // Internal Sub-component for OPEX Ledger to keep state clean
 const AdminLedger = ({ formatCurrency, year }) => {
     const [isEditing, setIsEditing] = useState(false);
     const [selectedCategory, setSelectedCategory] = useState(null); // For drill-down
 
-    const [ledger, setLedger] = useState(() => {
-        const saved = localStorage.getItem('opex_ledger_data');
-        return saved ? JSON.parse(saved) : [];
-    });
-
-    useEffect(() => {
-        localStorage.setItem('opex_ledger_data', JSON.stringify(ledger));
-    }, [ledger]);
-
-    // Calculate Actuals from saved transactions
-    const [calculatedActuals, setCalculatedActuals] = useState({});
-
-    // Refresh actuals when view changes or periodical check
-    useEffect(() => {
-        const calculateTotals = () => {
-            const newActuals = {};
-            ledger.forEach(item => {
-                const txKey = `opex_tx_${item.code}`;
-                const savedTx = localStorage.getItem(txKey);
-                if (savedTx) {
-                    const transactions = JSON.parse(savedTx);
-                    const total = transactions.reduce((sum, tx) => {
-                        return tx.type === 'Debit' ? sum + Number(tx.amount || 0) : sum - Number(tx.amount || 0);
-                    }, 0);
-                    // Only sum debits as usage? Or net usage? Usually Usage = Debits (expenses). 
-                    // Let's assume Usage means Expenses (Debits). 
-                    // If we use Net, then credits reduce the expense. 
-                    // Let's match the CategoryDetailedLedger logic: Running Balance = Start - (Debit - Credit).
-                    // So Actual Usage = Start Balance - Current Balance?
-                    // Or simply Sum of Debits? 
-                    // User asked for "Total Usage". Usage commonly means Expenses.
-                    // Let's sum Debits - Credits (Net Expense).
-                    newActuals[item.code] = total;
-                }
+    const [ledger, setLedger] = useState([]);
+    const [dirtyIds, setDirtyIds] = useState(new Set());
+    // Department totals aggregated by the server
+    const [totals, setTotals] = useState({ plan: 0, approve: 0, actual: 0, balance: 0 });
+
+    const fetchLedger = async () => {
+        try {
+            const [itemsResponse, summaryResponse] = await Promise.all([
+                api.get('/api/opex/items', { params: { fiscal_year: year } }),
+                api.get('/api/opex/summary', { params: { fiscal_year: year } })
+            ]);
+            setLedger(itemsResponse.data.map(itemFromApi));
+            const summary = summaryResponse.data;
+            setTotals({
+                plan: summary.planned_amount,
+                approve: summary.approved_amount,
+                actual: summary.actual_amount,
+                balance: summary.balance
             });
-            setCalculatedActuals(newActuals);
-        };
-
-        calculateTotals();
+        } catch (error) {
+            console.error("Failed to fetch OPEX ledger", error);
+        }
+    };
 
-        // Add listener for storage events to sync across tabs or components
-        window.addEventListener('storage', calculateTotals);
-        return () => window.removeEventListener('storage', calculateTotals);
-    }, [ledger, selectedCategory]); // Re-run when ledger changes or we return from detail view (selectedCategory null)
+    // Refresh when the year changes or we return from the detail view (selectedCategory null)
+    useEffect(() => {
+        if (selectedCategory) return;
+        migrateLocalLedger(year)
+            .catch(error => console.error("Failed to migrate local OPEX ledger", error))
+            .finally(fetchLedger);
+    }, [year, selectedCategory]);
 
     // ... grouping logic ...
     const groupedLedger = ledger.reduce((groups, item) => {
@@ -300,81 +349,81 @@ const AdminLedger = ({ formatCurrency, year }) => {
         return groups;
     }, {});
 
-    const handleAddRowToGroup = (groupCat) => {
-        const randomCode = Math.floor(100000 + Math.random() * 900000).toString();
-        setLedger([...ledger, {
-            id: Date.now(),
-            code: randomCode, // Unique code for new line
-            cat: groupCat,
-            name: 'New Allocation Item',
-            plan: 0,
-            approve: 0,
-            actual: 0,
-            status: 'Draft'
-        }]);
-        setIsEditing(true);
+    const createRow = async (cat, name) => {
+        try {
+            const response = await api.post('/api/opex/items', {
+                fiscal_year: year,
+                category: cat,
+                code: Math.floor(100000 + Math.random() * 900000).toString(), // Unique code for new line
+                name,
+                planned_amount: 0,
+                approved_amount: 0,
+                status: 'Draft'
+            });
+            setLedger([...ledger, itemFromApi(response.data)]);
+            setIsEditing(true);
+        } catch (error) {
+            console.error("Failed to add ledger line", error);
+            alert("Failed to add ledger line.");
+        }
     };
 
-    const handleAddFreshRow = () => {
-        const randomCode = Math.floor(100000 + Math.random() * 900000).toString();
-        setLedger([...ledger, {
-            id: Date.now(),
-            code: randomCode,
-            cat: 'New Category',
-            name: 'New Item',
-            plan: 0,
-            approve: 0,
-            actual: 0,
-            status: 'Draft'
-        }]);
-        setIsEditing(true);
-    };
+    const handleAddRowToGroup = (groupCat) => createRow(groupCat, 'New Allocation Item');
+
+    const handleAddFreshRow = () => createRow('New Category', 'New Item');
+
+    const markDirty = (ids) => setDirtyIds(prev => new Set([...prev, ...ids]));
 
     const handleUpdate = (id, field, value) => {
         setLedger(ledger.map(row =>
             row.id === id ? { ...row, [field]: value } : row
         ));
+        markDirty([id]);
     };
 
     const handleUpdateGroup = (oldCat, field, value) => {
+        const ids = [];
         setLedger(ledger.map(row => {
             if (row.cat === oldCat) {
-                // If changing code, migrate localStorage data to new key
-                if (field === 'code' && row.code !== value) {
-                    const oldKey = `opex_tx_${row.code}`;
-                    const newKey = `opex_tx_${value}`;
-                    const existingData = localStorage.getItem(oldKey);
-                    if (existingData) {
-                        localStorage.setItem(newKey, existingData);
-                        localStorage.removeItem(oldKey);
-                    }
-                }
+                ids.push(row.id);
                 return { ...row, [field]: value };
             }
             return row;
         }));
+        markDirty(ids);
     };
 
-    const handleDeleteRow = (id) => {
+    const handleDeleteRow = async (id) => {
         if (window.confirm('Are you sure you want to delete this allocation line?')) {
-            const rowToDelete = ledger.find(r => r.id === id);
-            if (rowToDelete) {
-                // Remove associated transaction data
-                localStorage.removeItem(`opex_tx_${rowToDelete.code}`);
+            try {
+                // Removes the line's transactions as well
+                await api.delete(`/api/opex/items/${id}`);
+                fetchLedger();
+            } catch (error) {
+                console.error("Failed to delete ledger line", error);
+                alert("Failed to delete ledger line.");
             }
-            setLedger(ledger.filter(row => row.id !== id));
         }
     };
 
-    const totals = ledger.reduce((acc, row) => {
-        const actualAmount = calculatedActuals[row.code] || 0;
-        return {
-            plan: acc.plan + Number(row.plan || 0),
-            approve: acc.approve + Number(row.approve || 0),
-            actual: acc.actual + actualAmount,
-            balance: acc.balance + (Number(row.approve || 0) - actualAmount)
-        };
-    }, { plan: 0, approve: 0, actual: 0, balance: 0 });
+    const handleToggleEditing = async () => {
+        if (!isEditing) {
+            setIsEditing(true);
+            return;
+        }
+        try {
+            // Save only the lines changed while editing
+            await Promise.all(ledger
+                .filter(row => dirtyIds.has(row.id))
+                .map(row => api.put(`/api/opex/items/${row.id}`, itemToApi(row))));
+            setDirtyIds(new Set());
+            setIsEditing(false);
+        } catch (error) {
+            console.error("Failed to save ledger", error);
+            alert("Failed to save ledger changes.");
+        }
+        fetchLedger();
+    };
 
     // If a category is selected, show the Detailed Transaction View
     if (selectedCategory) {
@@ -405,7 +454,7 @@ const AdminLedger = ({ formatCurrency, year }) => {
                     </button>
                 )}
                 <button
-                    onClick={() => setIsEditing(!isEditing)}
+                    onClick={handleToggleEditing}
                     className={`px-4 py-2 rounded-lg flex items-center gap-2 text-xs font-bold transition-colors ${isEditing ? 'bg-emerald-100 text-emerald-700 border border-emerald-200' : 'bg-white border border-slate-200 text-slate-600 hover:bg-slate-50'}`}
                 >
                     {isEditing ? <><Save size={14} /> Done Editing</> : <><Edit2 size={14} /> Edit Ledger</>}
@@ -435,7 +484,7 @@ const AdminLedger = ({ formatCurrency, year }) => {
                                 <tr className="bg-amber-50/50 border-b border-slate-200/50 hover:bg-amber-100/50 transition-colors cursor-pointer group">
                                     <td
                                         className="px-6 py-3 font-bold text-slate-800 text-xs flex items-center gap-2"
-                                        onClick={() => setSelectedCategory(group)}
+                                        onClick={() => setSelectedCategory(group.items[0])}
                                     >
                                         {isEditing ? (
                                             <div className="flex items-center gap-2" onClick={e => e.stopPropagation()}>
@@ -475,7 +524,7 @@ const AdminLedger = ({ formatCurrency, year }) => {
                                             </button>
                                         )}
                                     </td>
-                                    <td colSpan={isEditing ? 6 : 5} onClick={() => setSelectedCategory(group)}></td>
+                                    <td colSpan={isEditing ? 6 : 5} onClick={() => setSelectedCategory(group.items[0])}></td>
                                 </tr>
 
                                 {/* CHILD ITEMS */}
@@ -513,10 +562,10 @@ const AdminLedger = ({ formatCurrency, year }) => {
                                         </td>
                                         <td className="px-6 py-3 text-right font-mono text-slate-600 bg-yellow-50">
                                             {/* Always show calculated actual, read-only */}
-                                            <span className="text-xs">{(calculatedActuals[row.code] || 0) > 0 ? formatCurrency(calculatedActuals[row.code]) : '-'}</span>
+                                            <span className="text-xs">{row.actual > 0 ? formatCurrency(row.actual) : '-'}</span>
                                         </td>
                                         <td className="px-6 py-3 text-right font-mono font-bold text-emerald-700 bg-emerald-50/30 border-l border-emerald-100">
-                                            <span className="text-xs">{formatCurrency(row.approve - (calculatedActuals[row.code] || 0))}</span>
+                                            <span className="text-xs">{formatCurrency(row.approve - row.actual)}</span>
                                         </td>
                                         <td className="px-6 py-3 text-right">
                                             {isEditing ? <input type="text" value={row.status} onChange={(e) => handleUpdate(row.id, 'status', e.target.value)} className="w-full text-[10px] border rounded p-1" /> : (
@@ -562,18 +611,33 @@ const AdminLedger = ({ formatCurrency, year }) => {
 export default FinancialPage;
 
 // --- DETAILED TRANSACTION VIEW COMPONENT ---
+const txFromApi = (tx) => ({
+    id: tx.id,
+    date: tx.transaction_date,
+    po: tx.po_number || '',
+    item: tx.item_name || '',
+    desc: tx.description || '',
+    type: tx.entry_type,
+    amount: tx.amount
+});
+
+const txToApi = (tx) => ({
+    transaction_date: tx.date,
+    po_number: tx.po,
+    item_name: tx.item,
+    description: tx.desc,
+    entry_type: tx.type,
+    amount: Number(tx.amount || 0)
+});
+
 const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
-    // Mock Transaction Data based on Image
-    const [transactions, setTransactions] = useState(() => {
-        const key = `opex_tx_${item.code}`;
-        const saved = localStorage.getItem(key);
-        return saved ? JSON.parse(saved) : [];
-    });
+    const [transactions, setTransactions] = useState([]);
 
     useEffect(() => {
-        const key = `opex_tx_${item.code}`;
-        localStorage.setItem(key, JSON.stringify(transactions));
-    }, [transactions, item.code]);
+        api.get(`/api/opex/items/${item.id}/transactions`)
+            .then(response => setTransactions(response.data.map(txFromApi)))
+            .catch(error => console.error("Failed to fetch transactions", error));
+    }, [item.id]);
 
     const [isAdding, setIsAdding] = useState(false);
 
@@ -594,18 +658,21 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
 
     const currentBalance = runningBalance;
 
-    const handleAddTransaction = () => {
-        const newTx = {
-            id: Date.now(),
-            date: new Date().toLocaleDateString(),
-            po: '',
-            item: '',
-            desc: '',
-            type: 'Debit',
-            amount: '',
-            balance: 0 // Placeholder, calculated properly in render
-        };
-        setTransactions([...transactions, newTx]);
+    const handleAddTransaction = async () => {
+        try {
+            const response = await api.post(`/api/opex/items/${item.id}/transactions`, txToApi({
+                date: new Date().toISOString().slice(0, 10),
+                po: '',
+                item: '',
+                desc: '',
+                type: 'Debit',
+                amount: 0
+            }));
+            setTransactions([...transactions, txFromApi(response.data)]);
+        } catch (error) {
+            console.error("Failed to add transaction", error);
+            alert("Failed to add transaction.");
+        }
     };
 
     const handleUpdateTx = (id, field, value) => {
@@ -614,8 +681,23 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
         ));
     };
 
-    const handleDeleteTx = (id) => {
-        setTransactions(transactions.filter(tx => tx.id !== id));
+    // Persist a row once the user leaves a field (or picks a type)
+    const handleSaveTx = async (tx) => {
+        if (!tx.date) return;
+        try {
+            await api.put(`/api/opex/transactions/${tx.id}`, txToApi(tx));
+        } catch (error) {
+            console.error("Failed to save transaction", error);
+        }
+    };
+
+    const handleDeleteTx = async (id) => {
+        try {
+            await api.delete(`/api/opex/transactions/${id}`);
+            setTransactions(transactions.filter(tx => tx.id !== id));
+        } catch (error) {
+            console.error("Failed to delete transaction", error);
+        }
     };
 
     return (
@@ -672,9 +754,10 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                             <tr key={tx.id} className="hover:bg-slate-50 group">
                                 <td className="px-4 py-3">
                                     <input
-                                        type="text"
+                                        type="date"
                                         value={tx.date}
                                         onChange={(e) => handleUpdateTx(tx.id, 'date', e.target.value)}
+                                        onBlur={() => handleSaveTx(tx)}
                                         className="w-full bg-transparent border-b border-dashed border-slate-200 focus:border-indigo-500 outline-none text-slate-600 text-[11px]"
                                     />
                                 </td>
@@ -684,6 +767,7 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                                         type="text"
                                         value={tx.po}
                                         onChange={(e) => handleUpdateTx(tx.id, 'po', e.target.value)}
+                                        onBlur={() => handleSaveTx(tx)}
                                         placeholder="PO#"
                                         className="w-full bg-transparent border-b border-dashed border-slate-200 focus:border-indigo-500 outline-none text-slate-600 text-[11px]"
                                     />
@@ -693,6 +777,7 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                                         type="text"
                                         value={tx.item}
                                         onChange={(e) => handleUpdateTx(tx.id, 'item', e.target.value)}
+                                        onBlur={() => handleSaveTx(tx)}
                                         placeholder="Item Name"
                                         className="w-full bg-transparent border-b border-dashed border-slate-200 focus:border-indigo-500 outline-none font-medium text-slate-700 text-[11px]"
                                     />
@@ -702,6 +787,7 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                                         type="text"
                                         value={tx.desc}
                                         onChange={(e) => handleUpdateTx(tx.id, 'desc', e.target.value)}
+                                        onBlur={() => handleSaveTx(tx)}
                                         placeholder="Description"
                                         className="w-full bg-transparent border-b border-dashed border-slate-200 focus:border-indigo-500 outline-none text-slate-600 text-[11px]"
                                     />
@@ -709,7 +795,10 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                                 <td className="px-4 py-3">
                                     <select
                                         value={tx.type}
-                                        onChange={(e) => handleUpdateTx(tx.id, 'type', e.target.value)}
+                                        onChange={(e) => {
+                                            handleUpdateTx(tx.id, 'type', e.target.value);
+                                            handleSaveTx({ ...tx, type: e.target.value });
+                                        }}
                                         className="bg-transparent border-none text-[10px] uppercase text-slate-500 focus:ring-0"
                                     >
                                         <option value="Debit">Debit</option>
@@ -721,6 +810,7 @@ const CategoryDetailedLedger = ({ item, onBack, formatCurrency, year }) => {
                                         type="number"
                                         value={tx.amount}
                                         onChange={(e) => handleUpdateTx(tx.id, 'amount', e.target.value)}
+                                        onBlur={() => handleSaveTx(tx)}
                                         placeholder="0.00"
                                         className="w-full text-right bg-transparent border-b border-dashed border-slate-200 focus:border-indigo-500 outline-none"
                                     />
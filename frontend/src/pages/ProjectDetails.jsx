@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import { downloadTaskTemplate, downloadPaymentTemplate, parseExcelFile } from '../utils/excelUtils';
+import { subscribeProjectChanges } from '../utils/liveUpdates';
 import {
     ArrowLeft,
     Plus,
@@ -21,7 +22,7 @@ import {
     ChevronRight,
     FileText
 } from 'lucide-react';
-import api from '../api';
+import api, { postBatch, waitForJob } from '../api';
 import NewProjectModal from '../components/NewProjectModal';
 import TaskDetailModal from '../components/TaskDetailModal';
 import KanbanBoard from '../components/KanbanBoard';
@@ -150,39 +151,21 @@ const ProjectDetails = () => {
         const file = e.target.files[0];
         if (!file) return;
 
-        try {
-            const data = await parseExcelFile(file);
-            console.log("Importing tasks:", data);
-
-            // Helper to safely parse dates from Excel (Handles Date obj, string keys, etc)
-            const parseImportDate = (val) => {
-                if (!val) return new Date().toISOString().split('T')[0]; // Default to today
-                if (val instanceof Date) return val.toISOString().split('T')[0];
-                // Try string parsing
-                const d = new Date(val);
-                if (!isNaN(d.getTime())) return d.toISOString().split('T')[0];
-                return new Date().toISOString().split('T')[0]; // Fallback
-            };
+        // Server streams the workbook and resolves Outline Level / WBS into parent tasks
+        const formData = new FormData();
+        formData.append('file', file);
 
-            // Loop and create tasks
-            for (const item of data) {
-                const newTask = {
-                    task_name: item['Task Name'] || 'Untitled Task',
-                    start_date: parseImportDate(item['Start Date (YYYY-MM-DD)']),
-                    end_date: parseImportDate(item['End Date (YYYY-MM-DD)']),
-                    status: item['Status'] || 'Not Started',
-                    completion_percentage: item['Completion %'] ? parseInt(item['Completion %']) : 0,
-                    assigned_to: item['Assigned To'] || '',
-                    duration: '',
-                    completion_date: null,
-                    parent_id: null
-                };
-
-                await api.post(`/api/projects/${id}/task`, newTask);
-            }
+        try {
+            // Imports run as background jobs; wait for it to finish
+            const { data: job } = await api.post(`/api/projects/${id}/tasks/import`, formData, {
+                headers: {
+                    'Content-Type': 'multipart/form-data',
+                },
+            });
+            const finished = await waitForJob(job.id);
 
             fetchProjectDetails();
-            alert("Tasks imported successfully!");
+            alert(finished.result?.message || "Tasks imported successfully!");
         } catch (error) {
             console.error("Error importing tasks:", error);
             alert("Failed to import tasks. Please check the template format.");
@@ -208,24 +191,23 @@ const ProjectDetails = () => {
                 return new Date().toISOString().split('T')[0]; // Fallback
             };
 
-            for (const item of data) {
-                const newPayment = {
-                    deliverable: item['Deliverable'] || 'Pending Item',
-                    phase: item['Phase'] || 'TBD',
-                    planned_amount: item['Planned Amount'] ? parseFloat(item['Planned Amount']) : 0,
-                    plan_date: parseImportDate(item['Plan Date (YYYY-MM-DD)']),
-                    category: item['Category'] || 'Project Implementation',
-                    remark: item['Remarks'] || '',
-                    po_number: '',
-                    invoice_number: '',
-                    status: 'Not Paid',
-                    actual_amount: 0,
-                    actual_payment_date: null,
-                    supporting_document: ''
-                };
-
-                await api.post(`/api/projects/${id}/payment`, newPayment);
-            }
+            const newPayments = data.map(item => ({
+                deliverable: item['Deliverable'] || 'Pending Item',
+                phase: item['Phase'] || 'TBD',
+                planned_amount: item['Planned Amount'] ? parseFloat(item['Planned Amount']) : 0,
+                plan_date: parseImportDate(item['Plan Date (YYYY-MM-DD)']),
+                category: item['Category'] || 'Project Implementation',
+                remark: item['Remarks'] || '',
+                po_number: '',
+                invoice_number: '',
+                status: 'Not Paid',
+                actual_amount: 0,
+                actual_payment_date: null,
+                supporting_document: ''
+            }));
+
+            // Split into requests the batch endpoint accepts (MAX_BATCH_ITEMS each)
+            await postBatch(`/api/projects/${id}/payments:batch`, 'create', newPayments);
 
             fetchProjectDetails();
             alert("Payments imported successfully!");
@@ -390,15 +372,15 @@ const ProjectDetails = () => {
     useEffect(() => {
         fetchProjectDetails();
 
-        // Auto-refresh: Poll every 5 seconds
-        const interval = setInterval(fetchProjectDetails, 5000);
+        // Live refresh: refetch when another user changes this project
+        const unsubscribe = subscribeProjectChanges(fetchProjectDetails, { projectId: id });
 
         // Refresh when window gets focus
         const handleFocus = () => fetchProjectDetails();
         window.addEventListener('focus', handleFocus);
 
         return () => {
-            clearInterval(interval);
+            unsubscribe();
             window.removeEventListener('focus', handleFocus);
         };
     }, [id]);
@@ -681,10 +663,8 @@ const ProjectDetails = () => {
             }
         } else if (deleteConfirmation.type === 'bulk-tasks') {
             try {
-                // Delete tasks sequentially
-                for (const taskId of selectedTasks) {
-                    await api.delete(`/api/projects/${id}/task/${taskId}`);
-                }
+                // Delete all selected tasks in batch requests
+                await postBatch(`/api/projects/${id}/tasks:batch`, 'delete', [...selectedTasks]);
                 setSelectedTasks(new Set());
                 fetchProjectDetails();
                 setDeleteConfirmation(null);
@@ -694,9 +674,7 @@ const ProjectDetails = () => {
             }
         } else if (deleteConfirmation.type === 'bulk-payments') {
             try {
-                for (const payId of selectedPayments) {
-                    await api.delete(`/api/projects/${id}/payments/${payId}`);
-                }
+                await postBatch(`/api/projects/${id}/payments:batch`, 'delete', [...selectedPayments]);
                 setSelectedPayments(new Set());
                 fetchProjectDetails();
                 setDeleteConfirmation(null);
@@ -724,11 +702,12 @@ const ProjectDetails = () => {
         formData.append('file', file);
 
         try {
-            await api.post(`/api/projects/${id}/payments/import`, formData, {
+            const { data: job } = await api.post(`/api/projects/${id}/payments/import`, formData, {
                 headers: {
                     'Content-Type': 'multipart/form-data',
                 },
             });
+            await waitForJob(job.id);
             fetchProjectDetails();
             event.target.value = ''; // Reset input
         } catch (error) {
@@ -1186,7 +1165,7 @@ const ProjectDetails = () => {
                                     <label className="flex items-center gap-2 bg-amber-50 hover:bg-amber-100 text-amber-600 border border-amber-200 px-3 py-1.5 rounded-lg text-xs font-bold transition-colors cursor-pointer" title="Import from Excel">
                                         <Upload size={14} />
                                         Import
-                                        <input type="file" accept=".xlsx, .xls" className="hidden" onChange={handleImportTasks} />
+                                        <input type="file" accept=".xlsx" className="hidden" onChange={handleImportTasks} />
                                     </label>
                                     <button
                                         onClick={() => { setEditingTask(null); resetTaskForm(); setShowTaskModal(true); }}
@@ -1337,6 +1316,7 @@ const ProjectDetails = () => {
                             {viewMode === 'timeline' && (
                                 <div className="p-6 bg-slate-100 overflow-x-auto min-h-[600px]">
                                     <TaskTimeline
+                                        projectId={id}
                                         tasks={project.tasks}
                                         onTaskClick={handleTaskClick}
                                     />
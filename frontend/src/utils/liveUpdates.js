@@ -0,0 +1,56 @@
+/**
+ * Subscribe to project change events pushed over /ws/projects.
+ * onChange is called (at most once per `debounceMs`) with the latest event;
+ * the socket reconnects with backoff and signals a resync after reconnecting.
+ * Returns an unsubscribe function.
+ */
+export const subscribeProjectChanges = (onChange, { projectId = null, debounceMs = 300 } = {}) => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const query = projectId ? `?project_id=${projectId}` : '';
+    const url = `${protocol}://${window.location.host}/ws/projects${query}`;
+
+    let socket = null;
+    let closed = false;
+    let retryDelay = 1000;
+    let retryTimer = null;
+    let debounceTimer = null;
+    let pingTimer = null;
+
+    const notify = (event) => {
+        clearTimeout(debounceTimer);
+        debounceTimer = setTimeout(() => onChange(event), debounceMs);
+    };
+
+    const connect = (isReconnect) => {
+        socket = new WebSocket(url);
+        socket.onopen = () => {
+            retryDelay = 1000;
+            // Changes made while disconnected were missed
+            if (isReconnect) notify({ type: 'resync', project_id: projectId, ids: [] });
+            pingTimer = setInterval(() => socket.readyState === WebSocket.OPEN && socket.send('ping'), 30000);
+        };
+        socket.onmessage = (message) => {
+            try {
+                notify(JSON.parse(message.data));
+            } catch (e) {
+                console.error('Invalid change event', e);
+            }
+        };
+        socket.onclose = () => {
+            clearInterval(pingTimer);
+            if (closed) return;
+            retryTimer = setTimeout(() => connect(true), retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        };
+    };
+
+    connect(false);
+
+    return () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        clearTimeout(debounceTimer);
+        clearInterval(pingTimer);
+        if (socket) socket.close();
+    };
+};